@@ -1,9 +1,25 @@
+def lookupResult(tt, key, position, stats=None):
+    '''
+    The result stored in tt under key for position, or None. Entries keep
+    the board they were stored for; one stored by another position with
+    the same hash code is a collision, and a miss.
+    '''
+    entry = tt.lookup(key)
+    collision = entry is not None and entry[0] != position
+    if stats is not None:
+        stats.probe(entry is not None and not collision, collision)
+    if entry is None or collision:
+        return None
+    return entry[1]
+
 def storeResult(tt, state, result):
-    tt.store(state.hashcode(), result)
+    tt.store(state.hashcode(), (state.board.tobytes(), result))
     return result
 
-def alphabeta(state, alpha, beta, tt):
-    result = tt.lookup(state.hashcode())
+def alphabeta(state, alpha, beta, tt, stats=None, depth=0):
+    if stats is not None:
+        stats.node(depth)
+    result = lookupResult(tt, state.hashcode(), state.board.tobytes(), stats)
 
     if result is not None:
         return result
@@ -14,23 +30,82 @@ def alphabeta(state, alpha, beta, tt):
 
     good_move = None
 
-    for move in state.sort_moves():
+    for i, move in enumerate(state.sort_moves()):
         state.play_move(move, state.current_player)
-        value = -alphabeta(state, -beta, -alpha, tt)[0]
+        value = -alphabeta(state, -beta, -alpha, tt, stats, depth + 1)[0]
         state.undoMove(move)
 
         if value > alpha:
             alpha = value
             good_move = move
             if alpha == 1:
+                if stats is not None:
+                    stats.cutoff(i)
                 break
         
         if value >= beta: 
+            if stats is not None:
+                stats.cutoff(i)
             result = beta, move
             return storeResult(tt, state, result) 
 
     result = alpha, good_move
     return storeResult(tt, state, result)
 
-def call_alphabeta_tt(rootState, tt):
-    return alphabeta(rootState, -1, 1, tt)
+def call_alphabeta_tt(rootState, tt, stats=None):
+    return alphabeta(rootState, -1, 1, tt, stats)
+
+
+def storeBound(tt, code, alpha, position, result):
+    tt.store((code, alpha), (position, result))
+    return result
+
+def nullWindowAlphabeta(state, alpha, tt, stats=None, depth=0):
+    '''
+    Boolean alphabeta search with the null window (alpha, alpha + 1).
+    Returns (alpha + 1, move) if the player to move can do better than alpha,
+    (alpha, None) otherwise.
+    Results are stored under (hashcode, alpha), so searches with different
+    windows share the table without mixing up their bounds.
+    '''
+    beta = alpha + 1
+    code = state.hashcode()
+    position = state.board.tobytes()
+    if stats is not None:
+        stats.node(depth)
+    result = lookupResult(tt, (code, alpha), position, stats)
+
+    if result is not None:
+        return result
+
+    if state.endOfGame():
+        value = state.staticallyEvaluateForToPlay()
+        result = (beta if value >= beta else alpha), None
+        return storeBound(tt, code, alpha, position, result)
+
+    for i, move in enumerate(state.sort_moves()):
+        state.play_move(move, state.current_player)
+        value = -nullWindowAlphabeta(state, -beta, tt, stats, depth + 1)[0]
+        state.undoMove(move)
+
+        if value >= beta:
+            if stats is not None:
+                stats.cutoff(i)
+            result = beta, move
+            return storeBound(tt, code, alpha, position, result)
+
+    result = alpha, None
+    return storeBound(tt, code, alpha, position, result)
+
+def call_alphabeta_tt_two_pass(rootState, tt, stats=None):
+    '''
+    Solve in two boolean passes: first "is this a win", then, only if it is
+    not, "is this at least a draw". Both passes share tt.
+    '''
+    score, move = nullWindowAlphabeta(rootState, 0, tt, stats)
+    if score == 1:
+        return score, move
+    score, move = nullWindowAlphabeta(rootState, -1, tt, stats)
+    if score == 0:
+        return score, move
+    return -1, None
@@ -11,6 +11,7 @@ The board uses a 1-dimensional representation with padding
 
 import numpy as np
 import random
+from pattern_eval import get_evaluator
 from board_util import (
     GoBoardUtil,
     BLACK,
@@ -23,7 +24,8 @@ from board_util import (
     coord_to_point,
     where1d,
     MAXSIZE,
-    GO_POINT
+    GO_POINT,
+    CANDIDATE_DISTANCE
 )
 
 """
@@ -36,11 +38,17 @@ The board is stored as a one-dimensional array of GO_POINT in self.board.
 See GoBoardUtil.coord_to_point for explanations of the array encoding.
 """
 class GoBoard(object):
-    def __init__(self, size):
+
+    # zone neighbor lists shared by all boards of the same size and distance
+    _zone_cache = {}
+
+    def __init__(self, size, candidate_distance=CANDIDATE_DISTANCE):
         """
         Creates a Go board of given size
         """
         assert 2 <= size <= MAXSIZE
+        assert candidate_distance >= 0
+        self.candidate_distance = candidate_distance
         self.reset(size)
         self.calculate_rows_cols_diags()
 
@@ -123,9 +131,11 @@ class GoBoard(object):
         self.total_cells = size * size
         self.total_colors = 3
         self.zobrist_random()
+        self._initialize_candidate_zone()
+        self.evaluator = get_evaluator(size)
 
     def copy(self):
-        b = GoBoard(self.size)
+        b = GoBoard(self.size, self.candidate_distance)
         assert b.NS == self.NS
         assert b.WE == self.WE
         b.ko_recapture = self.ko_recapture
@@ -134,6 +144,8 @@ class GoBoard(object):
         b.current_player = self.current_player
         assert b.maxpoint == self.maxpoint
         b.board = np.copy(self.board)
+        b.zone_count = list(self.zone_count)
+        b.candidates = set(self.candidates)
         return b
 
     def get_color(self, point):
@@ -159,6 +171,74 @@ class GoBoard(object):
         """
         return where1d(self.board == EMPTY)
     
+    def get_candidate_moves(self):
+        """
+        Return:
+            The empty points within candidate_distance of a stone.
+            All empty points if the zone is empty or turned off.
+        """
+        if self.candidate_distance == 0 or not self.candidates:
+            return self.get_empty_points()
+        return list(self.candidates)
+
+    def set_candidate_distance(self, distance):
+        """
+        Change the radius of the candidate zone and rebuild it
+        for the current position.
+        """
+        assert distance >= 0
+        self.candidate_distance = distance
+        self._initialize_candidate_zone()
+
+    def _initialize_candidate_zone(self):
+        """
+        Precompute the candidate zone.
+        For each point on the board, self.zone_neighbors stores the on-board
+        points within candidate_distance rows and columns of it.
+        self.zone_count counts the stones in the zone of each point, and
+        self.candidates is the set of empty points with a nonzero count.
+        """
+        key = (self.size, self.candidate_distance)
+        if key not in GoBoard._zone_cache:
+            d = self.candidate_distance
+            zone_neighbors = []
+            for point in range(self.maxpoint):
+                zone = []
+                if self.board[point] != BORDER:
+                    row, col = divmod(point, self.NS)
+                    for r in range(max(1, row - d), min(self.size, row + d) + 1):
+                        for c in range(max(1, col - d), min(self.size, col + d) + 1):
+                            if (r, c) != (row, col):
+                                zone.append(self.pt(r, c))
+                zone_neighbors.append(zone)
+            GoBoard._zone_cache[key] = zone_neighbors
+        self.zone_neighbors = GoBoard._zone_cache[key]
+        self.zone_count = [0] * self.maxpoint
+        self.candidates = set()
+        for point in where1d((self.board == BLACK) + (self.board == WHITE)):
+            self._add_to_zone(point)
+
+    def _add_to_zone(self, point):
+        """
+        Update the candidate zone after a stone was placed on point.
+        """
+        self.candidates.discard(point)
+        for nb in self.zone_neighbors[point]:
+            self.zone_count[nb] += 1
+            if self.board[nb] == EMPTY:
+                self.candidates.add(nb)
+
+    def _remove_from_zone(self, point):
+        """
+        Update the candidate zone after the stone on point was removed.
+        """
+        for nb in self.zone_neighbors[point]:
+            self.zone_count[nb] -= 1
+            if self.zone_count[nb] == 0:
+                self.candidates.discard(nb)
+        if self.zone_count[point] > 0:
+            self.candidates.add(point)
+
     def get_color_points(self, color):
         """
         Return:
@@ -288,6 +368,7 @@ class GoBoard(object):
         # opp_color = GoBoardUtil.opponent(color)
         # in_enemy_eye = self._is_surrounded(point, opp_color)
         self.board[point] = color
+        self._add_to_zone(point)
         # single_captures = []
         # neighbors = self._neighbors(point)
         # for nb in neighbors:
@@ -433,6 +514,7 @@ class GoBoard(object):
         For alphabeta search
         '''
         self.board[move] = EMPTY
+        self._remove_from_zone(move)
         self.current_player = GoBoardUtil.opponent(self.current_player)
 
     def get_move_value(self, move):
@@ -444,77 +526,28 @@ class GoBoard(object):
         self.undoMove(move)
         return value
     
-    def sort_moves(self):
+    def get_move_values(self):
         '''
-        Sort legal moves by heuristic value
+        Get heuristic evaluation for all moves at once.
+        Returns an array indexed by point with the same values as
+        get_move_value on the empty points, at the cost of about
+        one board evaluation
         '''
-        moves = self.get_empty_points()
-        return sorted(moves, key=self.get_move_value, reverse=True)
+        color = self.current_player
+        return (self.evaluator.evaluate(self.board, color)
+                + self.evaluator.move_deltas(self.board, color))
 
-    def heuristic_state_evaluate(self):
+    def sort_moves(self):
         '''
-        Compute heuristic value for a state
+        Sort legal moves by heuristic value
         '''
-        count_black_3, count_white_3 = self.count_n_in_a_row(3)
-        count_black_4, count_white_4 = self.count_n_in_a_row(4)
-        count_black_5, count_white_5 = self.count_n_in_a_row(5)
+        moves = self.get_candidate_moves()
+        values = self.get_move_values()
+        return sorted(moves, key=lambda move: values[move], reverse=True)
 
-        value_black = 0.0000005 * count_black_3 +  0.000002 * count_black_4 + 1 * count_black_5
-        value_white = 0.0000005 * count_white_3 +  0.000002 * count_white_4 + 1 * count_white_5
-
-        if self.current_player == BLACK:
-            return value_black - value_white
-        else:
-            return value_white - value_black
-        
-    def count_n_in_a_row(self, n):
+    def heuristic_state_evaluate(self):
         '''
-        Returns the number of lines has n_in_a_row for BLACK AND WHITE
+        Compute heuristic value for a state,
+        from the pattern score of every 5-window on the board
         '''
-        count_black = 0
-        count_white = 0
-
-        for r in self.rows:
-            result = self.has_n_in_list(r, n)
-            if result == BLACK:
-                count_black += 1
-            elif result == WHITE:
-                count_white += 1
-        for c in self.cols:
-            result = self.has_n_in_list(c, n)
-            if result == BLACK:
-                count_black += 1
-            elif result == WHITE:
-                count_white += 1
-        for d in self.diags:
-            result = self.has_n_in_list(d, n)
-            if result == BLACK:
-                count_black += 1
-            elif result == WHITE:
-                count_white += 1
-
-        return count_black, count_white
-
-    def has_n_in_list(self, list, n):
-        """
-        Returns BLACK or WHITE if any n in a rows exist in the list.
-        EMPTY otherwise.
-        """
-        prev = BORDER
-        counter = 1
-        for stone in list:
-            if self.get_color(stone) == prev:
-                counter += 1
-            else:
-                counter = 1
-                prev = self.get_color(stone)
-            if counter == n and prev != EMPTY:
-                return prev
-        return EMPTY
-
-    
-    
-        
-        
-        
-
+        return self.evaluator.evaluate(self.board, self.current_player)
@@ -47,6 +47,13 @@ GtpConnection.format_point needs to be changed.
 """
 MAXSIZE = 25
 
+"""
+Default radius of the candidate-move zone kept by the board.
+Empty points within this many rows/columns of a stone are candidates.
+A radius of 0 turns the zone off, so every empty point is a candidate.
+"""
+CANDIDATE_DISTANCE = 2
+
 """
 where1d: Helper function for using np.where with 1-d arrays.
 The result of np.where is a tuple which contains the indices 
@@ -21,9 +21,10 @@ from board_util import (
 import numpy as np
 import re
 import signal
-from alphabeta_tt import call_alphabeta_tt
+from alphabeta_tt import call_alphabeta_tt, call_alphabeta_tt_two_pass
 from transposition_table import TranspositionTable
-from multiprocessing import Process
+from solve_stats import SolveStats
+from multiprocessing import Process, Array
 
 
 class GtpConnection:
@@ -42,6 +43,13 @@ class GtpConnection:
         self.go_engine = go_engine
         self.board = board
         self.time_limit = 1
+        # "two_pass" proves win, then draw, with null-window searches
+        # "full" searches once with the window (-1, 1)
+        self.solve_mode = "two_pass"
+        # solver counters, off by default. When on, each solve
+        # gets a new shared array that the solver process writes to
+        self.collect_stats = False
+        self.stats_shared = None
         self.commands = {
             "protocol_version": self.protocol_version_cmd,
             "quit": self.quit_cmd,
@@ -64,7 +72,9 @@ class GtpConnection:
             "gogui-rules_final_result": self.gogui_rules_final_result_cmd,
             "gogui-analyze_commands": self.gogui_analyze_cmd,
             "timelimit": self.timelimit_cmd,
-            "solve": self.solve_cmd
+            "solve": self.solve_cmd,
+            "solve_mode": self.solve_mode_cmd,
+            "solve_stats": self.solve_stats_cmd
         }
 
         # used for argument checking
@@ -77,7 +87,8 @@ class GtpConnection:
             "genmove": (1, "Usage: genmove {w,b}"),
             "play": (2, "Usage: play {b,w} MOVE"),
             "legal_moves": (1, "Usage: legal_moves {w,b}"),
-            "timelimit": (1, "Usage: timelimit INT")
+            "timelimit": (1, "Usage: timelimit INT"),
+            "solve_mode": (1, "Usage: solve_mode {full,two_pass}")
         }
 
         #check the current command is genmove
@@ -366,10 +377,43 @@ class GtpConnection:
             return
         self.respond()
 
+    def solve_mode_cmd(self, args):
+        if args[0] in ("full", "two_pass"):
+            self.solve_mode = args[0]
+        else:
+            self.respond("Invalid argument!")
+            return
+        self.respond()
+
+    def solve_stats_cmd(self, args):
+        """
+        solve_stats on|off: turn the solver counters on or off
+        solve_stats: report the counters of the last solve
+        """
+        if len(args) > 1 or (args and args[0] not in ("on", "off")):
+            self.error("Usage: solve_stats [on|off]")
+            return
+        if args:
+            self.collect_stats = args[0] == "on"
+            self.respond()
+            return
+        if self.stats_shared is None:
+            self.error("no solve statistics, use solve_stats on")
+            return
+        self.respond(SolveStats.from_shared(self.stats_shared).report())
+
     def solver(self):
         tt = TranspositionTable()
         rootState = self.board.copy()
-        score, move = call_alphabeta_tt(rootState,tt)
+        stats = None
+        if self.stats_shared is not None:
+            stats = SolveStats(self.stats_shared)
+        if self.solve_mode == "two_pass":
+            score, move = call_alphabeta_tt_two_pass(rootState,tt,stats)
+        else:
+            score, move = call_alphabeta_tt(rootState,tt,stats)
+        if stats is not None:
+            stats.stop()
         if score > 0:
             move = format_point(point_to_coord(move, self.board.size))
             current_color = color_to_string(self.board.current_player)
@@ -388,6 +432,8 @@ class GtpConnection:
         return result
 
     def solve_cmd(self, args):
+        if self.collect_stats:
+            self.stats_shared = Array("d", len(SolveStats.FIELDS))
         p = Process(target=self.solver)
         p.start()
         p.join(self.time_limit)
@@ -0,0 +1,144 @@
+"""
+pattern_eval.py
+
+Lookup-table pattern evaluator for Gomoku.
+
+Every window of consecutive points on a row, column or diagonal is
+encoded as a base-3 integer of its colors (EMPTY=0, BLACK=1, WHITE=2,
+first point is the lowest digit). Precomputed tables map each code to
+a threat class and a score, so evaluating a board is one gather of the
+window codes followed by a table lookup and a sum.
+
+The board is the padded 1-dimensional array used by GoBoard,
+see GoBoardUtil.coord_to_point.
+"""
+
+import numpy as np
+from board_util import BLACK, WHITE, EMPTY
+
+"""
+Score of a 5-window that holds n stones of one color and none of the other.
+A five decides the game, so it outweighs everything else.
+"""
+WINDOW_SCORES = [0, 1e-8, 1e-7, 5e-7, 2e-6, 1]
+
+# points per evaluated window
+WINDOW_LENGTH = 5
+
+# the four line directions as (row, col) steps
+DIRECTIONS = [(0, 1), (1, 0), (1, 1), (1, -1)]
+
+_window_cache = {}
+_evaluator_cache = {}
+
+
+def window_points(size, length=5):
+    """
+    All windows of length consecutive on-board points, as a
+    (number of windows, length) array of padded board points.
+    """
+    key = (size, length)
+    if key not in _window_cache:
+        NS = size + 1
+        windows = []
+        for row in range(1, size + 1):
+            for col in range(1, size + 1):
+                for dr, dc in DIRECTIONS:
+                    end_row = row + dr * (length - 1)
+                    end_col = col + dc * (length - 1)
+                    if end_row <= size and 1 <= end_col <= size:
+                        windows.append([(row + dr * i) * NS + col + dc * i
+                                        for i in range(length)])
+        _window_cache[key] = np.array(windows, dtype=np.intp).reshape(-1, length)
+    return _window_cache[key]
+
+def decode(code, length):
+    """
+    The colors of a window code, first point first.
+    """
+    colors = []
+    for _ in range(length):
+        code, color = divmod(code, 3)
+        colors.append(color)
+    return colors
+
+
+class PatternEvaluator(object):
+    """
+    Window table and pattern tables for one board size. Boards smaller
+    than WINDOW_LENGTH have no windows and evaluate to 0 everywhere.
+
+    windows: (W, WINDOW_LENGTH) array of board points
+    powers:  3 ** position, to encode a window
+    threat:  threat[color - 1][code] is the number of stones of color in
+             the window if it holds no stone of the other color, else 0
+    score:   score[code] is the value of the window for BLACK minus
+             its value for WHITE
+    gain:    gain[color - 1][code][i] is the change of score[code] when a
+             stone of color is added on the empty i-th point of the window
+    """
+
+    def __init__(self, size):
+        length = WINDOW_LENGTH
+        self.size = size
+        self.windows = window_points(size, length)
+        self.powers = 3 ** np.arange(length)
+        n_codes = 3 ** length
+        self.threat = np.zeros((2, n_codes), dtype=np.int8)
+        for code in range(n_codes):
+            colors = decode(code, length)
+            n_black = colors.count(BLACK)
+            n_white = colors.count(WHITE)
+            if n_white == 0:
+                self.threat[BLACK - 1][code] = n_black
+            if n_black == 0:
+                self.threat[WHITE - 1][code] = n_white
+        self.score = (np.take(WINDOW_SCORES, self.threat[BLACK - 1])
+                      - np.take(WINDOW_SCORES, self.threat[WHITE - 1]))
+        self.gain = np.zeros((2, n_codes, length))
+        for code in range(n_codes):
+            for i, color in enumerate(decode(code, length)):
+                if color == EMPTY:
+                    for c in (BLACK, WHITE):
+                        self.gain[c - 1][code][i] = (
+                            self.score[code + c * self.powers[i]] - self.score[code])
+
+    def codes(self, board):
+        """
+        Codes of all windows of board, a padded 1d array of colors.
+        """
+        return board[self.windows] @ self.powers
+
+    def evaluate(self, board, color):
+        """
+        Heuristic value of board for color.
+        """
+        value = self.score[self.codes(board)].sum()
+        return value if color == BLACK else -value
+
+    def move_deltas(self, board, color):
+        """
+        Change of evaluate(board, color) from adding a stone of color,
+        for every point at once: an array indexed by board point, only
+        meaningful on empty points. Each point sums the gain of its
+        windows, scattered with one bincount.
+        """
+        gain = self.gain[color - 1][self.codes(board)]
+        deltas = np.bincount(self.windows.ravel(), weights=gain.ravel(),
+                             minlength=len(board))
+        return deltas if color == BLACK else -deltas
+
+    def count_threats(self, board, color, n):
+        """
+        Number of windows that hold n stones of color and none of the other.
+        """
+        return int(np.count_nonzero(self.threat[color - 1][self.codes(board)] == n))
+
+
+def get_evaluator(size):
+    """
+    Shared evaluator for boards of the given size.
+    """
+    if size not in _evaluator_cache:
+        _evaluator_cache[size] = PatternEvaluator(size)
+    return _evaluator_cache[size]
@@ -0,0 +1,94 @@
+"""
+solve_stats.py
+
+Counters for the alphabeta solver.
+The search functions take stats=None by default and skip all bookkeeping;
+pass a SolveStats to record what the search did.
+"""
+import time
+
+"""
+When the counters are shared with another process, they are copied
+into the shared array every PUBLISH_INTERVAL seconds and when the search
+stops, so a search that gets terminated still reports its last numbers.
+"""
+PUBLISH_INTERVAL = 0.05
+
+
+class SolveStats(object):
+
+    FIELDS = ["nodes", "tt_probes", "tt_hits", "tt_collisions",
+              "cutoffs", "first_move_cutoffs", "max_depth", "elapsed"]
+
+    def __init__(self, shared=None):
+        """
+        shared: optional multiprocessing.Array of len(FIELDS) doubles
+        """
+        self.shared = shared
+        self.nodes = 0
+        self.tt_probes = 0
+        self.tt_hits = 0
+        self.tt_collisions = 0
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.max_depth = 0
+        self.elapsed = 0.0
+        self._start = time.monotonic()
+        self._last_publish = self._start
+
+    def node(self, depth):
+        self.nodes += 1
+        if depth > self.max_depth:
+            self.max_depth = depth
+        if self.shared is not None:
+            if time.monotonic() - self._last_publish >= PUBLISH_INTERVAL:
+                self.publish()
+
+    def probe(self, hit, collision=False):
+        """
+        Record a transposition table lookup. A collision is an entry
+        with the hash code of the position stored by another position,
+        which the search takes as a miss.
+        """
+        self.tt_probes += 1
+        if hit:
+            self.tt_hits += 1
+        if collision:
+            self.tt_collisions += 1
+
+    def cutoff(self, move_index):
+        """
+        Record a cutoff caused by the move_index-th move tried at a node.
+        """
+        self.cutoffs += 1
+        if move_index == 0:
+            self.first_move_cutoffs += 1
+
+    def stop(self):
+        self.elapsed = time.monotonic() - self._start
+        if self.shared is not None:
+            self.publish()
+
+    def publish(self):
+        self._last_publish = time.monotonic()
+        self.elapsed = self._last_publish - self._start
+        self.shared[:] = [getattr(self, field) for field in self.FIELDS]
+
+    @classmethod
+    def from_shared(cls, shared):
+        stats = cls()
+        for field, value in zip(cls.FIELDS, shared):
+            setattr(stats, field, value if field == "elapsed" else int(value))
+        return stats
+
+    def report(self):
+        nps = self.nodes / self.elapsed if self.elapsed > 0 else 0
+        first_cutoff_rate = (self.first_move_cutoffs / self.cutoffs
+                             if self.cutoffs else 0)
+        ebf = self.nodes ** (1.0 / self.max_depth) if self.max_depth else 0
+        return ("nodes {} nps {:.0f} time {:.3f} "
+                "tt_probes {} tt_hits {} tt_collisions {} "
+                "first_cutoff_rate {:.3f} max_depth {} ebf {:.2f}").format(
+                    self.nodes, nps, self.elapsed,
+                    self.tt_probes, self.tt_hits, self.tt_collisions,
+                    first_cutoff_rate, self.max_depth, ebf)
@@ -0,0 +1,75 @@
+#!/usr/local/bin/python3
+# /usr/bin/python3
+# Set the path to your python3 above
+
+import unittest
+from board_util import BLACK, WHITE
+from board import GoBoard
+from pattern_eval import WINDOW_SCORES, get_evaluator, window_points
+
+
+class PatternEvaluatorTestCase(unittest.TestCase):
+    """Tests for pattern_eval.py"""
+
+    def test_window_count(self):
+        # 5-windows on a 7x7 board: 3 per row and column, 9 per diagonal direction
+        self.assertEqual(len(window_points(7, 5)), 3 * 7 * 2 + 9 * 2)
+        self.assertEqual(len(window_points(7, 6)), 2 * 7 * 2 + 4 * 2)
+
+    def test_codes(self):
+        goboard = GoBoard(7)
+        evaluator = get_evaluator(7)
+        goboard.play_move(goboard.pt(1, 1), BLACK)
+        goboard.play_move(goboard.pt(1, 2), WHITE)
+        codes = evaluator.codes(goboard.board)
+        first_row = list(evaluator.windows[:, 0]).index(goboard.pt(1, 1))
+        self.assertEqual(codes[first_row], BLACK + 3 * WHITE)
+
+    def test_evaluate(self):
+        goboard = GoBoard(7)
+        self.assertEqual(goboard.heuristic_state_evaluate(), 0)
+        goboard.play_move(goboard.pt(4, 4), BLACK)
+        # the center point is in 3 windows per direction
+        self.assertAlmostEqual(goboard.heuristic_state_evaluate(),
+                               -12 * WINDOW_SCORES[1], delta=1e-12)
+        # black keeps 9 windows, white at E4 gets 7
+        goboard.play_move(goboard.pt(4, 5), WHITE)
+        self.assertAlmostEqual(goboard.heuristic_state_evaluate(),
+                               2 * WINDOW_SCORES[1], delta=1e-12)
+
+    def test_five_dominates(self):
+        goboard = GoBoard(7)
+        for col in range(1, 6):
+            goboard.play_move(goboard.pt(1, col), BLACK)
+        for col in range(1, 5):
+            goboard.play_move(goboard.pt(3, col), WHITE)
+        goboard.current_player = BLACK
+        self.assertGreater(goboard.heuristic_state_evaluate(), 0.99)
+        self.assertEqual(get_evaluator(7).count_threats(goboard.board, BLACK, 5), 1)
+        self.assertEqual(get_evaluator(7).count_threats(goboard.board, WHITE, 4), 1)
+
+    def test_move_values_match_get_move_value(self):
+        goboard = GoBoard(7)
+        for row, col in [(4, 4), (4, 5), (3, 3), (5, 5), (2, 2), (3, 5)]:
+            goboard.play_move(goboard.pt(row, col), goboard.current_player)
+        values = goboard.get_move_values()
+        for move in goboard.get_empty_points():
+            self.assertAlmostEqual(values[move], goboard.get_move_value(move),
+                                   delta=1e-12)
+
+
+    def test_small_board(self):
+        # no 5-windows below size 5: everything evaluates to 0
+        for size in (2, 3, 4):
+            goboard = GoBoard(size)
+            goboard.play_move(goboard.pt(1, 1), BLACK)
+            self.assertEqual(goboard.heuristic_state_evaluate(), 0)
+            self.assertFalse(goboard.get_move_values().any())
+            self.assertEqual(sorted(goboard.sort_moves()),
+                             sorted(goboard.get_candidate_moves()))
+            self.assertEqual(goboard.get_move_value(goboard.pt(size, size)), 0)
+
+
+"""Main"""
+if __name__ == "__main__":
+    unittest.main()
@@ -5,6 +5,8 @@
 from gtp_connection import GtpConnection
 from board_util import GoBoardUtil, EMPTY, PASS
 from board import GoBoard
+from rollout_budget import RolloutBudget
+from rollout_pool import get_pool
 import numpy as np
 import random
 
@@ -24,12 +26,22 @@ class Gomoku():
         self.name = "GomokuAssignment3"
         self.version = 1.0
         self.numSimulations = 10
+        # "fixed": numSimulations rollouts per move
+        # "ucb": rollouts allocated by UCB1 until the time limit,
+        #        see rollout_budget.py
+        self.budget = "fixed"
+        # worker processes for the "ucb" budget, 0 runs the rollouts here
+        self.workers = 0
 
 
-    def get_move(self, board, color, policy_type):
+    def get_move(self, board, color, policy_type, timelimit=None):
         """
         Run one-ply MC simulations to get a move to play.
+        timelimit is only used by the "ucb" budget.
         """
+        if self.budget == "ucb":
+            return self.get_move_ucb(board, color, policy_type, timelimit)
+
         if policy_type == "rule_based":
             _, moves = board.check_policy_moves()
         else:
@@ -41,21 +53,68 @@ class Gomoku():
         moveWins = [] 
 
         for move in moves:
-            cboard = board.copy()
-            wins = self.simulateMove(cboard, move, color, policy_type)
+            wins = self.simulateMove(board, move, color, policy_type)
             moveWins.append(wins)
 
         #Select best move
         max_child = np.argmax(moveWins)
         return moves[max_child]
 
+    def get_move_ucb(self, board, color, policy_type, timelimit):
+        """
+        One-ply MC with a time budget: rollouts go to the most promising
+        moves, and the search stops early once the best move is clear.
+        A win, or a single move that blocks a win, is played at once.
+        """
+        move_type, policy_moves = board.check_policy_moves()
+        if move_type == "Win" or (move_type == "BlockWin" and len(policy_moves) == 1):
+            return policy_moves[0]
+        if policy_type == "rule_based":
+            moves = sorted(set(policy_moves))
+        else:
+            moves = list(board.get_empty_points())
+        if len(moves) < 1:
+            return None
+        if len(moves) == 1:
+            return moves[0]
+
+        budget = RolloutBudget(len(moves), timelimit)
+        if self.workers > 0:
+            get_pool(self.workers).run(board, moves, budget, self.rollout,
+                                       (color, policy_type))
+        else:
+            while not budget.done():
+                i = budget.select()
+                budget.update(i, self.rollout(board, moves[i], color, policy_type))
+        return moves[budget.best()]
+
+    def set_workers(self, workers):
+        """
+        Use a pool of worker processes for the "ucb" budget,
+        started now so that it is ready for the next genmove.
+        """
+        self.workers = workers
+        get_pool(workers)
+
+    def rollout(self, board, move, color, policy_type):
+        """
+        Reward of one simulated game for a given move:
+        1 for a win of color, 0.5 for a draw, 0 for a loss.
+        """
+        result = self.simulate(board.copy(), move, color, policy_type)
+        if result == color:
+            return 1.0
+        elif result == EMPTY:
+            return 0.5
+        return 0.0
+
     def simulateMove(self, board, move, toPlay, policy_type):
         """
         Run simulations for a given move
         """
         wins = 0
         for _ in range(self.numSimulations):
-            result = self.simulate(board, move, toPlay, policy_type)
+            result = self.simulate(board.copy(), move, toPlay, policy_type)
             if result == toPlay:
                 wins += 1
         return wins
@@ -25,6 +25,7 @@ from board_util import (
     GO_POINT
 )
 import math
+from threat_classifier import get_classifier, PolicyCache
 
 """
 The GoBoard class implements a board and basic functions to play
@@ -120,6 +121,14 @@ class GoBoard(object):
         self.board = np.full(self.maxpoint, BORDER, dtype=GO_POINT)
         self._initialize_empty_points(self.board)
         self.calculate_rows_cols_diags()
+        # created by the first check_policy_moves, see PolicyCache
+        self.policy_cache = None
+
+    def __getstate__(self):
+        # the policy cache is rebuilt on first use
+        state = self.__dict__.copy()
+        state["policy_cache"] = None
+        return state
 
     def copy(self):
         b = GoBoard(self.size)
@@ -131,6 +140,8 @@ class GoBoard(object):
         b.current_player = self.current_player
         assert b.maxpoint == self.maxpoint
         b.board = np.copy(self.board)
+        if self.policy_cache is not None:
+            b.policy_cache = self.policy_cache.copy()
         return b
 
     def get_color(self, point):
@@ -285,6 +296,8 @@ class GoBoard(object):
         # opp_color = GoBoardUtil.opponent(color)
         # in_enemy_eye = self._is_surrounded(point, opp_color)
         self.board[point] = color
+        if self.policy_cache is not None:
+            self.policy_cache.touch(point)
         # single_captures = []
         # neighbors = self._neighbors(point)
         # for nb in neighbors:
@@ -464,139 +477,24 @@ class GoBoard(object):
 
     def undo_move(self, move):
         self.board[move] = EMPTY
+        if self.policy_cache is not None:
+            self.policy_cache.touch(move)
         self.current_player = GoBoardUtil.opponent(self.current_player)
 
     def check_policy_moves(self):
-        # get a list of all legal moves on the board for current color 
-        legal_moves = GoBoardUtil.generate_legal_moves(self, self.current_player)
-
-        win_moves = []
-        block_win_moves = []
-        open_four_moves = []
-        block_open_four_moves = []
-        
-        # evaluate move type for each move
-        for move in legal_moves: 
-
-            self.play_move(move,self.current_player)
-            color = GoBoardUtil.opponent(self.current_player)
-            lines_5 = self.get_nlines_contain_point(move, 5)
-            lines_6 = self.get_nlines_contain_point(move, 6)
-            win = self.win(lines_5,color,move,win_moves)
-            if (not win):
-                block_win = self.block_win(lines_5,color,move,block_win_moves)
-                if (not block_win):
-                    open_four = self.open_four(lines_6,color,move,open_four_moves)
-                    if (not open_four):
-                        block_open_four = self.block_open_four(lines_6,color,move,block_open_four_moves)
-
-            self.undo_move(move)
-
-        if win_moves:
-            move_type = "Win"
-            move_list = win_moves
-
-        elif block_win_moves:
-            move_type = "BlockWin"
-            move_list = block_win_moves
-        
-        elif open_four_moves:
-            move_type = "OpenFour"
-            move_list = open_four_moves
-        
-        elif block_open_four_moves:
-            move_type = "BlockOpenFour"
-            move_list = block_open_four_moves
-    
-        else:
+        """
+        Return the move type and the moves of the rule-based policy for
+        the current player: "Win", "BlockWin", "OpenFour", "BlockOpenFour",
+        or "Random" with all legal moves. All empty points are classified
+        at once from the window codes, and kept per line between calls,
+        see threat_classifier.py.
+        """
+        if self.policy_cache is None:
+            self.policy_cache = PolicyCache(get_classifier(self))
+        move_type, move_list = self.policy_cache.policy_moves(
+            self.board, self.current_player)
+        if move_type is None:
+            # every empty point is legal in Gomoku
             move_type = "Random"
-            move_list = legal_moves
-            
+            move_list = list(self.get_empty_points())
         return move_type, move_list
-
-    # check if win
-    def win(self,lines,color,move,win_moves):
-        for line in lines:
-            if line.size:
-                for i in range(0, len(line) - 5 + 1):
-                    if np.all(line[i:i+5] == color):
-                        win_moves.append(move)
-                        return True
-        return False
-
-    # check if block_win
-    def block_win(self,lines,color,move,block_win_moves):    
-        
-        for line in lines:
-            if line.size:
-                for i in range(0, len(line) - 5 + 1):
-                    part_line = line[i:i+5]
-
-                    n_player = len(where1d(part_line == color))
-                    n_opp = len(where1d(part_line == GoBoardUtil.opponent(color)))
-                    if n_player == 1 and n_opp == 4:
-                        block_win_moves.append(move)
-                        return True     
-        return False
-
-    # check if open_four
-    def open_four(self,lines,color,move,open_four_moves):
-        for line in lines:
-            if line.size:
-                for i in range(0, len(line) - 6 + 1):
-                    if line[i] == EMPTY and line[i+5] == EMPTY and np.all(line[i+1:i+5] == color):
-                        open_four_moves.append(move)
-                        return True
-        return False
-
-    # check if block_open_four
-    def block_open_four(self,lines,color,move,block_open_four_moves): 
-        for pattern in self.blockopen4[color-1]: 
-            # for each row, col, diag1, diag2
-            for line in lines:
-                # if line matches the one of the pattern, then block_win is True
-                if line.size:
-                    for i in range(0, len(line) - 6 + 1):
-                        part_line = line[i:i+6] 
-                        
-                        if np.allclose(part_line, pattern):
-                            # special case [EMPTY,WHITE,WHITE,WHITE,EMPTY,BLACK],[BLACK,EMPTY,WHITE,WHITE,WHITE,EMPTY]
-                            if np.allclose(pattern, self.b_spe1) or np.allclose(pattern, self.b_spe2) or np.allclose(pattern, self.w_spe1) or np.allclose(pattern, self.w_spe2):
-                                if self.size > 6:
-                                    block_open_four_more = self.block_open_four_more(color,move,block_open_four_moves)
-                                    if block_open_four_more:
-                                        block_open_four_moves.append(move)
-                                        return True
-                                    else:
-                                        return False
-                            block_open_four_moves.append(move)
-                            return True
-        return False
-
-    # more
-    def block_open_four_more(self,color,move,block_open_four_moves):
-        lines_list = self.get_nlines_contain_point(move, 7)
-        
-        # for each row, col, diag1, diag2
-        for line in lines_list:
-            # if line matches the one of the pattern, then block_win is True
-            if line.size:
-                for i in range(0, len(line) - 7 + 1):
-                    part_line = line[i:i+7] 
-                    
-                    if np.allclose(part_line, self.blockopen4_more[color-1]):
-                        block_open_four_moves.append(move)
-                        return True
-                    else:
-                        for pattern in self.not_blockopen4[color-1]: 
-                            if np.allclose(part_line, pattern):
-                                return False
-        return True
-
-        
-        
-            
-
-
-        
-        
\ No newline at end of file
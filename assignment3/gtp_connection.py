@@ -39,6 +39,8 @@ class GtpConnection:
         self.board = board
         # default policy_type is random
         self.policy_type = "random"
+        # seconds per genmove, used by the "ucb" budget
+        self.timelimit = 10
         self.commands = {
             "protocol_version": self.protocol_version_cmd,
             "quit": self.quit_cmd,
@@ -61,7 +63,10 @@ class GtpConnection:
             "gogui-rules_final_result": self.gogui_rules_final_result_cmd,
             "gogui-analyze_commands": self.gogui_analyze_cmd,
             "policy": self.policy_cmd,
-            "policy_moves": self.policy_moves_cmd
+            "policy_moves": self.policy_moves_cmd,
+            "timelimit": self.timelimit_cmd,
+            "budget": self.budget_cmd,
+            "workers": self.workers_cmd
         }
 
         # used for argument checking
@@ -74,7 +79,10 @@ class GtpConnection:
             "genmove": (1, "Usage: genmove {w,b}"),
             "play": (2, "Usage: play {b,w} MOVE"),
             "legal_moves": (1, "Usage: legal_moves {w,b}"),
-            "policy": (1, 'Usage: policy {random,rule_based}')
+            "policy": (1, 'Usage: policy {random,rule_based}'),
+            "timelimit": (1, 'Usage: timelimit INT'),
+            "budget": (1, 'Usage: budget {fixed,ucb}'),
+            "workers": (1, 'Usage: workers INT')
         }
 
     def write(self, data):
@@ -268,7 +276,8 @@ class GtpConnection:
             return
         board_color = args[0].lower()
         color = color_to_int(board_color)
-        move = self.go_engine.get_move(self.board, color, self.policy_type)
+        move = self.go_engine.get_move(self.board, color, self.policy_type,
+                                       self.timelimit)
         move_coord = point_to_coord(move, self.board.size)
         move_as_string = format_point(move_coord)
         if self.board.is_legal(move, color):
@@ -349,6 +358,41 @@ class GtpConnection:
         self.policy_type = args[0]
         self.respond()
 
+    def timelimit_cmd(self, args):
+        """
+        Seconds per genmove, a positive integer
+        """
+        try:
+            timelimit = int(args[0])
+        except ValueError:
+            timelimit = 0
+        if timelimit < 1:
+            self.error("Usage: timelimit INT")
+            return
+        self.timelimit = timelimit
+        self.respond()
+
+    def budget_cmd(self, args):
+        if args[0] not in ["fixed", "ucb"]:
+            self.error("Usage: budget {fixed,ucb}")
+            return
+        self.go_engine.budget = args[0]
+        self.respond()
+
+    def workers_cmd(self, args):
+        """
+        Number of rollout worker processes for the ucb budget, 0 for none
+        """
+        try:
+            workers = int(args[0])
+        except ValueError:
+            workers = -1
+        if workers < 0:
+            self.error("Usage: workers INT")
+            return
+        self.go_engine.set_workers(workers)
+        self.respond()
+
     def policy_moves_cmd(self, args):
 
         # rulebased
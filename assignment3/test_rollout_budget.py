@@ -0,0 +1,96 @@
+#!/usr/local/bin/python3
+# /usr/bin/python3
+# Set the path to your python3 above
+
+import random
+import unittest
+import numpy as np
+from rollout_budget import RolloutBudget
+from rollout_pool import RolloutPool
+
+
+def _reward(board, move, best):
+    return 1.0 if move == best else 0.0
+
+
+def _random_reward(board, move):
+    return float(np.random.random())
+
+
+class _Recorder(object):
+    """
+    Budget that hands out the first move and keeps the rewards
+    of the first n batches.
+    """
+
+    def __init__(self, n):
+        self.n = n
+        self.deadline = None
+        self.rewards = []
+
+    def select(self):
+        return 0
+
+    def update(self, i, reward, n=1):
+        self.rewards.append(reward)
+
+    def done(self):
+        return len(self.rewards) >= self.n
+
+
+class RolloutBudgetTestCase(unittest.TestCase):
+    """Tests for rollout_budget.py"""
+
+    def test_visits_every_move_first(self):
+        budget = RolloutBudget(3)
+        for i in range(3):
+            self.assertEqual(budget.select(), i)
+            budget.update(i, 0.0)
+        self.assertFalse(budget.separated())
+
+    def test_stops_when_best_is_clear(self):
+        rng = random.Random(455)
+        win_rates = [0.1, 0.9, 0.2, 0.15]
+        budget = RolloutBudget(len(win_rates), low=-1.0, high=1.0)
+        n = 0
+        while not budget.done():
+            i = budget.select()
+            budget.update(i, 1.0 if rng.random() < win_rates[i] else -1.0)
+            n += 1
+            self.assertLess(n, 100000)
+        self.assertEqual(budget.best(), 1)
+        # the best move gets most of the rollouts
+        self.assertEqual(max(range(4), key=budget.visits.__getitem__), 1)
+
+    def test_deadline(self):
+        budget = RolloutBudget(2, timelimit=0)
+        self.assertTrue(budget.done())
+        self.assertEqual(budget.best(), 0)
+
+    def test_pool(self):
+        pool = RolloutPool(2)
+        try:
+            for best in ('b', 'c'):
+                budget = RolloutBudget(3, timelimit=10)
+                pool.run(None, ['a', 'b', 'c'], budget, _reward, (best,))
+                self.assertTrue(budget.separated())
+                self.assertEqual(['a', 'b', 'c'][budget.best()], best)
+        finally:
+            pool.close()
+
+    def test_pool_workers_differ(self):
+        np.random.seed(455)
+        pool = RolloutPool(2, batch_size=1)
+        try:
+            recorder = _Recorder(2)
+            pool.run(None, ['a'], recorder, _random_reward)
+        finally:
+            pool.close()
+        # the first rollout of each worker, from its own random state
+        self.assertEqual(len(recorder.rewards), 2)
+        self.assertNotEqual(recorder.rewards[0], recorder.rewards[1])
+
+
+"""Main"""
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,170 @@
+#!/usr/local/bin/python3
+# /usr/bin/python3
+# Set the path to your python3 above
+
+import random
+import unittest
+import numpy as np
+from board_util import BLACK, WHITE, EMPTY, GoBoardUtil, where1d
+from board import GoBoard
+from threat_classifier import board_lines, get_classifier
+
+
+def scan_policy_moves(board):
+    """
+    The move by move scan that check_policy_moves did before
+    threat_classifier.py: play each legal move and look for the
+    patterns along its lines, in the same order.
+    """
+    moves = {"Win": [], "BlockWin": [], "OpenFour": [], "BlockOpenFour": []}
+    legal_moves = GoBoardUtil.generate_legal_moves(board, board.current_player)
+    for move in legal_moves:
+        board.play_move(move, board.current_player)
+        color = GoBoardUtil.opponent(board.current_player)
+        move_type = _scan_move(board, move, color)
+        if move_type is not None:
+            moves[move_type].append(move)
+            if move_type == "BlockOpenFour" and _scan_block_open_four(board, move, color) == 2:
+                moves[move_type].append(move)
+        board.undo_move(move)
+    for move_type in ("Win", "BlockWin", "OpenFour", "BlockOpenFour"):
+        if moves[move_type]:
+            return move_type, moves[move_type]
+    return "Random", legal_moves
+
+
+def _windows(board, move, n):
+    for line in board.get_nlines_contain_point(move, n):
+        for i in range(0, len(line) - n + 1):
+            yield line[i:i + n]
+
+
+def _scan_move(board, move, color):
+    opponent = GoBoardUtil.opponent(color)
+    for window in _windows(board, move, 5):
+        if np.all(window == color):
+            return "Win"
+    for window in _windows(board, move, 5):
+        if len(where1d(window == color)) == 1 and len(where1d(window == opponent)) == 4:
+            return "BlockWin"
+    for window in _windows(board, move, 6):
+        if window[0] == EMPTY and window[5] == EMPTY and np.all(window[1:5] == color):
+            return "OpenFour"
+    if _scan_block_open_four(board, move, color):
+        return "BlockOpenFour"
+    return None
+
+
+def _scan_block_open_four(board, move, color):
+    """
+    0 if move blocks no open four, 1 if it does, 2 if it does by
+    x.ooo.x, which the old scan listed twice.
+    """
+    special = [board.b_spe1, board.b_spe2, board.w_spe1, board.w_spe2]
+    for pattern in board.blockopen4[color - 1]:
+        for window in _windows(board, move, 6):
+            if np.array_equal(window, pattern):
+                if any(np.array_equal(pattern, s) for s in special):
+                    if board.size > 6:
+                        return _scan_block_open_four_more(board, move, color)
+                return 1
+    return 0
+
+
+def _scan_block_open_four_more(board, move, color):
+    for window in _windows(board, move, 7):
+        if np.array_equal(window, board.blockopen4_more[color - 1]):
+            return 2
+        for pattern in board.not_blockopen4[color - 1]:
+            if np.array_equal(window, pattern):
+                return 0
+    return 1
+
+
+class ThreatClassifierTestCase(unittest.TestCase):
+    """Tests for threat_classifier.py"""
+
+    def test_line_count(self):
+        # 7 rows, 7 columns and 5 diagonals of at least 5 points per direction
+        lines, point_lines = board_lines(7)
+        self.assertEqual(len(lines), 7 * 2 + 5 * 2)
+        goboard = GoBoard(7)
+        self.assertEqual(len(point_lines[goboard.pt(4, 4)]), 4)
+        self.assertEqual(len(point_lines[goboard.pt(1, 2)]), 3)
+
+    def test_win_before_block_win(self):
+        goboard = GoBoard(7)
+        for col in range(1, 5):
+            goboard.play_move(goboard.pt(1, col), BLACK)
+            goboard.play_move(goboard.pt(3, col), WHITE)
+        self.assertEqual(goboard.check_policy_moves(),
+                         ("Win", [goboard.pt(1, 5)]))
+        goboard.current_player = WHITE
+        self.assertEqual(goboard.check_policy_moves(),
+                         ("Win", [goboard.pt(3, 5)]))
+
+    def test_block_open_four_more(self):
+        goboard = GoBoard(7)
+        for col in range(3, 6):
+            goboard.play_move(goboard.pt(1, col), WHITE)
+        goboard.play_move(goboard.pt(1, 7), BLACK)
+        goboard.current_player = BLACK
+        # A1 makes x.ooo.x and is listed twice
+        a1, b1, f1 = goboard.pt(1, 1), goboard.pt(1, 2), goboard.pt(1, 6)
+        self.assertEqual(goboard.check_policy_moves(),
+                         ("BlockOpenFour", [a1, a1, b1, f1]))
+        goboard.play_move(a1, WHITE)
+        goboard.current_player = BLACK
+        self.assertEqual(goboard.check_policy_moves(), ("BlockWin", [b1]))
+        goboard.undo_move(a1)
+        goboard.current_player = BLACK
+        self.assertEqual(goboard.check_policy_moves(),
+                         ("BlockOpenFour", [a1, a1, b1, f1]))
+
+    def test_cache_matches_classifier(self):
+        rng = random.Random(455)
+        for size in (6, 7, 9):
+            goboard = GoBoard(size)
+            classifier = get_classifier(goboard)
+            played = []
+            for _ in range(3 * size * size):
+                empty = list(goboard.get_empty_points())
+                if played and (not empty or rng.random() < 0.3):
+                    goboard.undo_move(played.pop())
+                else:
+                    point = rng.choice(empty)
+                    goboard.play_move(point, goboard.current_player)
+                    played.append(point)
+                if rng.random() < 0.1:
+                    goboard = goboard.copy()
+                move_type, moves = goboard.check_policy_moves()
+                expected = classifier.policy_moves(goboard.board,
+                                                   goboard.current_player)
+                if expected[0] is None:
+                    expected = ("Random", list(goboard.get_empty_points()))
+                self.assertEqual((move_type, list(moves)), expected)
+
+    def test_classifier_matches_scan(self):
+        rng = random.Random(455)
+        for size in (6, 7, 9):
+            for _ in range(30):
+                goboard = GoBoard(size)
+                for _ in range(rng.randrange(size * size // 2)):
+                    empty = list(goboard.get_empty_points())
+                    goboard.play_move(rng.choice(empty), goboard.current_player)
+                move_type, moves = goboard.check_policy_moves()
+                self.assertEqual((move_type, list(moves)), scan_policy_moves(goboard))
+        # x.ooo.x, where both list A1 twice
+        goboard = GoBoard(7)
+        for col in range(3, 6):
+            goboard.play_move(goboard.pt(1, col), WHITE)
+        goboard.play_move(goboard.pt(1, 7), BLACK)
+        goboard.current_player = BLACK
+        move_type, moves = goboard.check_policy_moves()
+        self.assertEqual(scan_policy_moves(goboard), (move_type, list(moves)))
+        self.assertEqual(moves.count(goboard.pt(1, 1)), 2)
+
+
+"""Main"""
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,418 @@
+"""
+threat_classifier.py
+
+Window-table classifier for the rule-based policy of GoBoard.check_policy_moves.
+
+Every window of consecutive points on a row, column or diagonal is
+encoded as a base-3 integer of its colors (EMPTY=0, BLACK=1, WHITE=2,
+first point is the lowest digit). Precomputed tables say, for each code
+and each empty point of the window, whether playing there makes a Win,
+BlockWin, OpenFour or BlockOpenFour, so the move types of all empty
+points come from a few gathers over the window table instead of playing
+every move and scanning its lines.
+
+PolicyCache keeps the same move types per line for one board and only
+classifies the lines through the points that changed again.
+
+The board is the padded 1-dimensional array used by GoBoard,
+see GoBoardUtil.coord_to_point.
+"""
+
+import numpy as np
+from board_util import BLACK, WHITE, EMPTY, GoBoardUtil
+
+# the four line directions as (row, col) steps, in the order of
+# the lines returned by GoBoard.get_nlines_contain_point
+DIRECTIONS = [(0, 1), (1, 0), (1, 1), (1, -1)]
+
+# block_open_four table values
+SPECIAL = 1
+NORMAL = 2
+
+# block_open_four_more table values
+MORE = 1
+NOT_MORE = 2
+
+# categories of the marks of a line, see ThreatClassifier.line_marks
+WIN = 0
+BLOCK_WIN = 1
+OPEN_FOUR = 2
+BLOCK_OPEN_FOUR = 3
+BLOCK_OPEN_FOUR_SPECIAL = 4
+N_CATEGORIES = 5
+
+_window_cache = {}
+_line_cache = {}
+_classifier_cache = {}
+
+
+def window_points(size, length):
+    """
+    All windows of length consecutive on-board points, as a
+    (number of windows, length) array of padded board points,
+    and the index in DIRECTIONS of each window.
+    """
+    key = (size, length)
+    if key not in _window_cache:
+        NS = size + 1
+        windows = []
+        directions = []
+        for row in range(1, size + 1):
+            for col in range(1, size + 1):
+                for d, (dr, dc) in enumerate(DIRECTIONS):
+                    end_row = row + dr * (length - 1)
+                    end_col = col + dc * (length - 1)
+                    if end_row <= size and 1 <= end_col <= size:
+                        windows.append([(row + dr * i) * NS + col + dc * i
+                                        for i in range(length)])
+                        directions.append(d)
+        _window_cache[key] = (np.array(windows, dtype=np.intp).reshape(-1, length),
+                              np.array(directions, dtype=np.intp))
+    return _window_cache[key]
+
+def board_lines(size):
+    """
+    All rows, columns and diagonals of at least 5 points as a list of
+    (index in DIRECTIONS, points), and for each board point the ids of
+    the lines through it, in the order of DIRECTIONS.
+    """
+    if size not in _line_cache:
+        NS = size + 1
+        lines = []
+        point_lines = [[] for _ in range(size * size + 3 * NS)]
+        for d, (dr, dc) in enumerate(DIRECTIONS):
+            for row in range(1, size + 1):
+                for col in range(1, size + 1):
+                    if 1 <= row - dr <= size and 1 <= col - dc <= size:
+                        continue
+                    line = []
+                    r, c = row, col
+                    while 1 <= r <= size and 1 <= c <= size:
+                        line.append(r * NS + c)
+                        r, c = r + dr, c + dc
+                    if len(line) >= 5:
+                        for point in line:
+                            point_lines[point].append(len(lines))
+                        lines.append((d, line))
+        _line_cache[size] = (lines, point_lines)
+    return _line_cache[size]
+
+def decode(code, length):
+    """
+    The colors of a window code, first point first.
+    """
+    colors = []
+    for _ in range(length):
+        code, color = divmod(code, 3)
+        colors.append(color)
+    return colors
+
+def encode(colors):
+    return sum(int(color) * 3 ** i for i, color in enumerate(colors))
+
+
+class ThreatClassifier(object):
+    """
+    Window tables and move type tables for one board size.
+
+    Each table is indexed [color - 1][code][i] and describes playing
+    color on the empty i-th point of a window with the given code:
+    win:             the window becomes five of color
+    block_win:       the window holds four stones of the opponent
+    open_four:       the window becomes .xxxx.
+    block_open_four: NORMAL or SPECIAL if the window becomes one of
+                     the blockopen4 patterns, SPECIAL for the two
+                     patterns that also need block_open_four_more
+    block_open_four_more: MORE or NOT_MORE if the 7-window becomes
+                     the blockopen4_more or a not_blockopen4 pattern
+    """
+
+    def __init__(self, size, blockopen4, blockopen4_more, not_blockopen4, special):
+        self.size = size
+        self.windows5, _ = window_points(size, 5)
+        self.windows6, _ = window_points(size, 6)
+        self.windows7, directions7 = window_points(size, 7)
+        self.powers = 3 ** np.arange(7)
+
+        self.win = np.zeros((2, 3 ** 5, 5), dtype=bool)
+        self.block_win = np.zeros((2, 3 ** 5, 5), dtype=bool)
+        for code in range(3 ** 5):
+            colors = decode(code, 5)
+            if colors.count(EMPTY) != 1:
+                continue
+            i = colors.index(EMPTY)
+            for color in (BLACK, WHITE):
+                if colors.count(color) == 4:
+                    self.win[color - 1][code][i] = True
+                elif colors.count(GoBoardUtil.opponent(color)) == 4:
+                    self.block_win[color - 1][code][i] = True
+
+        self.open_four = np.zeros((2, 3 ** 6, 6), dtype=bool)
+        for code in range(3 ** 6):
+            colors = decode(code, 6)
+            middle = colors[1:5]
+            if colors[0] != EMPTY or colors[5] != EMPTY or middle.count(EMPTY) != 1:
+                continue
+            for color in (BLACK, WHITE):
+                if middle.count(color) == 3:
+                    self.open_four[color - 1][code][1 + middle.index(EMPTY)] = True
+
+        self.block_open_four = np.zeros((2, 3 ** 6, 6), dtype=np.int8)
+        self.block_open_four_more = np.zeros((2, 3 ** 7, 7), dtype=np.int8)
+        for color in (BLACK, WHITE):
+            for pattern in blockopen4[color - 1]:
+                kind = NORMAL
+                if any(np.array_equal(pattern, s) for s in special):
+                    kind = SPECIAL
+                self._add_pattern(self.block_open_four[color - 1], pattern, color, kind)
+            self._add_pattern(self.block_open_four_more[color - 1],
+                              blockopen4_more[color - 1], color, MORE)
+            for pattern in not_blockopen4[color - 1]:
+                self._add_pattern(self.block_open_four_more[color - 1],
+                                  pattern, color, NOT_MORE)
+
+        # block_open_four_more takes the first matching 7-window in the
+        # order of get_nlines_contain_point: by direction, then from the
+        # window where the move is last to the one where it is first
+        self.order7 = directions7[:, None] * 7 + (6 - np.arange(7))
+
+        # the same tables as lists of marks per code, for line_marks
+        self.marks5 = []
+        self.marks6 = []
+        self.marks7 = []
+        for c in range(2):
+            self.marks5.append(self._mark_lists(
+                [(WIN, self.win[c]), (BLOCK_WIN, self.block_win[c])]))
+            self.marks6.append(self._mark_lists(
+                [(OPEN_FOUR, self.open_four[c]),
+                 (BLOCK_OPEN_FOUR, self.block_open_four[c] == NORMAL),
+                 (BLOCK_OPEN_FOUR_SPECIAL, self.block_open_four[c] == SPECIAL)]))
+            more = self.block_open_four_more[c]
+            self.marks7.append(self._mark_lists(
+                [(MORE, more == MORE), (NOT_MORE, more == NOT_MORE)]))
+
+    @staticmethod
+    def _mark_lists(tables):
+        """
+        For each code, the tuple of (category, i) of the tables that
+        mark the i-th point of the window.
+        """
+        marks = [[] for _ in range(tables[0][1].shape[0])]
+        for category, table in tables:
+            for code, i in zip(*np.nonzero(table)):
+                marks[code].append((category, int(i)))
+        return [tuple(sorted(m, key=lambda mark: mark[1])) for m in marks]
+
+    @staticmethod
+    def _add_pattern(table, pattern, color, kind):
+        """
+        Mark every window that becomes pattern when color plays on one
+        of the pattern's color points.
+        """
+        for i, c in enumerate(pattern):
+            if c == color:
+                before = list(pattern)
+                before[i] = EMPTY
+                code = encode(before)
+                table[code][i] = max(table[code][i], kind)
+
+    def _codes(self, board, windows):
+        return board[windows] @ self.powers[:windows.shape[1]]
+
+    def _moves(self, board, windows, table):
+        """
+        Sorted points marked in table by any of windows.
+        """
+        marked = table[self._codes(board, windows)]
+        return np.unique(windows[marked])
+
+    def policy_moves(self, board, color):
+        """
+        The move type and moves of color on board, a padded 1d array of
+        colors. Move types are tried in the order Win, BlockWin, OpenFour,
+        BlockOpenFour and the first one with moves is returned.
+        Returns (None, []) if there is none.
+        """
+        c = color - 1
+        for move_type, windows, table in (("Win", self.windows5, self.win[c]),
+                                          ("BlockWin", self.windows5, self.block_win[c]),
+                                          ("OpenFour", self.windows6, self.open_four[c])):
+            if len(windows):
+                moves = self._moves(board, windows, table)
+                if len(moves):
+                    return move_type, moves.tolist()
+        if not len(self.windows6):
+            return None, []
+        kinds = self.block_open_four[c][self._codes(board, self.windows6)]
+        best = np.zeros(len(board), dtype=np.int8)
+        np.maximum.at(best, self.windows6.ravel(), kinds.ravel())
+        normal = np.flatnonzero(best == NORMAL)
+        special = np.flatnonzero(best == SPECIAL)
+        if self.size <= 6:
+            moves = np.union1d(normal, special).tolist()
+            return ("BlockOpenFour", moves) if moves else (None, [])
+        more = self._block_open_four_more(board, c, special)
+        return self._block_open_four_moves(np.union1d(normal, special).tolist(), more)
+
+    @staticmethod
+    def _block_open_four_moves(points, more):
+        """
+        The BlockOpenFour moves among the sorted points, given the
+        block_open_four_more value of the points of the special patterns.
+        """
+        moves = []
+        # a move accepted through the x.ooo.x pattern is listed twice,
+        # which doubles its weight in the rule-based simulations
+        for point in points:
+            if point in more:
+                if more[point] == MORE:
+                    moves.extend([point, point])
+                elif more[point] != NOT_MORE:
+                    moves.append(point)
+            else:
+                moves.append(point)
+        return ("BlockOpenFour", moves) if moves else (None, [])
+
+    def _block_open_four_more(self, board, c, points):
+        """
+        For each of points, the first decisive block_open_four_more
+        value of its 7-windows: MORE, NOT_MORE, or 0 if none decides.
+        """
+        result = {point: 0 for point in points.tolist()}
+        if not result or not len(self.windows7):
+            return result
+        kinds = self.block_open_four_more[c][self._codes(board, self.windows7)]
+        w, i = np.nonzero(kinds)
+        at = self.windows7[w, i]
+        for k in np.argsort(self.order7[w, i], kind="stable"):
+            point = int(at[k])
+            if point in result and result[point] == 0:
+                result[point] = kinds[w[k], i[k]]
+        return result
+
+    def line_marks(self, cells, line, color):
+        """
+        Classify the windows of one line of cells, the board as a list.
+        Returns the marks of the line as a tuple of (category, point),
+        and for each point the first decisive block_open_four_more value
+        of the 7-windows of the line.
+        """
+        c = color - 1
+        values = [cells[point] for point in line]
+        marks = []
+        for length, table in ((5, self.marks5[c]), (6, self.marks6[c])):
+            top = 3 ** (length - 1)
+            code = sum(values[k] * 3 ** k for k in range(length - 1)) * 3
+            for s in range(len(line) - length + 1):
+                code = code // 3 + values[s + length - 1] * top
+                for category, i in table[code]:
+                    marks.append((category, line[s + i]))
+        more = {}
+        if len(line) >= 7:
+            table = self.marks7[c]
+            code = sum(values[k] * 3 ** k for k in range(6)) * 3
+            for s in range(len(line) - 6):
+                code = code // 3 + values[s + 6] * 3 ** 6
+                for value, i in table[code]:
+                    more.setdefault(line[s + i], value)
+        return tuple(marks), more
+
+
+class PolicyCache(object):
+    """
+    Move types of one board, kept per line and color.
+
+    counts[color - 1][category] maps each point marked with category to
+    the number of marks it has, summed over all lines. Lines through a
+    changed point are marked dirty and classified again on the next
+    policy_moves call for that color.
+    """
+
+    def __init__(self, classifier):
+        self.classifier = classifier
+        self.lines, self.point_lines = board_lines(classifier.size)
+        n_lines = len(self.lines)
+        self.line_marks = [[()] * n_lines, [()] * n_lines]
+        self.line_more = [[{}] * n_lines, [{}] * n_lines]
+        self.counts = [[{} for _ in range(N_CATEGORIES)] for _ in range(2)]
+        self.dirty = [set(range(n_lines)), set(range(n_lines))]
+
+    def copy(self):
+        c = PolicyCache.__new__(PolicyCache)
+        c.classifier = self.classifier
+        c.lines = self.lines
+        c.point_lines = self.point_lines
+        c.line_marks = [list(marks) for marks in self.line_marks]
+        c.line_more = [list(more) for more in self.line_more]
+        c.counts = [[dict(count) for count in counts] for counts in self.counts]
+        c.dirty = [set(dirty) for dirty in self.dirty]
+        return c
+
+    def touch(self, point):
+        """
+        The color of point changed.
+        """
+        lines = self.point_lines[point]
+        self.dirty[0].update(lines)
+        self.dirty[1].update(lines)
+
+    def _update(self, board, c):
+        counts = self.counts[c]
+        cells = board.tolist()
+        line_marks = self.line_marks[c]
+        for line_id in self.dirty[c]:
+            marks, more = self.classifier.line_marks(
+                cells, self.lines[line_id][1], c + 1)
+            self.line_more[c][line_id] = more
+            if marks == line_marks[line_id]:
+                continue
+            for category, point in line_marks[line_id]:
+                if counts[category][point] == 1:
+                    del counts[category][point]
+                else:
+                    counts[category][point] -= 1
+            for category, point in marks:
+                counts[category][point] = counts[category].get(point, 0) + 1
+            line_marks[line_id] = marks
+        self.dirty[c].clear()
+
+    def policy_moves(self, board, color):
+        """
+        Same as ThreatClassifier.policy_moves for board, which must be
+        the board whose changes were passed to touch.
+        """
+        c = color - 1
+        if self.dirty[c]:
+            self._update(board, c)
+        counts = self.counts[c]
+        for move_type, category in (("Win", WIN), ("BlockWin", BLOCK_WIN),
+                                    ("OpenFour", OPEN_FOUR)):
+            if counts[category]:
+                return move_type, sorted(counts[category])
+        normal = counts[BLOCK_OPEN_FOUR]
+        points = sorted(set(normal).union(counts[BLOCK_OPEN_FOUR_SPECIAL]))
+        if self.classifier.size <= 6:
+            return ("BlockOpenFour", points) if points else (None, [])
+        more = {}
+        for point in points:
+            if point not in normal:
+                more[point] = 0
+                for line_id in self.point_lines[point]:
+                    value = self.line_more[c][line_id].get(point, 0)
+                    if value:
+                        more[point] = value
+                        break
+        return self.classifier._block_open_four_moves(points, more)
+
+
+def get_classifier(board):
+    """
+    Shared classifier for boards of the size of board, built from the
+    patterns of GoBoard.generate_pattern.
+    """
+    if board.size not in _classifier_cache:
+        _classifier_cache[board.size] = ThreatClassifier(
+            board.size, board.blockopen4, board.blockopen4_more,
+            board.not_blockopen4,
+            [board.b_spe1, board.b_spe2, board.w_spe1, board.w_spe2])
+    return _classifier_cache[board.size]
@@ -5,13 +5,16 @@
 from gtp_connection import GtpConnection
 from board_util import GoBoardUtil, EMPTY
 from simple_board import SimpleGoBoard
+from rollout_budget import RolloutBudget
+from rollout_pool import get_pool
+from search_control import SearchControl
+import rollout_kernel
 
 import random
 import numpy as np
 
 def undo(board,move):
-    board.board[move]=EMPTY
-    board.current_player=GoBoardUtil.opponent(board.current_player)
+    board.undo_move_gomoku(move)
 
 def play_move(board, move, color):
     board.play_move_gomoku(move, color)
@@ -33,11 +36,19 @@ class GomokuSimulationPlayer(object):
     then select the one with best win-rate.
     playout could be either random or rule_based (i.e., uses pre-defined patterns) 
     """
-    def __init__(self, n_simualtions_per_move=10, playout_policy='random', board_size=7):
+    def __init__(self, n_simualtions_per_move=10, playout_policy='random', board_size=7, budget='round_robin'):
         assert(playout_policy in ['random', 'rule_based'])
+        assert(budget in ['round_robin', 'ucb'])
         self.n_simualtions_per_move=n_simualtions_per_move
         self.board_size=board_size
         self.playout_policy=playout_policy
+        #round_robin: one playout per move in turn until the alarm
+        #ucb: playouts allocated by UCB1 until the time limit, see rollout_budget.py
+        self.budget=budget
+        #worker processes for the ucb budget, 0 runs the playouts here
+        self.workers=0
+        #True runs the playouts on plain lists, see rollout_kernel.py
+        self.fast_playout=False
 
         #NOTE: pattern has preference, later pattern is ignored if an earlier pattern is found
         self.pattern_list=['Win', 'BlockWin', 'OpenFour', 'BlockOpenFour', 'Random']
@@ -50,6 +61,19 @@ class GomokuSimulationPlayer(object):
         assert(playout_policy in ['random', 'rule_based'])
         self.playout_policy=playout_policy
 
+    def set_budget(self, budget='round_robin'):
+        assert(budget in ['round_robin', 'ucb'])
+        self.budget=budget
+
+    def set_workers(self, workers=0):
+        """
+        Use a pool of worker processes for the ucb budget,
+        started now so that it is ready for the next genmove.
+        """
+        assert(workers >= 0)
+        self.workers=workers
+        get_pool(workers)
+
     def _random_moves(self, board, color_to_play):
         return GoBoardUtil.generate_legal_moves_gomoku(board)
     
@@ -66,6 +90,8 @@ class GomokuSimulationPlayer(object):
             return self.pattern_list[movetype_id], moves
     
     def _do_playout(self, board, color_to_play):
+        if self.fast_playout:
+            return self._do_fast_playout(board, color_to_play)
         res=game_result(board)
         simulation_moves=[]
         while(res is None):
@@ -84,10 +110,31 @@ class GomokuSimulationPlayer(object):
             assert(res == GoBoardUtil.opponent(color_to_play))
             return -1.0
 
-    def get_move(self, board, color_to_play):
+    def _do_fast_playout(self, board, color_to_play):
+        """
+        Same as _do_playout, played by rollout_kernel.
+        """
+        res=game_result(board)
+        if res is None:
+            res, _ = rollout_kernel.playout(board,
+                use_patterns=(self.playout_policy=='rule_based'), use_zone=False)
+        if res == color_to_play:
+            return 1.0
+        elif res == 'draw':
+            return 0.0
+        else:
+            assert(res == GoBoardUtil.opponent(color_to_play))
+            return -1.0
+
+    def get_move(self, board, color_to_play, timelimit=None):
         """
         The genmove function called by gtp_connection
+        round_robin plays until timelimit seconds are nearly over,
+        see search_control.py, or forever without one
         """
+        if self.budget == 'ucb':
+            return self._get_move_ucb(board, timelimit)
+        control=SearchControl(timelimit)
         moves=GoBoardUtil.generate_legal_moves_gomoku(board)
         toplay=board.current_player
         best_result, best_move=-1.1, None
@@ -112,9 +159,48 @@ class GomokuSimulationPlayer(object):
                     best_move=move
                     self.best_move=best_move
                 undo(board, move)
+                if control.expired():
+                    return best_move
         assert(best_move is not None)
         return best_move
 
+    def _get_move_ucb(self, board, timelimit):
+        """
+        Flat MC with a time budget: playouts go to the most promising
+        moves, and the search stops early once the best move is clear.
+        A win, or a single move that blocks a win, is played at once.
+        """
+        toplay=board.current_player
+        pattern=board.get_pattern_moves()
+        if pattern is not None:
+            movetype_id, pattern_moves=pattern
+            if movetype_id == 0 or (movetype_id == 1 and len(pattern_moves) == 1):
+                self.best_move=pattern_moves[0]
+                return self.best_move
+        moves=GoBoardUtil.generate_legal_moves_gomoku(board)
+        self.best_move=moves[0]
+        if len(moves) == 1:
+            return self.best_move
+        budget=RolloutBudget(len(moves), timelimit, low=-1.0, high=1.0)
+        if self.workers > 0:
+            get_pool(self.workers).run(board, moves, budget, self._move_playout, (toplay,))
+            self.best_move=moves[budget.best()]
+            return self.best_move
+        while not budget.done():
+            i=budget.select()
+            budget.update(i, self._move_playout(board, moves[i], toplay))
+            self.best_move=moves[budget.best()]
+        return self.best_move
+
+    def _move_playout(self, board, move, color_to_play):
+        """
+        Result of one playout after color_to_play plays move, for color_to_play.
+        """
+        play_move(board, move, color_to_play)
+        ret=self._do_playout(board, color_to_play)
+        undo(board, move)
+        return ret
+
 def run():
     """
     start the gtp connection and wait for commands.
@@ -1,9 +1,9 @@
-from board_util import GoBoardUtil, BLACK, WHITE, EMPTY, BORDER
+from board_util import GoBoardUtil, BLACK, WHITE, EMPTY, BORDER, where1d
+from search_control import NodeBudget, BudgetExhausted
 #from profilehooks import profile
 
 def undo(board,move):
-    board.board[move]=EMPTY
-    board.current_player=GoBoardUtil.opponent(board.current_player)
+    board.undo_move_gomoku(move)
 
 def game_end(board):
     game_end, winner = board.check_game_end_gomoku()
@@ -15,8 +15,12 @@ def game_end(board):
         return 0
     return None
 
-def alphabeta(board,alpha,beta):
+def alphabeta(board,alpha,beta,stats=None,depth=0,control=None):
     #print(GoBoardUtil.get_twoD_board(board),alpha,beta)
+    if stats is not None:
+        stats.node(depth)
+    if control is not None:
+        control.check()
     result=game_end(board)
     if (result!=None):
         return result
@@ -24,20 +28,24 @@ def alphabeta(board,alpha,beta):
     if solvePoint:
         #print(solvePoint[0])
         board.play_move_gomoku(solvePoint[0],board.current_player)
-        result=-alphabeta(board,-beta,-alpha)
+        result=-alphabeta(board,-beta,-alpha,stats,depth+1,control)
         if(result>alpha):
             alpha=result
         undo(board,solvePoint[0])
         if(result>=beta):
+            if stats is not None:
+                stats.cutoff(0)
             return beta
     else:
-        for m in GoBoardUtil.generate_legal_moves_gomoku(board):
+        for i,m in enumerate(GoBoardUtil.generate_candidate_moves_gomoku(board)):
             board.play_move_gomoku(m,board.current_player)
-            result=-alphabeta(board,-beta,-alpha)
+            result=-alphabeta(board,-beta,-alpha,stats,depth+1,control)
             if(result>alpha):
                 alpha=result
             undo(board,m)
             if(result>=beta):
+                if stats is not None:
+                    stats.cutoff(i)
                 return beta
     return alpha
 
@@ -45,8 +53,12 @@ def alphabeta(board,alpha,beta):
 """
 if have winning move, return _,winning_move
 else return have_draw,"NoMove"
+control: optional SearchControl, checked at every node; the search
+raises SearchTimeout past its deadline, with moves left on board
 """
-def solve(board):
+def solve(board,stats=None,control=None):
+    if stats is not None:
+        stats.node(0)
     result=game_end(board)
     if (result!=None):
         return result,"First"
@@ -56,16 +68,16 @@ def solve(board):
     if solvePoint:
         #print(solvePoint[0])
         board.play_move_gomoku(solvePoint[0],board.current_player)
-        result=-alphabeta(board,-beta,-alpha)
+        result=-alphabeta(board,-beta,-alpha,stats,1,control)
         undo(board,solvePoint[0])
         if(result==1):
             return True,solvePoint[0]
         elif(result==0):
             haveDraw=True
     else: 
-        for m in GoBoardUtil.generate_legal_moves_gomoku(board):
+        for m in GoBoardUtil.generate_candidate_moves_gomoku(board):
             board.play_move_gomoku(m,board.current_player)
-            result=-alphabeta(board,-beta,-alpha)
+            result=-alphabeta(board,-beta,-alpha,stats,1,control)
             #print(GoBoardUtil.get_twoD_board(board))
             #print(result)
             undo(board,m)
@@ -75,6 +87,118 @@ def solve(board):
                 haveDraw=True
     return haveDraw,"NoMove"
 
+# result of solve_budget when the nodes ran out first
+UNKNOWN = None
+
+"""
+solve_two_pass within max_nodes nodes, for searches inside rollouts.
+Returns 1 win, 0 draw or -1 loss for the player to move, or UNKNOWN
+if the budget runs out first; the board is restored either way.
+"""
+def solve_budget(board,max_nodes,stats=None):
+    before=board.board.copy()
+    toplay=board.current_player
+    try:
+        result,move=solve_two_pass(board,stats,NodeBudget(max_nodes))
+    except BudgetExhausted:
+        for point in where1d(board.board!=before):
+            undo(board,point)
+        board.current_player=toplay
+        return UNKNOWN
+    if move=="First":
+        return result
+    if move=="NoMove":
+        return 0 if result else -1
+    return 1
+
+def tt_code(board,alpha):
+    """
+    Table key of the position for the bound alpha, from the Zobrist
+    hash of the board. Entries keep the full board to check it.
+    """
+    return board.hash,board.current_player,alpha
+
+def tt_lookup(tt,code,position,stats=None):
+    """
+    The value of position in tt, or None. An entry under code stored
+    by another position is a collision, and a miss.
+    """
+    entry=tt.get(code)
+    collision=entry is not None and entry[0]!=position
+    if stats is not None:
+        stats.probe(entry is not None and not collision,collision)
+    if entry is None or collision:
+        return None
+    return entry[1]
+
+def null_window(board,alpha,tt,stats=None,depth=0,control=None):
+    """
+    Boolean alphabeta with the null window (alpha, alpha+1).
+    Returns alpha+1 if the player to move can do better than alpha,
+    alpha otherwise. tt keeps one entry per (position, alpha), so the
+    win pass and the draw pass share the table with separate bounds;
+    an entry is the board it was stored for and the value.
+    """
+    beta=alpha+1
+    if stats is not None:
+        stats.node(depth)
+    if control is not None:
+        control.check()
+    result=game_end(board)
+    if (result!=None):
+        return beta if result>=beta else alpha
+    code=tt_code(board,alpha)
+    position=board.board.tobytes()
+    value=tt_lookup(tt,code,position,stats)
+    if value is not None:
+        return value
+    solvePoint=board.list_solve_point()
+    if solvePoint:
+        moves=solvePoint[:1]
+    else:
+        moves=GoBoardUtil.generate_candidate_moves_gomoku(board)
+    for i,m in enumerate(moves):
+        board.play_move_gomoku(m,board.current_player)
+        result=-null_window(board,-beta,tt,stats,depth+1,control)
+        undo(board,m)
+        if(result>=beta):
+            if stats is not None:
+                stats.cutoff(i)
+            tt[code]=position,beta
+            return beta
+    tt[code]=position,alpha
+    return alpha
+
+"""
+same results as solve, but proves in two null-window passes:
+first "is this a win", then "is this at least a draw"
+"""
+def solve_two_pass(board,stats=None,control=None):
+    if stats is not None:
+        stats.node(0)
+    result=game_end(board)
+    if (result!=None):
+        return result,"First"
+    tt={}
+    solvePoint=board.list_solve_point()
+    if solvePoint:
+        moves=solvePoint[:1]
+    else:
+        moves=GoBoardUtil.generate_candidate_moves_gomoku(board)
+    for m in moves:
+        board.play_move_gomoku(m,board.current_player)
+        result=-null_window(board,-1,tt,stats,1,control)
+        undo(board,m)
+        if(result==1):
+            return True,m
+    for m in moves:
+        board.play_move_gomoku(m,board.current_player)
+        result=-null_window(board,0,tt,stats,1,control)
+        undo(board,m)
+        if(result==0):
+            return True,"NoMove"
+    return False,"NoMove"
+
 
     """
 
@@ -0,0 +1,47 @@
+#!/usr/local/bin/python3
+# /usr/bin/python3
+# Set the path to your python3 above
+
+"""
+benchmark_rollouts.py
+
+Playouts per second of GomokuSimulationPlayer._do_playout for both
+playout policies, played on the board and by rollout_kernel.
+
+usage: python3 benchmark_rollouts.py [size] [seconds]
+"""
+
+import random
+import sys
+import time
+
+from Gomoku3 import GomokuSimulationPlayer
+from simple_board import SimpleGoBoard
+
+
+def rate(player, board, seconds):
+    count = 0
+    start = time.time()
+    while time.time() - start < seconds:
+        player._do_playout(board, board.current_player)
+        count += 1
+    return count / (time.time() - start)
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 7
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 5.0
+    random.seed(455)
+    board = SimpleGoBoard(size)
+    for policy in ('random', 'rule_based'):
+        player = GomokuSimulationPlayer(playout_policy=policy, board_size=size)
+        player.fast_playout = False
+        old = rate(player, board, seconds)
+        player.fast_playout = True
+        new = rate(player, board, seconds)
+        print("{} {}x{}: board {:.0f}/s, kernel {:.0f}/s, {:.1f}x".format(
+            policy, size, size, old, new, new / old))
+
+
+if __name__ == "__main__":
+    main()
@@ -12,7 +12,8 @@ from board_util import GoBoardUtil, BLACK, WHITE, EMPTY, BORDER, PASS, \
                        MAXSIZE, coord_to_point
 import numpy as np
 import re
-import signal
+from solve_stats import SolveStats
+from search_control import SearchControl, SearchTimeout
 
 class GtpConnection():
 
@@ -30,7 +31,6 @@ class GtpConnection():
         self._debug_mode = debug_mode
         self.go_engine = go_engine
         self.board = board
-        signal.signal(signal.SIGALRM, self.handler)
         self.commands = {
             "protocol_version": self.protocol_version_cmd,
             "quit": self.quit_cmd,
@@ -54,11 +54,21 @@ class GtpConnection():
             "gogui-analyze_commands": self.gogui_analyze_cmd,
             "timelimit": self.timelimit_cmd,
             "solve": self.solve_cmd,
+            "solve_mode": self.solve_mode_cmd,
+            "solve_stats": self.solve_stats_cmd,
             "list_solve_point": self.list_solve_point_cmd, # below is added for Gomoku3
             "policy": self.set_playout_policy, 
-            "policy_moves": self.display_pattern_moves
+            "policy_moves": self.display_pattern_moves,
+            "budget": self.set_budget,
+            "workers": self.set_workers
         }
         self.timelimit=2
+        # "two_pass" proves win, then draw, with null-window searches
+        # "full" searches every move with the window (-1, 1)
+        self.solve_mode="two_pass"
+        # solver counters, off by default
+        self.collect_stats=False
+        self.last_stats=None
 
         # used for argument checking
         # values: (required number of arguments, 
@@ -70,7 +80,10 @@ class GtpConnection():
             "genmove": (1, 'Usage: genmove {w,b}'),
             "play": (2, 'Usage: play {b,w} MOVE'),
             "legal_moves": (1, 'Usage: legal_moves {w,b}'),
-            "policy":(1, 'Usage: set playout policy {random, rule_based}')
+            "policy":(1, 'Usage: set playout policy {random, rule_based}'),
+            "solve_mode":(1, 'Usage: solve_mode {full, two_pass}'),
+            "budget":(1, 'Usage: budget {round_robin, ucb}'),
+            "workers":(1, 'Usage: workers INT')
         }
     
     def set_playout_policy(self, args):
@@ -78,6 +91,20 @@ class GtpConnection():
         self.go_engine.set_playout_policy(playout_policy)
         self.respond()
 
+    def set_budget(self, args):
+        if args[0] not in ['round_robin', 'ucb']:
+            self.error('Usage: budget {round_robin, ucb}')
+            return
+        self.go_engine.set_budget(args[0])
+        self.respond()
+
+    def set_workers(self, args):
+        if not args[0].isdigit():
+            self.error('Usage: workers INT')
+            return
+        self.go_engine.set_workers(int(args[0]))
+        self.respond()
+
     def display_pattern_moves(self, args):
         game_end, winner = self.board.check_game_end_gomoku()
         color=self.board.current_player
@@ -284,17 +311,38 @@ class GtpConnection():
         self.timelimit = args[0]
         self.respond('')
 
-    def handler(self, signum, fram):
-        self.board = self.sboard
-        raise Exception("unknown")
+    def solve_mode_cmd(self, args):
+        if args[0] not in ['full', 'two_pass']:
+            self.error('Usage: solve_mode {full, two_pass}')
+            return
+        self.solve_mode=args[0]
+        self.respond()
+
+    def solve_stats_cmd(self, args):
+        """
+        solve_stats on|off: turn the solver counters on or off
+        solve_stats: report the counters of the last solve
+        """
+        if len(args) > 1 or (args and args[0] not in ['on', 'off']):
+            self.error('Usage: solve_stats [on|off]')
+            return
+        if args:
+            self.collect_stats = args[0] == 'on'
+            self.respond()
+            return
+        if self.last_stats is None:
+            self.error('no solve statistics, use solve_stats on')
+            return
+        self.respond(self.last_stats.report())
 
     def solve_cmd(self, args):
+        stats = None
+        if self.collect_stats:
+            stats = SolveStats()
+            self.last_stats = stats
+        control = SearchControl(float(self.timelimit))
         try:
-            self.sboard = self.board.copy()
-            signal.alarm(int(self.timelimit)-1)
-            winner,move = self.board.solve()
-            self.board = self.sboard
-            signal.alarm(0)
+            winner,move = self.board.copy().solve(self.solve_mode, stats, control)
             if move != "NoMove":
                 if move == None:
                     self.respond('{} {}'.format(winner, self.board._point_to_coord(move)))
@@ -302,8 +350,13 @@ class GtpConnection():
                 self.respond('{} {}'.format(winner, format_point(point_to_coord(move, self.board.size))))
                 return 
             self.respond('{}'.format(winner))
+        except SearchTimeout:
+            self.respond('unknown')
         except Exception as e:
             self.respond('{}'.format(str(e)))
+        finally:
+            if stats is not None:
+                stats.stop()
 
     def genmove_cmd(self, args):
         """
@@ -323,15 +376,7 @@ class GtpConnection():
         if board_is_full:
             self.respond("pass")
             return
-        move=None
-        try:
-            signal.alarm(int(self.timelimit))
-            self.sboard = self.board.copy()
-            move = self.go_engine.get_move(self.board, color)
-            self.board=self.sboard
-            signal.alarm(0)
-        except Exception as e:
-            move=self.go_engine.best_move
+        move = self.go_engine.get_move(self.board, color, float(self.timelimit))
 
         if move == PASS:
             self.respond("pass")
@@ -0,0 +1,214 @@
+"""
+pattern_automaton.py
+
+Aho-Corasick automaton for the Gomoku move patterns of SimpleGoBoard.
+
+Patterns are strings over '.' (EMPTY), 'x' (player to move),
+'o' (opponent) and 'B' (BORDER). A pattern list is a list of dicts, one
+per priority class, mapping each pattern to the set of its move points,
+given as the distance back from the last character of the pattern.
+
+The patterns are compiled once into a transition table per color,
+indexed directly by the board values, and the automaton is run over
+every line of the padded board: a row, column or diagonal together with
+the border point at each end. 'B' only appears at the ends of patterns,
+so no match runs across a border.
+
+PatternCache keeps the matches of each line for one board and only
+runs the automaton again on the lines through the points that changed.
+"""
+
+from board_util import GoBoardUtil, BLACK, WHITE, EMPTY, BORDER
+
+ALPHABET = '.xoB'
+
+# steps along a row, a column and the two diagonals, in units of NS
+DIRECTIONS = [(1, 0), (0, 1), (1, 1), (-1, 1)]
+
+_line_cache = {}
+
+
+def board_lines(NS, maxpoint):
+    """
+    All lines of a padded board as a list of (step, points), each a
+    run of on-board points with the border point before and after it,
+    and for each board point the ids of the lines through it.
+    """
+    key = (NS, maxpoint)
+    if key not in _line_cache:
+        size = NS - 1
+        def on_board(point):
+            row, col = divmod(point, NS)
+            return 1 <= row <= size and 1 <= col <= size
+        lines = []
+        point_lines = [[] for _ in range(maxpoint)]
+        for dx, dy in DIRECTIONS:
+            step = dx + dy * NS
+            for point in range(maxpoint):
+                if not on_board(point) or on_board(point - step):
+                    continue
+                line = [point - step]
+                while on_board(point):
+                    point_lines[point].append(len(lines))
+                    line.append(point)
+                    point += step
+                line.append(point)
+                lines.append((step, line))
+        _line_cache[key] = (lines, point_lines)
+    return _line_cache[key]
+
+
+class PatternAutomaton(object):
+    """
+    Compiled automaton for one pattern list.
+
+    delta[color - 1][state * 4 + value] is the next state after reading
+    a point of board value from state, for the player color.
+    output[state] lists (priority class, distance) for every pattern
+    that ends in state.
+    """
+
+    def __init__(self, pattern_list):
+        self.n_classes = len(pattern_list)
+        goto = [{}]
+        output = [[]]
+        for i, patterns in enumerate(pattern_list):
+            for pattern, distances in patterns.items():
+                state = 0
+                for char in pattern:
+                    if char not in goto[state]:
+                        goto[state][char] = len(goto)
+                        goto.append({})
+                        output.append([])
+                    state = goto[state][char]
+                output[state].extend((i, dis) for dis in sorted(distances))
+
+        # breadth-first failure links, folded into a full transition table
+        n_states = len(goto)
+        fail = [0] * n_states
+        table = [[0] * len(ALPHABET) for _ in range(n_states)]
+        queue = []
+        for a, char in enumerate(ALPHABET):
+            if char in goto[0]:
+                table[0][a] = goto[0][char]
+                queue.append(goto[0][char])
+        while queue:
+            state = queue.pop(0)
+            output[state].extend(output[fail[state]])
+            for a, char in enumerate(ALPHABET):
+                if char in goto[state]:
+                    child = goto[state][char]
+                    fail[child] = table[fail[state]][a]
+                    table[state][a] = child
+                    queue.append(child)
+                else:
+                    table[state][a] = table[fail[state]][a]
+        self.output = output
+
+        self.delta = []
+        for color in (BLACK, WHITE):
+            symbol = {EMPTY: '.', color: 'x',
+                      GoBoardUtil.opponent(color): 'o', BORDER: 'B'}
+            order = [ALPHABET.index(symbol[value])
+                     for value in (EMPTY, BLACK, WHITE, BORDER)]
+            self.delta.append([table[state][a]
+                               for state in range(n_states) for a in order])
+
+    def match_line(self, cells, step, line, color):
+        """
+        Matches on one line of cells, the board as a list, as a tuple
+        of (priority class, move point).
+        """
+        delta = self.delta[color - 1]
+        output = self.output
+        matches = []
+        state = 0
+        for point in line:
+            state = delta[state * 4 + cells[point]]
+            if output[state]:
+                for i, dis in output[state]:
+                    matches.append((i, point - dis * step))
+        return tuple(matches)
+
+    def match(self, board, color):
+        """
+        Run the automaton over all lines of board for color.
+        Returns one set of move points per priority class.
+        """
+        move_sets = [set() for _ in range(self.n_classes)]
+        cells = board.board.tolist()
+        lines, _ = board_lines(board.NS, len(cells))
+        for step, line in lines:
+            for i, point in self.match_line(cells, step, line, color):
+                move_sets[i].add(point)
+        return move_sets
+
+
+class PatternCache(object):
+    """
+    Matches of one automaton on one board, kept per line and color.
+
+    counts[color - 1][i] maps each move point of priority class i to
+    the number of matches that give it, summed over all lines, so the
+    move sets are its keys. Lines through a changed point are marked
+    dirty and matched again on the next move_sets call for that color.
+    """
+
+    def __init__(self, automaton, NS, maxpoint):
+        self.automaton = automaton
+        self.lines, self.point_lines = board_lines(NS, maxpoint)
+        n_lines = len(self.lines)
+        self.line_matches = [[()] * n_lines, [()] * n_lines]
+        self.counts = [[{} for _ in range(automaton.n_classes)] for _ in range(2)]
+        self.dirty = [set(range(n_lines)), set(range(n_lines))]
+
+    def copy(self):
+        c = PatternCache.__new__(PatternCache)
+        c.automaton = self.automaton
+        c.lines = self.lines
+        c.point_lines = self.point_lines
+        c.line_matches = [list(matches) for matches in self.line_matches]
+        c.counts = [[dict(count) for count in counts] for counts in self.counts]
+        c.dirty = [set(dirty) for dirty in self.dirty]
+        return c
+
+    def touch(self, point):
+        """
+        The color of point changed.
+        """
+        lines = self.point_lines[point]
+        self.dirty[0].update(lines)
+        self.dirty[1].update(lines)
+
+    def move_sets(self, board, color):
+        """
+        Bring the lines of color up to date with board and return
+        counts[color - 1], one dict of move points per priority class.
+        """
+        if self.dirty[color - 1]:
+            return self.cell_move_sets(board.tolist(), color)
+        return self.counts[color - 1]
+
+    def cell_move_sets(self, cells, color):
+        """
+        Same as move_sets, for the board as a list.
+        """
+        c = color - 1
+        counts = self.counts[c]
+        if self.dirty[c]:
+            line_matches = self.line_matches[c]
+            for line_id in self.dirty[c]:
+                step, line = self.lines[line_id]
+                matches = self.automaton.match_line(cells, step, line, color)
+                if matches == line_matches[line_id]:
+                    continue
+                for i, point in line_matches[line_id]:
+                    if counts[i][point] == 1:
+                        del counts[i][point]
+                    else:
+                        counts[i][point] -= 1
+                for i, point in matches:
+                    counts[i][point] = counts[i].get(point, 0) + 1
+                line_matches[line_id] = matches
+            self.dirty[c].clear()
+        return counts
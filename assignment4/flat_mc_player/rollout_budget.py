@@ -0,0 +1,106 @@
+"""
+rollout_budget.py
+
+Time-budgeted allocation of flat Monte Carlo rollouts.
+
+Each candidate move is an arm of a bandit. The next rollout goes to the
+move with the highest UCB1 value, and the search stops at the deadline,
+or as soon as the lower confidence bound of the best move is above the
+upper confidence bound of every other move. The deadline is on the
+monotonic clock, so a change of the system clock does not move it.
+"""
+
+import math
+import time
+
+"""
+Seconds kept between the deadline and the time limit,
+to play the move and answer.
+"""
+TIME_MARGIN = 0.2
+
+"""
+UCB1 exploration constant, for rewards scaled to [0, 1].
+"""
+EXPLORATION = math.sqrt(2)
+
+"""
+Error probability of the Hoeffding bounds used to stop early.
+"""
+DELTA = 0.01
+
+
+class RolloutBudget(object):
+    """
+    Rollout statistics of the candidate moves of one genmove.
+    Rewards are in [low, high].
+    """
+
+    def __init__(self, n_moves, timelimit=None, low=0.0, high=1.0):
+        """
+        timelimit: seconds from now, or None to never run out of time
+        """
+        self.n_moves = n_moves
+        self.low = low
+        self.scale = high - low
+        self.wins = [0.0] * n_moves
+        self.visits = [0] * n_moves
+        self.total = 0
+        self.deadline = None
+        if timelimit is not None:
+            self.deadline = time.monotonic() + max(timelimit - TIME_MARGIN, 0)
+        self._log_term = math.log(2 * n_moves / DELTA)
+
+    def mean(self, i):
+        """
+        Mean reward of move i, scaled to [0, 1].
+        """
+        return (self.wins[i] / self.visits[i] - self.low) / self.scale
+
+    def select(self):
+        """
+        Index of the move to simulate next.
+        """
+        for i in range(self.n_moves):
+            if self.visits[i] == 0:
+                return i
+        log_total = math.log(self.total)
+        return max(range(self.n_moves), key=lambda i: self.mean(i)
+                   + EXPLORATION * math.sqrt(log_total / self.visits[i]))
+
+    def update(self, i, reward, n=1):
+        """
+        Add n rollouts of move i with a total reward of reward.
+        """
+        self.wins[i] += reward
+        self.visits[i] += n
+        self.total += n
+
+    def best(self):
+        """
+        Index of the move with the best mean reward, most visits on ties.
+        """
+        visited = [i for i in range(self.n_moves) if self.visits[i]]
+        if not visited:
+            return 0
+        return max(visited, key=lambda i: (self.mean(i), self.visits[i]))
+
+    def _radius(self, i):
+        return math.sqrt(self._log_term / (2 * self.visits[i]))
+
+    def separated(self):
+        """
+        Whether the best move is better than all others
+        with high confidence.
+        """
+        if 0 in self.visits:
+            return False
+        best = self.best()
+        lower = self.mean(best) - self._radius(best)
+        return all(self.mean(i) + self._radius(i) < lower
+                   for i in range(self.n_moves) if i != best)
+
+    def done(self):
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            return True
+        return self.separated()
@@ -0,0 +1,128 @@
+"""
+rollout_pool.py
+
+Persistent pool of rollout worker processes for the flat MC players.
+
+The root board of a genmove is sent once to every worker. The parent
+then hands out batches of rollouts for single moves, chosen by a
+RolloutBudget, and merges the (move, total reward, rollouts) results the
+workers stream back until the budget is done. The workers, and the
+boards and tables they have built, stay alive between genmoves.
+"""
+
+import multiprocessing
+import queue
+import random
+import time
+
+import numpy as np
+
+"""
+Rollouts per batch sent to a worker.
+"""
+BATCH_SIZE = 4
+
+_pool = None
+
+
+def _worker(worker_id, tasks, results, seed):
+    """
+    Worker loop. Tasks are
+    ('root', generation, board, moves, simulate, args): the new root
+    ('run', generation, i, n): n rollouts of moves[i]
+    ('stop',)
+    Workers are forked with the numpy random state of the parent,
+    so each seeds random and np.random with its own seed first.
+    """
+    random.seed(seed)
+    np.random.seed(seed)
+    while True:
+        task = tasks.get()
+        if task[0] == 'stop':
+            return
+        if task[0] == 'root':
+            _, generation, board, moves, simulate, args = task
+            continue
+        _, generation, i, n = task
+        reward = 0.0
+        for _ in range(n):
+            reward += simulate(board, moves[i], *args)
+        results.put((generation, worker_id, i, reward, n))
+
+
+class RolloutPool(object):
+
+    def __init__(self, n_workers, batch_size=BATCH_SIZE):
+        self.n_workers = n_workers
+        self.batch_size = batch_size
+        self.generation = 0
+        self.results = multiprocessing.Queue()
+        self.tasks = []
+        self.processes = []
+        for worker_id in range(n_workers):
+            tasks = multiprocessing.Queue()
+            process = multiprocessing.Process(
+                target=_worker,
+                args=(worker_id, tasks, self.results, random.getrandbits(32)),
+                daemon=True)
+            process.start()
+            self.tasks.append(tasks)
+            self.processes.append(process)
+
+    def close(self):
+        for tasks in self.tasks:
+            tasks.put(('stop',))
+        for process in self.processes:
+            process.join(1)
+            if process.is_alive():
+                process.terminate()
+
+    def run(self, board, moves, budget, simulate, args=()):
+        """
+        Run rollouts until budget.done() or its deadline.
+        simulate(board, move, *args) returns the reward of one rollout
+        and must not change board. simulate, args and board are pickled
+        to the workers.
+        """
+        self.generation += 1
+        generation = self.generation
+        for tasks in self.tasks:
+            tasks.put(('root', generation, board, moves, simulate, args))
+        # every move gets a batch before UCB1 chooses
+        unassigned = list(range(len(moves)))
+
+        def assign(worker_id):
+            i = unassigned.pop(0) if unassigned else budget.select()
+            self.tasks[worker_id].put(('run', generation, i, self.batch_size))
+
+        for worker_id in range(self.n_workers):
+            assign(worker_id)
+        while True:
+            timeout = None
+            if budget.deadline is not None:
+                timeout = max(budget.deadline - time.monotonic(), 0)
+            try:
+                result = self.results.get(timeout=timeout)
+            except queue.Empty:
+                return
+            result_generation, worker_id, i, reward, n = result
+            # batches of an earlier genmove that finished late
+            if result_generation != generation:
+                continue
+            budget.update(i, reward, n)
+            if budget.done():
+                return
+            assign(worker_id)
+
+
+def get_pool(n_workers):
+    """
+    The shared pool, restarted if the number of workers changed.
+    """
+    global _pool
+    if _pool is not None and _pool.n_workers != n_workers:
+        _pool.close()
+        _pool = None
+    if _pool is None and n_workers > 0:
+        _pool = RolloutPool(n_workers)
+    return _pool
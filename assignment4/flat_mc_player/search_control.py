@@ -0,0 +1,102 @@
+"""
+search_control.py
+
+Cooperative time control for the searches.
+
+A SearchControl holds a deadline on the monotonic clock. The searches
+check it themselves, between playouts or at each solver node, where the
+board is in a consistent state, instead of being interrupted by a
+SIGALRM exception wherever they happen to be. Another thread can also
+end the search early with stop.
+
+A NodeBudget is checked the same way, but limits the number of nodes
+instead of the time, for searches that must stay small.
+"""
+
+import time
+
+"""
+Seconds kept between the deadline and the time limit,
+to stop the search, choose the move and answer.
+"""
+SAFETY_MARGIN = 0.5
+
+
+class SearchTimeout(Exception):
+    """
+    Raised by SearchControl.check once the deadline has passed.
+    """
+
+
+class BudgetExhausted(SearchTimeout):
+    """
+    Raised by NodeBudget.check once the nodes are used up.
+    """
+
+
+class NodeBudget(object):
+
+    def __init__(self, max_nodes):
+        self.max_nodes = max_nodes
+        self.nodes = 0
+
+    def check(self):
+        """
+        Count a node, raise BudgetExhausted past max_nodes.
+        """
+        self.nodes += 1
+        if self.nodes > self.max_nodes:
+            raise BudgetExhausted()
+
+
+class SearchControl(object):
+
+    def __init__(self, timelimit=None, margin=SAFETY_MARGIN):
+        """
+        timelimit: seconds from now, or None to never run out of time
+        """
+        self.start = time.monotonic()
+        self.deadline = None
+        if timelimit is not None:
+            self.deadline = self.start + max(timelimit - margin, 0)
+        self.stopped = False
+
+    def stop(self):
+        """
+        Expire now, whatever the deadline.
+        """
+        self.stopped = True
+
+    def remaining(self):
+        """
+        Seconds left until the deadline, None without one.
+        """
+        if self.stopped:
+            return 0
+        if self.deadline is None:
+            return None
+        return max(self.deadline - time.monotonic(), 0)
+
+    def expired(self):
+        if self.stopped:
+            return True
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def check(self):
+        """
+        Raise SearchTimeout if the deadline has passed.
+        """
+        if self.expired():
+            raise SearchTimeout()
+
+    def decided(self, first, second, playouts):
+        """
+        Whether a move with first visits can no longer be overtaken by
+        one with second visits, if the playouts left until the deadline
+        come at the rate of the playouts done so far.
+        """
+        if self.deadline is None or playouts == 0:
+            return False
+        now = time.monotonic()
+        rate = playouts / max(now - self.start, 1e-6)
+        return first - second > rate * max(self.deadline - now, 0)
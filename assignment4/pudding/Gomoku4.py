@@ -7,9 +7,15 @@ from board_util import GoBoardUtil, EMPTY
 from simple_board import SimpleGoBoard
 
 import math
+import threading
 import numpy as np
 
 from mcts import MCTS
+from transposition_mcts import TranspositionMCTS
+import root_parallel
+import leaf_parallel
+from opening_book import load_book
+from search_control import SearchControl
 
 class Gomoku_MCTSBased_Player(object):
 
@@ -18,17 +24,102 @@ class Gomoku_MCTSBased_Player(object):
         self.exploration = math.sqrt(2)
         self.name = "Gomoku4"
         self.version = 4.0
+        # kept between moves, the search continues from the new position
+        self.mcts = MCTS()
+        # serial search on a transposition table, see set_transpositions
+        self.transpositions = False
+        # search during the opponent's turn, see start_pondering
+        self.ponder = False
+        self._ponder_thread = None
+        self._ponder_control = None
      
-    def get_move(self, board, color_to_play):
-        mcts = MCTS()
-        return mcts.get_move(board, color_to_play, self.exploration)
+    def set_workers(self, workers=0):
+        """
+        Search with a root-parallel pool of worker processes,
+        started now so that it is ready for the next genmove.
+        """
+        assert(workers >= 0)
+        assert(workers == 0 or not self.transpositions)
+        self.stop_pondering()
+        self.mcts.workers = workers
+        root_parallel.get_pool(workers)
+
+    def set_leaf_parallel(self, batch_size=1, workers=0):
+        """
+        Select batch_size leaves per playout under virtual loss and
+        run their rollouts on a pool of worker processes, 0 runs them
+        here in turn.
+        """
+        assert(batch_size >= 1 and workers >= 0)
+        assert(not self.transpositions or (batch_size == 1 and workers == 0))
+        self.stop_pondering()
+        self.mcts.batch_size = batch_size
+        self.mcts.rollout_workers = workers
+        leaf_parallel.get_pool(workers)
+
+    def is_parallel(self):
+        """
+        Whether root-parallel or leaf-parallel search is set.
+        """
+        return (self.mcts.workers > 0 or self.mcts.batch_size > 1
+                or self.mcts.rollout_workers > 0)
+
+    def set_transpositions(self, on=True):
+        """
+        Search on a transposition table, see transposition_mcts.py,
+        or on the tree of mcts.py. Starts a new search either way.
+        The table is searched serially only, so parallel search must
+        be off to turn it on.
+        """
+        assert(not on or not self.is_parallel())
+        self.stop_pondering()
+        self.mcts = TranspositionMCTS() if on else MCTS()
+        self.transpositions = on
+
+    def set_ponder(self, on=True):
+        self.stop_pondering()
+        self.ponder = on
+
+    def start_pondering(self, board, color_to_play):
+        """
+        If pondering, keep searching board, with the opponent
+        color_to_play to move, in a background thread until
+        stop_pondering. The next get_move continues from the subtree of
+        the move the opponent actually played. Root-parallel searches
+        keep their trees in the workers and are not pondered.
+        """
+        if not self.ponder or self.mcts.root_parallel():
+            return
+        if board.check_game_end_gomoku()[0] or len(board.get_empty_points()) == 0:
+            return
+        self.stop_pondering()
+        self._ponder_control = SearchControl()
+        self._ponder_thread = threading.Thread(
+            target=self.mcts.search,
+            args=(board.copy(), color_to_play, self.exploration, self._ponder_control),
+            daemon=True)
+        self._ponder_thread.start()
+
+    def stop_pondering(self):
+        """
+        Stop the background search after its current playout.
+        """
+        if self._ponder_thread is None:
+            return
+        self._ponder_control.stop()
+        self._ponder_thread.join()
+        self._ponder_thread = None
+        self._ponder_control = None
+
+    def get_move(self, board, color_to_play, timelimit=None):
+        return self.mcts.get_move(board, color_to_play, self.exploration, timelimit)
 
 def run():
     """
     start the gtp connection and wait for commands.
     """
     board = SimpleGoBoard(7)
-    con = GtpConnection(Gomoku_MCTSBased_Player(), board)
+    con = GtpConnection(Gomoku_MCTSBased_Player(), board, book=load_book())
     con.start_connection()
 
 if __name__=='__main__':
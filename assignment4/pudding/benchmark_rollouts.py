@@ -0,0 +1,52 @@
+#!/usr/local/bin/python3
+# /usr/bin/python3
+# Set the path to your python3 above
+
+"""
+benchmark_rollouts.py
+
+Rollouts per second of MCTS._evaluate_rollout, played on the board and
+by rollout_kernel, from the empty board and from a few opening moves.
+
+usage: python3 benchmark_rollouts.py [size] [seconds]
+"""
+
+import random
+import sys
+import time
+
+import mcts
+from board_util import BLACK
+from simple_board import SimpleGoBoard
+
+
+def rate(board, seconds):
+    player = mcts.MCTS()
+    count = 0
+    start = time.time()
+    while time.time() - start < seconds:
+        player._evaluate_rollout(board.copy(), board.current_player)
+        count += 1
+    return count / (time.time() - start)
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 7
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 5.0
+    random.seed(455)
+    board = SimpleGoBoard(size)
+    opening = board.copy()
+    for _ in range(4):
+        move = random.choice(opening.get_candidate_moves())
+        opening.play_move_gomoku(move, opening.current_player)
+    for name, position in (("empty", board), ("opening", opening)):
+        mcts.FAST_ROLLOUT = False
+        old = rate(position, seconds)
+        mcts.FAST_ROLLOUT = True
+        new = rate(position, seconds)
+        print("{} {}x{}: board {:.0f}/s, kernel {:.0f}/s, {:.1f}x".format(
+            name, size, size, old, new, new / old))
+
+
+if __name__ == "__main__":
+    main()
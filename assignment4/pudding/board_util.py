@@ -33,6 +33,13 @@ To support larger boards the coordinate printing needs to be changed.
 """
 MAXSIZE = 25
 
+"""
+Default radius of the candidate-move zone kept by the board.
+Empty points within this many rows/columns of a stone are candidates.
+A radius of 0 turns the zone off, so every empty point is a candidate.
+"""
+CANDIDATE_DISTANCE = 2
+
 """
 where1d: Helper function for using np.where with 1-d arrays.
 The result of np.where is a tuple which contains the indices 
@@ -124,6 +131,17 @@ class GoBoardUtil(object):
             legal_moves.append(move)
         shuffle(legal_moves)
         return legal_moves
+
+    @staticmethod
+    def generate_candidate_moves_gomoku(board):
+        """
+        generate a list of the moves in the board's candidate zone,
+        i.e. the empty points close to a stone.
+        Falls back to all empty points when the zone is empty.
+        """
+        candidate_moves = list(board.get_candidate_moves())
+        shuffle(candidate_moves)
+        return candidate_moves
             
     @staticmethod
     def generate_random_move_gomoku(board):
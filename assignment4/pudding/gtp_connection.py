@@ -12,11 +12,14 @@ from board_util import GoBoardUtil, BLACK, WHITE, EMPTY, BORDER, PASS, \
                        MAXSIZE, coord_to_point
 import numpy as np
 import re
-import signal
+from solve_stats import SolveStats
+import solve_cache
+from search_control import SearchControl, SearchTimeout
+from opening_book import BOOK_WIN, BOOK_DRAW, BOOK_LOSS
 
 class GtpConnection():
 
-    def __init__(self, go_engine, board, debug_mode = False):
+    def __init__(self, go_engine, board, debug_mode = False, book = None):
         """
         Manage a GTP connection for a Go-playing engine
 
@@ -26,11 +29,14 @@ class GtpConnection():
             a program that can reply to a set of GTP commandsbelow
         board: 
             Represents the current board state.
+        book:
+            an OpeningBook consulted by genmove and solve before searching,
+            or None.
         """
         self._debug_mode = debug_mode
         self.go_engine = go_engine
         self.board = board
-        signal.signal(signal.SIGALRM, self.handler)
+        self.book = book
         self.commands = {
             "protocol_version": self.protocol_version_cmd,
             "quit": self.quit_cmd,
@@ -54,11 +60,24 @@ class GtpConnection():
             "gogui-analyze_commands": self.gogui_analyze_cmd,
             "timelimit": self.timelimit_cmd,
             "solve": self.solve_cmd,
+            "solve_mode": self.solve_mode_cmd,
+            "solve_stats": self.solve_stats_cmd,
             "list_solve_point": self.list_solve_point_cmd, # below is added for Gomoku3
             "policy": self.set_playout_policy, 
-            "policy_moves": self.display_pattern_moves
+            "policy_moves": self.display_pattern_moves,
+            "workers": self.set_workers,
+            "leaf_parallel": self.set_leaf_parallel,
+            "transpositions": self.set_transpositions,
+            "ponder": self.set_ponder,
+            "solve_cache": self.solve_cache_cmd
         }
         self.timelimit=2
+        # "two_pass" proves win, then draw, with null-window searches
+        # "full" searches every move with the window (-1, 1)
+        self.solve_mode="two_pass"
+        # solver counters, off by default
+        self.collect_stats=False
+        self.last_stats=None
 
         # used for argument checking
         # values: (required number of arguments, 
@@ -70,7 +89,12 @@ class GtpConnection():
             "genmove": (1, 'Usage: genmove {w,b}'),
             "play": (2, 'Usage: play {b,w} MOVE'),
             "legal_moves": (1, 'Usage: legal_moves {w,b}'),
-            "policy":(1, 'Usage: set playout policy {random, rule_based}')
+            "policy":(1, 'Usage: set playout policy {random, rule_based}'),
+            "solve_mode":(1, 'Usage: solve_mode {full, two_pass}'),
+            "workers":(1, 'Usage: workers INT'),
+            "leaf_parallel":(2, 'Usage: leaf_parallel BATCH_SIZE WORKERS'),
+            "transpositions":(1, 'Usage: transpositions {on, off}'),
+            "ponder":(1, 'Usage: ponder {on, off}')
         }
     
     def set_playout_policy(self, args):
@@ -78,6 +102,43 @@ class GtpConnection():
         self.go_engine.set_playout_policy(playout_policy)
         self.respond()
 
+    def set_workers(self, args):
+        if not args[0].isdigit():
+            self.error('Usage: workers INT')
+            return
+        if int(args[0]) > 0 and self.go_engine.transpositions:
+            self.error('workers need transpositions off')
+            return
+        self.go_engine.set_workers(int(args[0]))
+        self.respond()
+
+    def set_leaf_parallel(self, args):
+        if not args[0].isdigit() or not args[1].isdigit() or int(args[0]) < 1:
+            self.error('Usage: leaf_parallel BATCH_SIZE WORKERS')
+            return
+        if (int(args[0]) > 1 or int(args[1]) > 0) and self.go_engine.transpositions:
+            self.error('leaf_parallel needs transpositions off')
+            return
+        self.go_engine.set_leaf_parallel(int(args[0]), int(args[1]))
+        self.respond()
+
+    def set_transpositions(self, args):
+        if args[0] not in ('on', 'off'):
+            self.error('Usage: transpositions {on, off}')
+            return
+        if args[0] == 'on' and self.go_engine.is_parallel():
+            self.error('transpositions need workers 0 and leaf_parallel 1 0')
+            return
+        self.go_engine.set_transpositions(args[0] == 'on')
+        self.respond()
+
+    def set_ponder(self, args):
+        if args[0] not in ('on', 'off'):
+            self.error('Usage: ponder {on, off}')
+            return
+        self.go_engine.set_ponder(args[0] == 'on')
+        self.respond()
+
     def display_pattern_moves(self, args):
         game_end, winner = self.board.check_game_end_gomoku()
         color=self.board.current_player
@@ -131,6 +192,8 @@ class GtpConnection():
         if not elements:
             return
         command_name = elements[0]; args = elements[1:]
+        # the board and the search tree are ours again
+        self.go_engine.stop_pondering()
         if self.has_arg_error(command_name, len(args)):
             return
         if command_name in self.commands:
@@ -284,17 +347,84 @@ class GtpConnection():
         self.timelimit = args[0]
         self.respond('')
 
-    def handler(self, signum, fram):
-        #self.board = self.sboard
-        raise Exception("unknown")
+    def solve_mode_cmd(self, args):
+        if args[0] not in ['full', 'two_pass']:
+            self.error('Usage: solve_mode {full, two_pass}')
+            return
+        self.solve_mode=args[0]
+        self.respond()
+
+    def book_lookup(self):
+        """
+        Look up the current position in the opening book.
+        Returns (point, result) or None.
+        """
+        if self.book is None:
+            return None
+        return self.book.lookup(self.board)
+
+    def book_solve(self):
+        """
+        Proven result for the current position from the opening book,
+        in the format of SimpleGoBoard.solve, or None.
+        """
+        entry = self.book_lookup()
+        if entry is None:
+            return None
+        move, result = entry
+        toplay = 'b' if self.board.current_player == BLACK else 'w'
+        opponent = 'w' if toplay == 'b' else 'b'
+        if result == BOOK_WIN and move is not None:
+            return toplay, move
+        elif result == BOOK_DRAW:
+            return 'draw', None
+        elif result == BOOK_LOSS:
+            return opponent, 'NoMove'
+        return None
+
+    def solve_stats_cmd(self, args):
+        """
+        solve_stats on|off: turn the solver counters on or off
+        solve_stats: report the counters of the last solve
+        """
+        if len(args) > 1 or (args and args[0] not in ['on', 'off']):
+            self.error('Usage: solve_stats [on|off]')
+            return
+        if args:
+            self.collect_stats = args[0] == 'on'
+            self.respond()
+            return
+        if self.last_stats is None:
+            self.error('no solve statistics, use solve_stats on')
+            return
+        self.respond(self.last_stats.report())
+
+    def solve_cache_cmd(self, args):
+        """
+        solve_cache: report the counters of the rollout solve cache
+        solve_cache clear: empty it and reset the counters
+        """
+        if len(args) > 1 or (args and args[0] != 'clear'):
+            self.error('Usage: solve_cache [clear]')
+            return
+        cache = solve_cache.get_cache()
+        if args:
+            cache.clear()
+            self.respond()
+            return
+        self.respond('hits {} misses {} size {}'.format(cache.hits, cache.misses, len(cache)))
 
     def solve_cmd(self, args):
+        stats = None
+        if self.collect_stats:
+            stats = SolveStats()
+            self.last_stats = stats
+        control = SearchControl(float(self.timelimit))
         try:
-            self.sboard = self.board.copy()
-            signal.alarm(int(self.timelimit)-1)
-            winner,move = self.board.solve()
-            self.board = self.sboard
-            signal.alarm(0)
+            result = self.book_solve()
+            if result is None:
+                result = self.board.copy().solve(self.solve_mode, stats, control)
+            winner,move = result
             if move != "NoMove":
                 if move == None:
                     self.respond('{} {}'.format(winner, self.board._point_to_coord(move)))
@@ -302,8 +432,13 @@ class GtpConnection():
                 self.respond('{} {}'.format(winner, format_point(point_to_coord(move, self.board.size))))
                 return 
             self.respond('{}'.format(winner))
+        except SearchTimeout:
+            self.respond('unknown')
         except Exception as e:
             self.respond('{}'.format(str(e)))
+        finally:
+            if stats is not None:
+                stats.stop()
 
     def genmove_cmd(self, args):
         """
@@ -323,19 +458,13 @@ class GtpConnection():
         if board_is_full:
             self.respond("pass")
             return
-        '''
-        move=None
-    
-        try:
-            signal.alarm(int(self.timelimit))
-            self.sboard = self.board.copy()
-            move = self.go_engine.get_move(self.board, color)
-            self.board=self.sboard
-            signal.alarm(0)
-        except Exception as e:
-            move=self.go_engine.best_move
-        '''
-        move = self.go_engine.get_move(self.board, color)
+        move = None
+        if color == self.board.current_player:
+            entry = self.book_lookup()
+            if entry is not None:
+                move = entry[0]
+        if move is None:
+            move = self.go_engine.get_move(self.board, color, float(self.timelimit))
 
         if move == PASS:
             #print("check")
@@ -346,6 +475,7 @@ class GtpConnection():
         if self.board.is_legal_gomoku(move, color):
             self.board.play_move_gomoku(move, color)
             self.respond(move_as_string)
+            self.go_engine.start_pondering(self.board, GoBoardUtil.opponent(color))
         else:
             self.respond("illegal move: {}".format(move_as_string))
 
@@ -0,0 +1,58 @@
+"""
+leaf_parallel.py
+
+Persistent process pool for the rollouts of leaf-parallel MCTS.
+
+MCTS._playout_batch selects several leaves of its one tree, each under
+the virtual losses of the others, and evaluates their rollouts here all
+at once, one per worker, before backing them up together.
+"""
+
+import multiprocessing
+import os
+import random
+
+import numpy as np
+
+_pool = None
+_pool_size = 0
+
+# the MCTS of a worker process, for its rollout code
+_mcts = None
+
+
+def _initialize(seed):
+    """
+    Seed each worker differently, they are forked with the same state.
+    """
+    global _mcts
+    from mcts import MCTS
+    _mcts = MCTS()
+    seed = (seed ^ os.getpid()) & 0xffffffff
+    random.seed(seed)
+    np.random.seed(seed)
+
+
+def _rollout(board):
+    return _mcts._evaluate_rollout(board, board.current_player)
+
+
+def evaluate(pool, boards):
+    """
+    The (value, moves) of a rollout from each of boards.
+    """
+    return pool.map(_rollout, boards, chunksize=1)
+
+
+def get_pool(n_workers):
+    """
+    The shared pool, restarted if the number of workers changed.
+    """
+    global _pool, _pool_size
+    if _pool is not None and _pool_size != n_workers:
+        _pool.terminate()
+        _pool = None
+    if _pool is None and n_workers > 0:
+        _pool = multiprocessing.Pool(n_workers, _initialize, (random.getrandbits(32),))
+        _pool_size = n_workers
+    return _pool
@@ -1,162 +1,295 @@
 import numpy as np
 
-from board_util import GoBoardUtil, BLACK, WHITE, EMPTY
+from board_util import GoBoardUtil, BLACK, WHITE, EMPTY, is_black_white
+
+import rollout_kernel
+import root_parallel
+import leaf_parallel
+import solve_cache
+from mcts_tree import MCTSTree, ROOT, DRAW, UNPROVEN
+from search_control import SearchControl
 
-import signal
 import random
 
+# seconds per move when get_move is not given a time limit
 TIMELIMIT = 59
 
-def handler(signum, frame):
-    raise Exception()
+# False plays the rollouts on the board, move by move;
+# True runs them on plain lists instead, see rollout_kernel.py
+FAST_ROLLOUT = False
+
+# RAVE equivalence parameter: the number of visits at which the AMAF
+# value and the UCT value get equal weight in selection; 0 turns RAVE off
+RAVE_EQUIVALENCE = 500
+
+# PUCT weight of the move priors in selection, 0 leaves them out
+PRIOR_WEIGHT = 1.0
+
+# progressive widening: a node with n visits searches its
+# WIDENING_BASE + n ** WIDENING_EXPONENT children of highest prior,
+# WIDENING_BASE 0 searches them all
+WIDENING_BASE = 4
+WIDENING_EXPONENT = 0.5
+
+# positions with at most this many empty points are solved exactly,
+# at the end of a rollout and as tree leaves, through the solve cache
+SOLVE_EMPTIES = 5
 
-signal.signal(signal.SIGALRM, handler)
+# rollouts and tree leaves with at most BUDGET_SOLVE_EMPTIES empty
+# points, but more than SOLVE_EMPTIES, first try a solve of at most
+# BUDGET_SOLVE_NODES nodes, see alphabeta.solve_budget, and go on as
+# usual if it runs out; 0 turns it off
+BUDGET_SOLVE_EMPTIES = 0
+BUDGET_SOLVE_NODES = 50
+
+# proof of a node for each rollout value, and back
+PROOF_OF_VALUE = {1: BLACK, 0: WHITE, 0.5: DRAW}
+VALUE_OF_PROOF = {BLACK: 1, WHITE: 0, DRAW: 0.5}
 
 def filtered_moves(board):
+    return expansion_moves(board)[0]
+
+def expansion_moves(board):
+    """
+    The moves to search from board, and whether they are all the moves
+    that matter: an immediate win or the blocks of an immediate win,
+    or else the candidate zone, which the solver also searches alone.
+    """
     pattern = board.get_pattern_moves()
     if pattern is None:
-        moves = board.get_empty_points()
+        moves = board.get_candidate_moves()
         np.random.shuffle(moves)
-        return moves
-    else:
-        return pattern[1]
-
-def uct_val(node, child, exploration, max_flag):
-    if child._n_visits == 0:
-        return float("inf")
-    if max_flag:
-        return float(child._black_wins) / child._n_visits + exploration * np.sqrt(
-            np.log(node._n_visits) / child._n_visits
-        )
+        return moves, True
     else:
-        return float(
-            child._n_visits - child._black_wins
-        ) / child._n_visits + exploration * np.sqrt(
-            np.log(node._n_visits) / child._n_visits
-        )
+        return pattern[1], pattern[0] <= 1
 
-
-class TreeNode(object):
+def move_priors(board, moves):
     """
-    A node in the MCTS tree.
+    Cheap prior weights of moves for the player to move on board: the
+    stones around each move, in its candidate zone and twice for the
+    adjacent ones, and a bonus for each class of PATTERN_MOVES that the
+    move is in, larger for the earlier classes.
     """
+    cells = board.board
+    zone_count = board.zone_count
+    move_sets = board.pattern_moves.move_sets(cells, board.current_player)
+    n_classes = len(move_sets)
+    priors = []
+    for move in moves:
+        adjacent = 0
+        for nb in board._neighbors(move) + board._diag_neighbors(move):
+            if is_black_white(cells[nb]):
+                adjacent += 1
+        bonus = 1
+        for i, move_set in enumerate(move_sets):
+            if move in move_set:
+                bonus += n_classes - i
+        priors.append((1 + zone_count[move] + adjacent) * bonus)
+    return priors
 
-    def __init__(self, parent):
-        """
-        parent is set when a node gets expanded
-        """
-        self._parent = parent
-        self._children = {}  # a map from move to TreeNode
-        self._n_visits = 0
-        self._black_wins = 0
-        self._expanded = False
-        self._move = None
+class MCTS(object):
+    def __init__(self):
 
-    def winrate(self, max_flag):
-        if self._n_visits == 0:
-            return 0
-        
-        if max_flag:
-            return float(self._black_wins / self._n_visits)
+        self.tree = self._new_tree()
+        self.toplay = BLACK
+        # board values at the root, to find the moves played since
+        self._root_board = None
+        # worker processes for root-parallel search, 0 searches here
+        self.workers = 0
+        # leaves selected per playout under virtual loss, and worker
+        # processes for their rollouts, 0 runs them here in turn
+        self.batch_size = 1
+        self.rollout_workers = 0
+        # endgame solves of all searches, see solve_cache.py
+        self.solve_cache = solve_cache.get_cache()
+
+    def _playout(self, board, color):
+        node, path, tree_moves = self._select_leaf(board, color)
+        proof = self.tree.proof[node]
+        if proof:
+            leaf_value, rollout_moves = VALUE_OF_PROOF[proof], []
         else:
-            return float((self._n_visits - self._black_wins) / self._n_visits)
+            leaf_value, rollout_moves = self._evaluate_rollout(board, board.current_player)
+        self._backup(node, path, tree_moves + rollout_moves, leaf_value)
 
-    def expand(self, board, color):
+    def _select_leaf(self, board, color):
         """
-        Expands tree by creating new children.
+        Walk from the root to a leaf or a proven node, playing the moves
+        on board, and expand the leaf unless it can be proven right away.
+        Returns the node, the path of (node, color to play) from the root,
+        and the moves played.
         """
-        moves = filtered_moves(board)
-        for move in moves:
-            self._children[move] = TreeNode(self)
-            self._children[move]._move = move
-        self._expanded = True
+        tree = self.tree
+        node = ROOT
+        if not tree.expanded[node]:
+            self._expand(node, board, color)
+        path = [(node, color)]
+        tree_moves = []
+        while not tree.is_leaf(node) and not tree.proof[node]:
+            max_flag = color == BLACK
+            node = tree.select(node, self.exploration, max_flag)
+            move = int(tree.move[node])
+            
+            board.play_move_gomoku(move, color)
+            tree_moves.append(move)
+            color = GoBoardUtil.opponent(color)
+            path.append((node, color))
+        if not tree.expanded[node] and not tree.proof[node]:
+            proof = self._leaf_proof(board)
+            if proof:
+                tree.prove(node, proof)
+            else:
+                self._expand(node, board, color)
 
-    def select(self, exploration, max_flag):
-        """
-        Select move among children that gives maximizes UCT. 
-        If number of visits are zero for a node, value for that node is infinite, so definitely will get selected
+        assert board.current_player == color
+        return node, path, tree_moves
 
-        It uses: argmax(child_num_black_wins/child_num_vists + C * sqrt(2 * ln * Parent_num_vists/child_num_visits) )
-        Returns:
-        A tuple of (move, next_node)
-        """
-        return max(
-            self._children.items(),
-            key=lambda items: uct_val(self, items[1], exploration, max_flag),
-        )
+    def _new_tree(self):
+        return MCTSTree(rave_equivalence=RAVE_EQUIVALENCE, prior_weight=PRIOR_WEIGHT,
+                        widening_base=WIDENING_BASE, widening_exponent=WIDENING_EXPONENT)
+
+    def _expand(self, node, board, color):
+        moves, complete = expansion_moves(board)
+        self.tree.expand(node, moves, color, complete, move_priors(board, moves))
 
-    def update(self, leaf_value):
+    def _leaf_proof(self, board):
         """
-        Update node values from leaf evaluation.
-        Arguments:
-        leaf_value -- the value of subtree evaluation from the current player's perspective.
-        
-        Returns:
-        None
+        The proof of a finished game, or of a position small enough
+        to solve, else 0.
         """
-        self._black_wins += leaf_value
-        self._n_visits += 1
+        winner = self.get_result(board)
+        if winner is None:
+            winner = self._budget_solve(board)
+        if winner is None and len(board.get_empty_points()) <= SOLVE_EMPTIES:
+            winner, _ = self.solve_cache.solve(board)
+        if winner is None:
+            return 0
+        return PROOF_OF_VALUE[self._rollout_value(winner)]
 
-    def update_recursive(self, leaf_value):
-        """
-        Like a call to update(), but applied recursively for all ancestors.
+    def _backup(self, node, path, moves, leaf_value):
+        self.tree.update(node, leaf_value)
+        if RAVE_EQUIVALENCE:
+            self._update_amaf(path, moves, leaf_value)
 
-        Note: it is important that this happens from the root downward so that 'parent' visit
-        counts are correct.
+    def _virtual_loss(self, path, sign):
+        """
+        Count (sign 1) or take back (sign -1) a lost playout for the
+        player who moved to each node of path, so that the next leaf
+        selected in the batch takes another path.
         """
-        # If it is not root, this node's parent should be updated first.
-        if self._parent:
-            self._parent.update_recursive(leaf_value)
-        self.update(leaf_value)
+        for node, color in path[1:]:
+            self.tree.add(node, sign, sign if color == BLACK else 0)
 
-    def is_leaf(self):
+    def _playout_batch(self, board, color):
         """
-        Check if leaf node (i.e. no nodes below this have been expanded).
+        Leaf-parallel playout: select batch_size leaves under virtual
+        loss, then run their rollouts on the rollout workers, or here
+        one after the other, and back them up together.
         """
-        return self._children == {}
-
-    def is_root(self):
-        return self._parent is None
-
-class MCTS(object):
-    def __init__(self):
+        leaves = []
+        boards = []
+        for _ in range(self.batch_size):
+            board_copy = board.copy()
+            leaf = self._select_leaf(board_copy, color)
+            self._virtual_loss(leaf[1], 1)
+            leaves.append(leaf)
+            # proven leaves need no rollout
+            if not self.tree.proof[leaf[0]]:
+                boards.append(board_copy)
+        if self.rollout_workers > 0 and boards:
+            pool = leaf_parallel.get_pool(self.rollout_workers)
+            results = leaf_parallel.evaluate(pool, boards)
+        else:
+            results = [self._evaluate_rollout(b, b.current_player) for b in boards]
+        results = iter(results)
+        for node, path, tree_moves in leaves:
+            self._virtual_loss(path, -1)
+            proof = self.tree.proof[node]
+            if proof:
+                leaf_value, rollout_moves = VALUE_OF_PROOF[proof], []
+            else:
+                leaf_value, rollout_moves = next(results)
+            self._backup(node, path, tree_moves + rollout_moves, leaf_value)
 
-        self._root = TreeNode(None)
-        self.toplay = BLACK
+    def _run_playout(self, board, toplay):
+        if self.batch_size > 1:
+            self._playout_batch(board, toplay)
+        else:
+            self._playout(board.copy(), toplay)
 
-    def _playout(self, board, color):
-        node = self._root
-        if not node._expanded:
-            node.expand(board, color)
-        while not node.is_leaf():
-            max_flag = color == BLACK
-            move, next_node = node.select(self.exploration, max_flag)
-            
-            board.play_move_gomoku(move, color)
+    def _update_amaf(self, path, moves, leaf_value):
+        """
+        moves are the points played from the root, in the tree and then
+        in the rollout, alternating colors. Each node of path gets the
+        moves played after it by its player to move.
+        """
+        played = {BLACK: set(), WHITE: set()}
+        color = path[-1][1]
+        for move in moves[len(path) - 1:]:
+            played[color].add(move)
             color = GoBoardUtil.opponent(color)
-            node = next_node
-        assert node.is_leaf()
-        if not node._expanded:
-            node.expand(board, color)
-
-        assert board.current_player == color
-        leaf_value = self._evaluate_rollout(board, color)
-        node.update_recursive(leaf_value)
+        for depth in range(len(path) - 1, -1, -1):
+            node, color = path[depth]
+            if depth < len(path) - 1:
+                played[color].add(moves[depth])
+            self.tree.update_amaf(node, played[color], leaf_value)
 
     def _evaluate_rollout(self, board, toplay):
+        if not FAST_ROLLOUT:
+            return self._evaluate_rollout_board(board, toplay)
+        winner = self.get_result(board)
+        moves = []
+        if winner is None and BUDGET_SOLVE_EMPTIES > SOLVE_EMPTIES:
+            winner, moves = rollout_kernel.playout(board, stop_empties=BUDGET_SOLVE_EMPTIES)
+            if winner is None:
+                for move in moves:
+                    board.play_move_gomoku(move, board.current_player)
+                winner = self._budget_solve(board)
+        if winner is None:
+            winner, more = rollout_kernel.playout(board, stop_empties=SOLVE_EMPTIES)
+            moves += more
+            if winner is None:
+                for move in more:
+                    board.play_move_gomoku(move, board.current_player)
+                winner, _ = self.solve_cache.solve(board)
+        return self._rollout_value(winner), moves
+
+    def _budget_solve(self, board):
+        """
+        The winner of board by a node-budgeted solve, if its empty
+        points are in the range of BUDGET_SOLVE_EMPTIES, else None.
+        """
+        empties = len(board.get_empty_points())
+        if SOLVE_EMPTIES < empties <= BUDGET_SOLVE_EMPTIES:
+            return board.solve_budget(BUDGET_SOLVE_NODES)
+        return None
+
+    def _evaluate_rollout_board(self, board, toplay):
         winner = self.get_result(board)
+        moves = []
+        budget_solved = False
 
         while winner is None and len(board.get_empty_points()) > 0:
             
-            if len(board.get_empty_points()) <= 5:
-                winner, _ = board.solve()
+            if not budget_solved and len(board.get_empty_points()) <= BUDGET_SOLVE_EMPTIES:
+                budget_solved = True
+                winner = self._budget_solve(board)
+                if winner is not None:
+                    break
+            
+            if len(board.get_empty_points()) <= SOLVE_EMPTIES:
+                winner, _ = self.solve_cache.solve(board)
                 break
             
             legal_moves = filtered_moves(board)
             move = random.choice(legal_moves)
             board.play_move_gomoku(move, board.current_player)
+            moves.append(move)
             winner = self.get_result(board)
         
+        return self._rollout_value(winner), moves
+
+    def _rollout_value(self, winner):
         if winner == BLACK or winner == 'b':
             return 1
         elif winner == 'draw':
@@ -172,33 +305,119 @@ class MCTS(object):
             return 'draw'
         return None
     
-    def get_move(
-        self,
-        board,
-        toplay,
-        exploration,
-    ):  
-        signal.alarm(TIMELIMIT)
-
-        try: 
-            if self.toplay != toplay:
-                self._root = TreeNode(None)
-            self.toplay = toplay
-            self.exploration = exploration
-            while True:
-                board_copy = board.copy()
-                self._playout(board_copy, toplay)
-            signal.alarm(0)
-        
-        except Exception:
-            max_flag = toplay == BLACK
+    def _reuse_tree(self, board, toplay):
+        """
+        Make the node of the current position the root, if the moves
+        played since the last search are a path in the tree, and drop
+        the rest of the tree. Otherwise start a new tree.
+        """
+        root = self._follow_moves(board, toplay)
+        if root is None:
+            self.tree = self._new_tree()
+        elif root != ROOT:
+            self.tree = self.tree.subtree(root)
+        if self.tree.is_leaf(ROOT):
+            # proven as a leaf of the last search, without its moves:
+            # search it again, the proof comes back from its children
+            self.tree.proof[ROOT] = UNPROVEN
+        self.toplay = toplay
+        self._root_board = board.board.copy()
 
-            moves_ls = [
-                (move, node._n_visits, node.winrate(max_flag)) for move, node in self._root._children.items()
-            ]
+    def _follow_moves(self, board, toplay):
+        """
+        The node reached from the root by the stones added to the board
+        since the last search, played in turn, or None.
+        """
+        old = self._root_board
+        if old is None or old.shape != board.board.shape:
+            return None
+        changed = np.where(old != board.board)[0]
+        if (old[changed] != EMPTY).any():
+            return None
+        added = {BLACK: set(), WHITE: set()}
+        for point in changed:
+            added[int(board.board[point])].add(int(point))
+        node, color = ROOT, self.toplay
+        while added[BLACK] or added[WHITE]:
+            for move in added[color]:
+                child = self.tree.child(node, move)
+                if child != -1:
+                    break
+            else:
+                return None
+            added[color].remove(move)
+            node = child
+            color = GoBoardUtil.opponent(color)
+        if color != toplay:
+            return None
+        return node
 
-            _, max_visit, _ = max(moves_ls, key=lambda i: i[1])
-            max_visit_moves = [move for move in moves_ls if move[1] == max_visit]
-            move = max(max_visit_moves, key=lambda i: i[2])
-            
-            return move[0]
+    def search(self, board, toplay, exploration, control):
+        """
+        Playouts from board until the deadline of control, a
+        SearchControl, and at least one. Returns the root statistics,
+        see MCTSTree.
+        """
+        self._reuse_tree(board, toplay)
+        self.exploration = exploration
+        while True:
+            self._run_playout(board, toplay)
+            if control.expired() or self.tree.proof[ROOT]:
+                return self.tree.root_statistics()
+
+    def root_parallel(self):
+        """
+        Whether get_move searches on the root-parallel workers, which
+        keep their trees to themselves.
+        """
+        return self.workers > 0
+
+    def _get_move_parallel(self, board, toplay, exploration, control):
+        """
+        Root-parallel search, see root_parallel.py.
+        """
+        pool = root_parallel.get_pool(self.workers)
+        statistics = pool.search(board, toplay, exploration, control)
+        merged = root_parallel.merge_statistics(statistics)
+        if not merged:
+            return filtered_moves(board)[0]
+        return root_parallel.best_merged_move(merged, toplay == BLACK)
+
+    def _decided(self, control, playouts):
+        """
+        Whether the root is proven or its most visited move is sure to
+        stay ahead.
+        """
+        children = self.tree.children(ROOT)
+        if self.tree.proof[ROOT] or len(children) < 2:
+            return True
+        visits = self.tree.visits[children.start:children.stop]
+        second, first = np.partition(visits, -2)[-2:]
+        return control.decided(first, second, playouts)
+
+    def get_move(self, board, toplay, exploration, timelimit=None):
+        """
+        Search until timelimit seconds, TIMELIMIT by default, are nearly
+        over, or until the most visited root move can no longer be
+        overtaken, and return that move. A proven win is played as soon
+        as it is found, also from a reused tree.
+        """
+        control = SearchControl(TIMELIMIT if timelimit is None else timelimit)
+        if self.root_parallel():
+            return self._get_move_parallel(board, toplay, exploration, control)
+        self._reuse_tree(board, toplay)
+        self.exploration = exploration
+        if self.tree.proof[ROOT] == toplay:
+            return self._best_move(board, toplay)
+        playouts = 0
+        while True:
+            self._run_playout(board, toplay)
+            playouts += self.batch_size
+            if control.expired() or self._decided(control, playouts):
+                return self._best_move(board, toplay)
+
+    def _best_move(self, board, toplay):
+        move = self.tree.best_move(toplay == BLACK)
+        if move is None:
+            return filtered_moves(board)[0]
+        return move
@@ -0,0 +1,375 @@
+"""
+mcts_tree.py
+
+Array-backed search tree for the MCTS player.
+
+A node is an index into parallel numpy columns instead of a Python
+object with a dict of children. The children of a node are allocated
+together when it is expanded, so they are the contiguous block
+first_child[node] .. first_child[node] + n_children[node] - 1, and the
+statistics of all children of a node are slices of the columns. The
+columns grow by chunks as the tree grows.
+
+Nodes also carry a proof, as in MCTS-Solver: BLACK or WHITE when that
+player is proven to win from the node, DRAW for a proven draw.
+
+Children are stored in order of their prior, highest first. With
+progressive widening select only considers the first children of a
+node, more of them as its visits grow, and with a prior weight it adds
+a PUCT term that favors the children of high prior while they have few
+visits.
+"""
+
+import math
+
+import numpy as np
+
+from board_util import GoBoardUtil, BLACK, WHITE
+
+"""
+Nodes added to the columns at a time, at least.
+"""
+CHUNK = 4096
+
+ROOT = 0
+
+# proof of a node besides BLACK and WHITE
+UNPROVEN = 0
+DRAW = 3
+
+COLUMNS = (
+    ('parent', np.int32),
+    ('move', np.int32),
+    ('first_child', np.int32),
+    ('n_children', np.int32),
+    ('expanded', np.bool_),
+    # player to move at the node, set on expansion
+    ('toplay', np.int8),
+    # whether the children are all the moves that matter, so that
+    # the node is proven once all its children are
+    ('complete', np.bool_),
+    ('proof', np.int8),
+    # prior probability of the move among its siblings
+    ('prior', np.float64),
+    ('visits', np.float64),
+    ('black_wins', np.float64),
+    # all-moves-as-first: playouts through the parent in which
+    # this move was played later by the same player
+    ('amaf_visits', np.float64),
+    ('amaf_black_wins', np.float64),
+    # kept up to date for select: log(visits) for the exploration term
+    # of the children, 1 / sqrt(visits), inf while unvisited, and the
+    # win rate for black, mixed with the AMAF win rate under RAVE
+    ('log_visits', np.float64),
+    ('inv_sqrt_visits', np.float64),
+    ('black_value', np.float64),
+)
+
+
+class MCTSTree(object):
+    """
+    Node 0 is the root. Values are stored from black's point of view:
+    black_wins is the total playout value, 1 for a black win, 0.5 for
+    a draw, 0 for a white win.
+    rave_equivalence: the number of visits at which the AMAF and the
+    UCT win rate get equal weight, with the hand-selected schedule of
+    Gelly and Silver; 0 leaves the AMAF statistics out of select.
+    prior_weight: weight of the PUCT term
+                  prior * sqrt(parent visits) / (1 + visits),
+                  0 leaves the priors out of select
+    widening_base, widening_exponent: a node with n visits searches its
+                  widening_base + n ** widening_exponent children of
+                  highest prior; widening_base 0 searches all children
+    """
+
+    def __init__(self, capacity=CHUNK, rave_equivalence=0, prior_weight=0,
+                 widening_base=0, widening_exponent=0.5):
+        self.capacity = capacity
+        self.rave_equivalence = rave_equivalence
+        self.prior_weight = prior_weight
+        self.widening_base = widening_base
+        self.widening_exponent = widening_exponent
+        for name, dtype in COLUMNS:
+            setattr(self, name, np.zeros(capacity, dtype))
+        self.size = 1
+        self.parent[ROOT] = -1
+        self.move[ROOT] = -1
+
+    def _reserve(self, n):
+        """
+        Make room for n more nodes.
+        """
+        needed = self.size + n
+        if needed <= self.capacity:
+            return
+        capacity = max(needed, self.capacity + max(CHUNK, self.capacity // 2))
+        for name, _ in COLUMNS:
+            column = getattr(self, name)
+            grown = np.zeros(capacity, column.dtype)
+            grown[:self.size] = column[:self.size]
+            setattr(self, name, grown)
+        self.capacity = capacity
+
+    def expand(self, node, moves, toplay=BLACK, complete=False, priors=None):
+        """
+        Give node, with toplay to move, one child per move, in order of
+        priors, highest first; without priors the moves are equally
+        likely and keep their order.
+        """
+        n = len(moves)
+        self._reserve(n)
+        first = self.size
+        last = first + n
+        self.parent[first:last] = node
+        if priors is None:
+            self.move[first:last] = moves
+            self.prior[first:last] = 1 / max(n, 1)
+        else:
+            priors = np.asarray(priors, np.float64)
+            order = np.argsort(-priors, kind='stable')
+            self.move[first:last] = np.asarray(moves)[order]
+            self.prior[first:last] = priors[order] / priors.sum()
+        self.toplay[node] = toplay
+        self.toplay[first:last] = GoBoardUtil.opponent(toplay)
+        self.complete[node] = complete
+        self.inv_sqrt_visits[first:last] = np.inf
+        self.first_child[node] = first
+        self.n_children[node] = n
+        self.expanded[node] = True
+        self.size = last
+
+    def is_leaf(self, node):
+        """
+        Whether node has no children, expanded or not.
+        """
+        return self.n_children[node] == 0
+
+    def children(self, node):
+        first = int(self.first_child[node])
+        return range(first, first + int(self.n_children[node]))
+
+    def child(self, node, move):
+        """
+        The child of node for move, or -1.
+        """
+        first = self.first_child[node]
+        found = np.flatnonzero(self.move[first:first + self.n_children[node]] == move)
+        if len(found) == 0:
+            return -1
+        return int(first + found[0])
+
+    def winrate(self, node, max_flag):
+        visits = self.visits[node]
+        if visits == 0:
+            return 0
+        if max_flag:
+            return float(self.black_wins[node] / visits)
+        else:
+            return float((visits - self.black_wins[node]) / visits)
+
+    def amaf_winrate(self, node, max_flag):
+        visits = self.amaf_visits[node]
+        if visits == 0:
+            return 0
+        if max_flag:
+            return float(self.amaf_black_wins[node] / visits)
+        else:
+            return float((visits - self.amaf_black_wins[node]) / visits)
+
+    def _beta(self, visits, amaf_visits):
+        """
+        Weight of the AMAF win rate.
+        """
+        k = self.rave_equivalence
+        if not k or not amaf_visits:
+            return 0.0
+        return math.sqrt(k / (3 * visits + k))
+
+    def widened(self, node):
+        """
+        The number of children of node that select considers.
+        """
+        n = int(self.n_children[node])
+        if not self.widening_base:
+            return n
+        visits = float(self.visits[node])
+        return min(n, self.widening_base + int(visits ** self.widening_exponent))
+
+    def select(self, node, exploration, max_flag):
+        """
+        The child of node with the highest UCT value, for black if
+        max_flag, scored all at once from the column slices of its
+        children, among those unlocked by progressive widening.
+        Unvisited children come first, the highest prior first.
+        """
+        first = self.first_child[node]
+        n = self.widened(node)
+        score = self._score(node, first, first + n, exploration, max_flag)
+        if n < self.n_children[node] and score.max() == -np.inf:
+            # all unlocked children are proven losses, unlock the rest
+            score = self._score(node, first, first + self.n_children[node],
+                                exploration, max_flag)
+        return int(first + np.argmax(score))
+
+    def _score(self, node, first, last, exploration, max_flag):
+        scale = exploration * math.sqrt(self.log_visits[node])
+        inv_sqrt_visits = self.inv_sqrt_visits[first:last]
+        if scale:
+            score = scale * inv_sqrt_visits
+        else:
+            # log(1) = 0, only the unvisited children get explored
+            score = np.where(inv_sqrt_visits == np.inf, np.inf, 0.0)
+        if max_flag:
+            score += self.black_value[first:last]
+        else:
+            score -= self.black_value[first:last]
+        if self.prior_weight:
+            score += (self.prior_weight * math.sqrt(self.visits[node])) \
+                * self.prior[first:last] / (1 + self.visits[first:last])
+        # proven losses for the player to move are never searched again
+        proof = self.proof[first:last]
+        if proof.any():
+            score[proof == (WHITE if max_flag else BLACK)] = -np.inf
+        return score
+
+    def _derive_proof(self, node):
+        """
+        The proof of node that follows from those of its children.
+        """
+        first = self.first_child[node]
+        proof = self.proof[first:first + self.n_children[node]]
+        toplay = self.toplay[node]
+        if (proof == toplay).any():
+            return toplay
+        if not self.complete[node] or len(proof) == 0 or (proof == UNPROVEN).any():
+            return UNPROVEN
+        if (proof == DRAW).any():
+            return DRAW
+        return GoBoardUtil.opponent(toplay)
+
+    def prove(self, node, proof):
+        """
+        Set the proof of node and carry it up to the ancestors it decides.
+        """
+        self.proof[node] = proof
+        node = self.parent[node]
+        while node != -1 and not self.proof[node]:
+            proof = self._derive_proof(node)
+            if not proof:
+                return
+            self.proof[node] = proof
+            node = self.parent[node]
+
+    def add(self, node, visits, black_wins):
+        """
+        Add to the statistics of node alone; negative values take back
+        a virtual loss.
+        """
+        visits = float(self.visits[node]) + visits
+        wins = float(self.black_wins[node]) + black_wins
+        self.visits[node] = visits
+        self.black_wins[node] = wins
+        if visits == 0:
+            self.log_visits[node] = 0
+            self.inv_sqrt_visits[node] = np.inf
+            self.black_value[node] = 0
+            return
+        self.log_visits[node] = math.log(visits)
+        self.inv_sqrt_visits[node] = 1 / math.sqrt(visits)
+        value = wins / visits
+        amaf_visits = float(self.amaf_visits[node])
+        beta = self._beta(visits, amaf_visits)
+        if beta:
+            amaf_value = float(self.amaf_black_wins[node]) / amaf_visits
+            value = (1 - beta) * value + beta * amaf_value
+        self.black_value[node] = value
+
+    def update(self, node, leaf_value):
+        """
+        Add a playout of leaf_value to node and all its ancestors.
+        """
+        while node != -1:
+            self.add(node, 1, leaf_value)
+            node = self.parent[node]
+
+    def update_amaf(self, node, moves, leaf_value):
+        """
+        Add the playout to the AMAF statistics of the children of node
+        whose move is in moves, the points played later by its player
+        to move.
+        """
+        if not moves:
+            return
+        first = self.first_child[node]
+        last = first + self.n_children[node]
+        played = np.isin(self.move[first:last], list(moves))
+        self.amaf_visits[first:last][played] += 1
+        self.amaf_black_wins[first:last][played] += leaf_value
+        if self.rave_equivalence:
+            k = self.rave_equivalence
+            visits = self.visits[first:last]
+            amaf_visits = self.amaf_visits[first:last]
+            beta = np.sqrt(k / (3 * visits + k))
+            value = self.black_wins[first:last] / np.maximum(visits, 1)
+            amaf_value = self.amaf_black_wins[first:last] / np.maximum(amaf_visits, 1)
+            self.black_value[first:last] = np.where(
+                amaf_visits > 0, (1 - beta) * value + beta * amaf_value, value)
+
+    def best_move(self, max_flag):
+        """
+        A proven win of the root, or else the move of the most visited
+        child that is not a proven loss, the best win rate among those
+        on ties. None if the root has no children.
+        """
+        children = self.children(ROOT)
+        if len(children) == 0:
+            return None
+        proof = self.proof[children.start:children.stop]
+        toplay = BLACK if max_flag else WHITE
+        won = np.flatnonzero(proof == toplay)
+        if len(won):
+            return int(self.move[children.start + won[0]])
+        visits = self.visits[children.start:children.stop].copy()
+        lost = proof == GoBoardUtil.opponent(toplay)
+        if not lost.all():
+            visits[lost] = -1
+        most = np.flatnonzero(visits == visits.max()) + children.start
+        best = max(most, key=lambda child: self.winrate(child, max_flag))
+        return int(self.move[best])
+
+    def root_statistics(self):
+        """
+        Moves, visits, black wins and proofs of the children of the root,
+        as lists.
+        """
+        children = self.children(ROOT)
+        first, last = children.start, children.stop
+        return (self.move[first:last].tolist(), self.visits[first:last].tolist(),
+                self.black_wins[first:last].tolist(), self.proof[first:last].tolist())
+
+    def subtree(self, node):
+        """
+        A new tree holding the subtree of node, with node as its root.
+        """
+        order = [node]
+        first_child = []
+        i = 0
+        while i < len(order):
+            old = order[i]
+            n = int(self.n_children[old])
+            first_child.append(len(order) if n else 0)
+            first = int(self.first_child[old])
+            order.extend(range(first, first + n))
+            i += 1
+        tree = MCTSTree(max(len(order), CHUNK), self.rave_equivalence, self.prior_weight,
+                        self.widening_base, self.widening_exponent)
+        tree.size = len(order)
+        order = np.array(order)
+        for name, _ in COLUMNS:
+            getattr(tree, name)[:tree.size] = getattr(self, name)[order]
+        tree.first_child[:tree.size] = first_child
+        new_id = np.full(self.size, -1, np.int32)
+        new_id[order] = np.arange(tree.size)
+        tree.parent[1:tree.size] = new_id[self.parent[order[1:]]]
+        tree.parent[ROOT] = -1
+        return tree
@@ -0,0 +1,272 @@
+"""
+opening_book.py
+
+Opening book for Gomoku:
+- pack a position (stones + player to move) into a fixed-size key
+- reduce positions by the 8 symmetries of the board
+- look up the book move through mmap and binary search
+- build the book offline with a process pool
+
+Book file layout: a header followed by fixed-size records sorted by key.
+Each record is key, move, result. The move is stored as a row-major index
+0 .. size*size-1 in the frame of the canonical (symmetry-reduced) position,
+NO_MOVE if there is none. The result is from the point of view of the
+player to move.
+
+Build a book with
+    python3 opening_book.py PLIES SECONDS_PER_POSITION [PROCESSES]
+"""
+
+import mmap
+import os
+import struct
+import sys
+from multiprocessing import Pool
+
+import numpy as np
+
+from board_util import GoBoardUtil, BLACK, EMPTY, coord_to_point
+
+BOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                         'opening_book_7x7.bin')
+BOOK_SIZE = 7
+
+HEADER = struct.Struct('>4sBB2x')
+MAGIC = b'GMBK'
+VERSION = 1
+
+NO_MOVE = 255
+
+"""
+Results stored in the book, for the player to move.
+BOOK_UNKNOWN is used for positions that were searched but not proven.
+"""
+BOOK_UNKNOWN = 0
+BOOK_WIN = 1
+BOOK_DRAW = 2
+BOOK_LOSS = 3
+
+"""
+Only positions with at most this many empty points are solved exactly
+while building, all others are searched with MCTS.
+"""
+SOLVE_EMPTIES = 12
+
+
+def key_size(size):
+    # 2 bits per point plus 2 bits for the player to move
+    return (2 * size * size + 2 + 7) // 8
+
+def record_struct(size):
+    return struct.Struct('>{}sBB'.format(key_size(size)))
+
+def symmetry_maps(size):
+    """
+    The 8 symmetries of the board as an 8 x size*size index array.
+    For each row t, transformed.flat[k] == board2d.flat[t[k]].
+    """
+    index = np.arange(size * size).reshape(size, size)
+    maps = []
+    for flip in (False, True):
+        grid = np.fliplr(index) if flip else index
+        for k in range(4):
+            maps.append(np.rot90(grid, k).flatten())
+    return np.array(maps)
+
+def pack_keys(cells, toplay, size):
+    """
+    Pack rows of point colors and the player to move into bytes keys,
+    2 bits per value, big-endian, so that bytes compare like the numbers.
+    """
+    n = len(cells)
+    values = np.empty((n, size * size + 1), dtype=np.uint8)
+    values[:, 0] = toplay
+    values[:, 1:] = cells
+    bits = np.zeros((n, 8 * key_size(size)), dtype=np.uint8)
+    pad = bits.shape[1] - 2 * values.shape[1]
+    bits[:, pad::2] = values >> 1
+    bits[:, pad + 1::2] = values & 1
+    packed = np.packbits(bits, axis=1)
+    return [row.tobytes() for row in packed]
+
+def canonical_key(board2d, toplay, maps):
+    """
+    Return (key, map) for the symmetry that gives the smallest key.
+    """
+    size = board2d.shape[0]
+    keys = pack_keys(board2d.flatten()[maps], toplay, size)
+    i = min(range(len(keys)), key=keys.__getitem__)
+    return keys[i], maps[i]
+
+
+class OpeningBook(object):
+    """
+    Read-only view of a book file.
+    """
+
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, size = HEADER.unpack_from(self._data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("not an opening book: {}".format(path))
+        self.size = size
+        self._record = record_struct(size)
+        self._key_len = key_size(size)
+        self._count = (len(self._data) - HEADER.size) // self._record.size
+        self._maps = symmetry_maps(size)
+
+    def __len__(self):
+        return self._count
+
+    def close(self):
+        self._data.close()
+        self._file.close()
+
+    def _find(self, key):
+        """
+        Binary search for key. Returns (move, result) or None.
+        """
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = HEADER.size + mid * self._record.size
+            mid_key = self._data[start : start + self._key_len]
+            if mid_key < key:
+                lo = mid + 1
+            elif mid_key > key:
+                hi = mid
+            else:
+                _, move, result = self._record.unpack_from(self._data, start)
+                return move, result
+        return None
+
+    def lookup(self, board):
+        """
+        Look up the current position of board.
+        Returns (point, result), where point is None if the book has
+        no move, or None if the position is not in the book.
+        """
+        if board.size != self.size:
+            return None
+        board2d = GoBoardUtil.get_twoD_board(board)
+        key, t = canonical_key(board2d, board.current_player, self._maps)
+        entry = self._find(key)
+        if entry is None:
+            return None
+        move, result = entry
+        if move == NO_MOVE:
+            return None, result
+        row, col = divmod(int(t[move]), self.size)
+        return coord_to_point(row + 1, col + 1, self.size), result
+
+
+def load_book(path=BOOK_PATH):
+    """
+    Open the book at path, or return None if there is no book file.
+    """
+    if not os.path.exists(path):
+        return None
+    return OpeningBook(path)
+
+def write_book(path, size, entries):
+    """
+    Write a book file.
+    entries maps canonical keys to (move, result).
+    """
+    record = record_struct(size)
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, size))
+        for key in sorted(entries):
+            move, result = entries[key]
+            f.write(record.pack(key, move, result))
+
+def enumerate_positions(size, plies):
+    """
+    All positions reachable in at most plies moves from the empty board,
+    one per symmetry class, without positions where the game is over.
+    Returns a dict from canonical key to (board2d, toplay).
+    """
+    from simple_board import SimpleGoBoard
+    maps = symmetry_maps(size)
+    empty = np.zeros((size, size), dtype=np.int32)
+    key, _ = canonical_key(empty, BLACK, maps)
+    positions = {key: (empty, BLACK)}
+    frontier = [(empty, BLACK)]
+    for _ in range(plies):
+        next_frontier = []
+        for board2d, toplay in frontier:
+            for row, col in zip(*np.where(board2d == EMPTY)):
+                child = board2d.copy()
+                child[row, col] = toplay
+                opp = GoBoardUtil.opponent(toplay)
+                key, t = canonical_key(child, opp, maps)
+                if key in positions:
+                    continue
+                board = board_from_2d(SimpleGoBoard, child, opp)
+                if board.point_check_game_end_gomoku(board.pt(row + 1, col + 1)):
+                    continue
+                canonical = child.flatten()[t].reshape(size, size)
+                positions[key] = (canonical, opp)
+                next_frontier.append((canonical, opp))
+        frontier = next_frontier
+    return positions
+
+def board_from_2d(board_class, board2d, toplay):
+    size = board2d.shape[0]
+    board = board_class(size)
+    for row, col in zip(*np.where(board2d != EMPTY)):
+        board.play_move_gomoku(board.pt(row + 1, col + 1), board2d[row, col])
+    board.current_player = toplay
+    return board
+
+def evaluate_position(args):
+    """
+    Pool worker: solve or search one canonical position.
+    Returns (key, move, result) with move in the canonical frame.
+    """
+    from simple_board import SimpleGoBoard
+    import mcts
+    key, board2d, toplay, seconds = args
+    size = board2d.shape[0]
+    board = board_from_2d(SimpleGoBoard, board2d, toplay)
+    result = BOOK_UNKNOWN
+    move = None
+    if len(board.get_empty_points()) <= SOLVE_EMPTIES:
+        winner, solved_move = board.copy().solve()
+        if winner == 'draw':
+            result = BOOK_DRAW
+        elif winner == ('b' if toplay == BLACK else 'w'):
+            result = BOOK_WIN
+            move = solved_move
+        else:
+            result = BOOK_LOSS
+    if move is None:
+        mcts.TIMELIMIT = seconds
+        move = mcts.MCTS().get_move(board, toplay, np.sqrt(2))
+    row, col = divmod(int(move), board.NS)
+    return key, (row - 1) * size + (col - 1), result
+
+def build(path, plies, seconds, processes=None, size=BOOK_SIZE):
+    """
+    Build the book for all positions up to plies moves,
+    searching each position for seconds.
+    """
+    positions = enumerate_positions(size, plies)
+    jobs = [(key, board2d, toplay, seconds)
+            for key, (board2d, toplay) in positions.items()]
+    entries = {}
+    with Pool(processes) as pool:
+        for key, move, result in pool.imap_unordered(evaluate_position, jobs):
+            entries[key] = (move, result)
+    write_book(path, size, entries)
+    return len(entries)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 3:
+        print("Usage: python3 opening_book.py PLIES SECONDS [PROCESSES]")
+        sys.exit(1)
+    processes = int(sys.argv[3]) if len(sys.argv) > 3 else None
+    n = build(BOOK_PATH, int(sys.argv[1]), int(sys.argv[2]), processes)
+    print("wrote {} positions to {}".format(n, BOOK_PATH))
@@ -0,0 +1,121 @@
+"""
+rollout_kernel.py
+
+Pure-Python playouts for Gomoku.
+
+A playout copies the board into plain lists once and then only works
+on the lists: the empty points and the candidate zone are kept as
+PointSets for O(1) random choice and removal, pattern moves come from a
+copy of the board's PatternCache updated along the lines through each
+move, and a five is looked for along the four lines through the last
+move. No numpy call is made until the playout ends.
+
+benchmark_rollouts.py compares it with the board-based playouts.
+"""
+
+import random
+
+from board_util import GoBoardUtil, EMPTY
+
+
+class PointSet(object):
+    """
+    Set of points with O(1) add, discard and random choice.
+    """
+
+    def __init__(self, points=()):
+        self.items = list(points)
+        self.index = {point: i for i, point in enumerate(self.items)}
+
+    def __len__(self):
+        return len(self.items)
+
+    def add(self, point):
+        if point not in self.index:
+            self.index[point] = len(self.items)
+            self.items.append(point)
+
+    def discard(self, point):
+        i = self.index.pop(point, None)
+        if i is None:
+            return
+        last = self.items.pop()
+        if i < len(self.items):
+            self.items[i] = last
+            self.index[last] = i
+
+    def choice(self):
+        return random.choice(self.items)
+
+
+def is_five(cells, point, steps):
+    """
+    Whether the stone on point is part of five in a row.
+    """
+    color = cells[point]
+    for step in steps:
+        count = 1
+        p = point + step
+        while cells[p] == color:
+            count += 1
+            p += step
+        p = point - step
+        while cells[p] == color:
+            count += 1
+            p -= step
+        if count >= 5:
+            return True
+    return False
+
+
+def playout(board, use_patterns=True, use_zone=True, stop_empties=0):
+    """
+    Play a random game from the position of board, a SimpleGoBoard,
+    which is not changed.
+    use_patterns: play a move of the first class of get_pattern_moves
+                  when there is one
+    use_zone:     otherwise play a candidate move, see get_candidate_moves,
+                  instead of any empty point
+    stop_empties: stop once only this many empty points are left
+    Returns (winner, moves): winner is BLACK, WHITE, 'draw', or None if
+    the playout stopped at stop_empties; moves are the points played.
+    """
+    NS = board.NS
+    steps = (1, NS, NS + 1, NS - 1)
+    cells = board.board.tolist()
+    empties = PointSet(point for point in range(len(cells)) if cells[point] == EMPTY)
+    candidates = None
+    if use_zone and board.candidate_distance > 0:
+        candidates = PointSet(board.candidates)
+        zone_neighbors = board.zone_neighbors
+    patterns = board.pattern_moves.copy() if use_patterns else None
+    color = board.current_player
+    moves = []
+    while len(empties) > stop_empties:
+        move = None
+        if patterns is not None:
+            for move_set in patterns.cell_move_sets(cells, color):
+                if move_set:
+                    move = random.choice(list(move_set))
+                    break
+        if move is None:
+            if candidates:
+                move = candidates.choice()
+            else:
+                move = empties.choice()
+        cells[move] = color
+        moves.append(move)
+        empties.discard(move)
+        if candidates is not None:
+            candidates.discard(move)
+            for nb in zone_neighbors[move]:
+                if cells[nb] == EMPTY:
+                    candidates.add(nb)
+        if patterns is not None:
+            patterns.touch(move)
+        if is_five(cells, move, steps):
+            return color, moves
+        color = GoBoardUtil.opponent(color)
+    if len(empties) == 0:
+        return 'draw', moves
+    return None, moves
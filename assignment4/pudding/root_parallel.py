@@ -0,0 +1,147 @@
+"""
+root_parallel.py
+
+Root-parallel MCTS on a persistent pool of worker processes.
+
+Every worker keeps its own MCTS, so it also reuses its own tree across
+moves. For a genmove the root board is sent to all workers with a
+different random seed each. They search independently until the
+deadline of a SearchControl, on the monotonic clock that all processes
+share, and send back the visits and black wins of the root children,
+which the parent sums move by move to choose its move.
+"""
+
+import multiprocessing
+import queue
+import random
+
+import numpy as np
+
+from board_util import GoBoardUtil, BLACK, WHITE
+
+"""
+Seconds the parent waits past the deadline for the last playouts,
+taken from the safety margin of the SearchControl.
+"""
+GRACE = 0.25
+
+_pool = None
+
+
+def _worker(tasks, results):
+    """
+    Worker loop. Tasks are
+    ('search', generation, board, toplay, exploration, control, seed)
+    ('stop',)
+    """
+    from mcts import MCTS
+    mcts = MCTS()
+    while True:
+        task = tasks.get()
+        if task[0] == 'stop':
+            return
+        _, generation, board, toplay, exploration, control, seed = task
+        random.seed(seed)
+        np.random.seed(seed)
+        statistics = mcts.search(board, toplay, exploration, control)
+        results.put((generation, statistics))
+
+
+def merge_statistics(statistics):
+    """
+    Sum a list of root statistics, (moves, visits, black wins, proofs)
+    each, into a dict from move to [visits, black wins, proof]. A proof
+    from any worker holds for all.
+    """
+    merged = {}
+    for moves, visits, black_wins, proofs in statistics:
+        for move, n, wins, proof in zip(moves, visits, black_wins, proofs):
+            total = merged.setdefault(move, [0, 0, 0])
+            total[0] += n
+            total[1] += wins
+            total[2] = total[2] or proof
+    return merged
+
+
+def best_merged_move(merged, max_flag):
+    """
+    A proven win in merged, or else the most visited move that is not a
+    proven loss, the best win rate among those on ties, as in
+    MCTSTree.best_move.
+    """
+    toplay = BLACK if max_flag else WHITE
+    for move, (_, _, proof) in merged.items():
+        if proof == toplay:
+            return move
+    def winrate(move):
+        visits, black_wins, _ = merged[move]
+        if visits == 0:
+            return 0
+        return black_wins / visits if max_flag else 1 - black_wins / visits
+    moves = [move for move in merged if merged[move][2] != GoBoardUtil.opponent(toplay)]
+    if not moves:
+        moves = list(merged)
+    most = max(merged[move][0] for move in moves)
+    return max((move for move in moves if merged[move][0] == most), key=winrate)
+
+
+class RootParallelPool(object):
+
+    def __init__(self, n_workers):
+        self.n_workers = n_workers
+        self.generation = 0
+        self.results = multiprocessing.Queue()
+        self.tasks = []
+        self.processes = []
+        for _ in range(n_workers):
+            tasks = multiprocessing.Queue()
+            process = multiprocessing.Process(
+                target=_worker, args=(tasks, self.results), daemon=True)
+            process.start()
+            self.tasks.append(tasks)
+            self.processes.append(process)
+
+    def close(self):
+        for tasks in self.tasks:
+            tasks.put(('stop',))
+        for process in self.processes:
+            process.join(1)
+            if process.is_alive():
+                process.terminate()
+
+    def search(self, board, toplay, exploration, control):
+        """
+        Search board on every worker until the deadline of control.
+        Returns the root statistics of the workers that answered in time.
+        """
+        self.generation += 1
+        generation = self.generation
+        for tasks in self.tasks:
+            tasks.put(('search', generation, board, toplay, exploration,
+                       control, random.getrandbits(32)))
+        statistics = []
+        while len(statistics) < self.n_workers:
+            timeout = control.remaining()
+            if timeout is not None:
+                timeout += GRACE
+            try:
+                result_generation, result = self.results.get(timeout=timeout)
+            except queue.Empty:
+                break
+            # searches of an earlier genmove that finished late
+            if result_generation == generation:
+                statistics.append(result)
+        return statistics
+
+
+def get_pool(n_workers):
+    """
+    The shared pool, restarted if the number of workers changed.
+    """
+    global _pool
+    if _pool is not None and _pool.n_workers != n_workers:
+        _pool.close()
+        _pool = None
+    if _pool is None and n_workers > 0:
+        _pool = RootParallelPool(n_workers)
+    return _pool
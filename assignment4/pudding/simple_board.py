@@ -9,14 +9,43 @@ Implements a basic Go board with functions to:
 The board uses a 1-dimensional representation with padding
 """
 
+import random
 import numpy as np
 from board_util import GoBoardUtil, BLACK, WHITE, EMPTY, BORDER, \
                        PASS, is_black_white, coord_to_point, where1d, \
-                       MAXSIZE, NULLPOINT
+                       MAXSIZE, NULLPOINT, CANDIDATE_DISTANCE
 import alphabeta
+from pattern_automaton import PatternAutomaton, PatternCache
+
+"""
+Pattern lists of get_pattern_moves and list_solve_point, see pattern_automaton.py.
+Classes in priority order:
+1. direct winning point xxxx. x.xxx xx.xx
+2. urgent blocking point xoooo.
+3. wining in 2 step point
+4. blocking an open three
+"""
+PATTERN_MOVES = PatternAutomaton(
+    [{'xxxx.':{0},'xxx.x':{1},'xx.xx':{2},'x.xxx':{3},'.xxxx':{4}}, #win
+     {'oooo.':{0},'ooo.o':{1},'oo.oo':{2},'o.ooo':{3},'.oooo':{4}}, #block win
+     {'.xxx..':{1},'..xxx.':{4},'.xx.x.':{2},'.x.xx.':{3}}, #make-four
+     {'.ooo..':{1,5},'..ooo.':{0,4},'.oo.o.':{0,2,5},'.o.oo.':{0,3,5}, 'B.ooo..':{0}, '..ooo.B':{6},
+      'x.ooo..':{0}, '..ooo.x':{6} #block-open-four
+     }])
+
+SOLVE_POINT_PATTERNS = PatternAutomaton(
+    [{'xxxx.':{0},'xxx.x':{1},'xx.xx':{2},'x.xxx':{3},'.xxxx':{4}},
+     {'oooo.':{0},'ooo.o':{1},'oo.oo':{2},'o.ooo':{3},'.oooo':{4}},
+     {'.xxx..':{1},'..xxx.':{4},'.xx.x.':{2},'.x.xx.':{3}},
+     {'.ooo..':{1,5},'..ooo.':{0,4},'.oo.o.':{2},'.o.oo.':{3}}])
 
 class SimpleGoBoard(object):
 
+    # zone neighbor lists shared by all boards of the same size and distance
+    _zone_cache = {}
+    # Zobrist keys shared by all boards of the same size
+    _zobrist_cache = {}
+
     def get_color(self, point):
         return self.board[point]
 
@@ -64,11 +93,13 @@ class SimpleGoBoard(object):
         """
         return where1d(self.board == EMPTY)
 
-    def __init__(self, size):
+    def __init__(self, size, candidate_distance=CANDIDATE_DISTANCE):
         """
         Creates a Go board of given size
         """
         assert 2 <= size <= MAXSIZE
+        assert candidate_distance >= 0
+        self.candidate_distance = candidate_distance
         self.reset(size)
 
     def reset(self, size):
@@ -87,15 +118,34 @@ class SimpleGoBoard(object):
         self.liberty_of = np.full(self.maxpoint, NULLPOINT, dtype = np.int32)
         self._initialize_empty_points(self.board)
         self._initialize_neighbors()
+        self._initialize_candidate_zone()
+        self._initialize_pattern_caches()
+        self._initialize_zobrist()
+
+    def __getstate__(self):
+        # the pattern caches are rebuilt after unpickling
+        state = self.__dict__.copy()
+        del state['pattern_moves']
+        del state['solve_points']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._initialize_pattern_caches()
 
     def copy(self):
-        b = SimpleGoBoard(self.size)
+        b = SimpleGoBoard(self.size, self.candidate_distance)
         assert b.NS == self.NS
         assert b.WE == self.WE
         b.ko_recapture = self.ko_recapture
         b.current_player = self.current_player
         assert b.maxpoint == self.maxpoint
         b.board = np.copy(self.board)
+        b.zone_count = list(self.zone_count)
+        b.candidates = set(self.candidates)
+        b.pattern_moves = self.pattern_moves.copy()
+        b.solve_points = self.solve_points.copy()
+        b.hash = self.hash
         return b
 
     def row_start(self, row):
@@ -133,6 +183,99 @@ class SimpleGoBoard(object):
             else:
                 self.neighbors.append(self._on_board_neighbors(point))
         
+    def _initialize_candidate_zone(self):
+        """
+        precompute the candidate zone.
+        For each point on the board, self.zone_neighbors stores the on-board
+        points within candidate_distance rows and columns of it.
+        self.zone_count counts the stones in the zone of each point, and
+        self.candidates is the set of empty points with a nonzero count.
+        """
+        key = (self.size, self.candidate_distance)
+        if key not in SimpleGoBoard._zone_cache:
+            d = self.candidate_distance
+            zone_neighbors = []
+            for point in range(self.maxpoint):
+                zone = []
+                if self.board[point] != BORDER:
+                    row, col = divmod(point, self.NS)
+                    for r in range(max(1, row - d), min(self.size, row + d) + 1):
+                        for c in range(max(1, col - d), min(self.size, col + d) + 1):
+                            if (r, c) != (row, col):
+                                zone.append(coord_to_point(r, c, self.size))
+                zone_neighbors.append(zone)
+            SimpleGoBoard._zone_cache[key] = zone_neighbors
+        self.zone_neighbors = SimpleGoBoard._zone_cache[key]
+        self.zone_count = [0] * self.maxpoint
+        self.candidates = set()
+        for point in where1d((self.board == BLACK) + (self.board == WHITE)):
+            self._add_to_zone(point)
+
+    def set_candidate_distance(self, distance):
+        """
+        Change the radius of the candidate zone and rebuild it
+        for the current position.
+        """
+        assert distance >= 0
+        self.candidate_distance = distance
+        self._initialize_candidate_zone()
+
+    def _add_to_zone(self, point):
+        """
+        Update the candidate zone after a stone was placed on point.
+        """
+        self.candidates.discard(point)
+        for nb in self.zone_neighbors[point]:
+            self.zone_count[nb] += 1
+            if self.board[nb] == EMPTY:
+                self.candidates.add(nb)
+
+    def _remove_from_zone(self, point):
+        """
+        Update the candidate zone after the stone on point was removed.
+        """
+        for nb in self.zone_neighbors[point]:
+            self.zone_count[nb] -= 1
+            if self.zone_count[nb] == 0:
+                self.candidates.discard(nb)
+        if self.zone_count[point] > 0:
+            self.candidates.add(point)
+
+    def _initialize_pattern_caches(self):
+        """
+        Per-line matches of PATTERN_MOVES and SOLVE_POINT_PATTERNS,
+        computed from the current position on first use and then
+        only for the lines through the points that changed.
+        """
+        self.pattern_moves = PatternCache(PATTERN_MOVES, self.NS, self.maxpoint)
+        self.solve_points = PatternCache(SOLVE_POINT_PATTERNS, self.NS, self.maxpoint)
+
+    def _initialize_zobrist(self):
+        """
+        self.zobrist[point][color] is the random 64-bit key of a stone of
+        color on point, and self.hash the xor of the keys of all stones,
+        kept up to date by play_move_gomoku and undo_move_gomoku.
+        The keys only depend on the board size, so hashes agree across
+        boards and processes.
+        """
+        if self.maxpoint not in SimpleGoBoard._zobrist_cache:
+            rng = random.Random(self.maxpoint)
+            SimpleGoBoard._zobrist_cache[self.maxpoint] = [
+                (0, rng.getrandbits(64), rng.getrandbits(64))
+                for _ in range(self.maxpoint)]
+        self.zobrist = SimpleGoBoard._zobrist_cache[self.maxpoint]
+        self.hash = 0
+
+    def get_candidate_moves(self):
+        """
+        Return:
+            The empty points within candidate_distance of a stone.
+            All empty points if the zone is empty or turned off.
+        """
+        if self.candidate_distance == 0 or not self.candidates:
+            return self.get_empty_points()
+        return list(self.candidates)
+
     def is_eye(self, point, color):
         """
         Check if point is a simple eye for color
@@ -348,8 +491,24 @@ class SimpleGoBoard(object):
         if self.board[point] != EMPTY:
             return False
         self.board[point] = color
+        self.hash ^= self.zobrist[point][color]
+        self._add_to_zone(point)
+        self.pattern_moves.touch(point)
+        self.solve_points.touch(point)
         self.current_player = GoBoardUtil.opponent(color)
         return True
+
+    def undo_move_gomoku(self, point):
+        """
+            Take back the stone on point, for the game of gomoku
+            """
+        assert is_black_white(self.board[point])
+        self.hash ^= self.zobrist[point][self.board[point]]
+        self.board[point] = EMPTY
+        self._remove_from_zone(point)
+        self.pattern_moves.touch(point)
+        self.solve_points.touch(point)
+        self.current_player = GoBoardUtil.opponent(self.current_player)
         
     def _point_direction_check_connect_gomoko(self, point, shift):
         """
@@ -420,8 +579,19 @@ class SimpleGoBoard(object):
 
         return False, None
 
-    def solve(self):
-        result, move = alphabeta.solve(self)
+    def solve(self, mode="two_pass", stats=None, control=None):
+        """
+        Solve the current position.
+        mode "two_pass" proves win, then draw, with null-window searches;
+        mode "full" searches every move with the window (-1, 1).
+        stats: optional SolveStats that records the search.
+        control: optional SearchControl; past its deadline the search
+        raises SearchTimeout and leaves the board in the middle of it.
+        """
+        if mode == "two_pass":
+            result, move = alphabeta.solve_two_pass(self, stats, control)
+        else:
+            result, move = alphabeta.solve(self, stats, control)
         drawMove = None
         if move=="First":
             if result==0:
@@ -439,88 +609,38 @@ class SimpleGoBoard(object):
             winner='w' if self.current_player==WHITE else 'b'
             return winner, move
 
-    def check_pattern(self,point,have,direction_x,direction_y,moveSet,patternList,color,flag):
-        for i in range(0,4):
-            if have in patternList[i]:
-                for dis in patternList[i][have]:
-                    moveSet[i].add(point-direction_x*(dis+1)-direction_y*self.NS*(dis+1))
-                #flag[0]=True
-                break
-        if (not (0<= point<len(self.board))) or len(have)==9:
-            return
-#if self.get_color(point)==BORDER or len(have)==7:
-#            return
-        piece=self.get_color(point)
-        if piece==EMPTY:
-            piece='.'
-        elif piece==color:
-            piece='x'
-        elif piece == BORDER:
-            piece='B'
-        else:
-            piece='o'
-        have+=piece
-        #print(GoBoardUtil.format_point(self._point_to_coord(point)),have,self.board[point])
-        self.check_pattern(point+direction_x+direction_y*self.NS,have,direction_x,direction_y,moveSet,patternList,color,flag)
+    def solve_budget(self, max_nodes):
+        """
+        The winner of the current position, 'b', 'w' or 'draw', if
+        alphabeta.solve_budget proves it within max_nodes nodes, else None.
+        """
+        result = alphabeta.solve_budget(self, max_nodes)
+        if result == alphabeta.UNKNOWN:
+            return None
+        if result == 0:
+            return 'draw'
+        if (result == 1) == (self.current_player == WHITE):
+            return 'w'
+        return 'b'
 
     def get_pattern_moves(self):
         """
-        1. direct winning point xxxx. x.xxx xx.xx
-        2. urgent blocking point xoooo.
-        3. wining in 2 step point
+        The first non-empty class of PATTERN_MOVES for the current player,
+        as (class index, moves), or None if no pattern matches.
         """
-        moveSet=[set(),set(),set(),set()]
-        color=self.current_player
-
-        patternList=[{'xxxx.':{0},'xxx.x':{1},'xx.xx':{2},'x.xxx':{3},'.xxxx':{4}}, #win
-                     {'oooo.':{0},'ooo.o':{1},'oo.oo':{2},'o.ooo':{3},'.oooo':{4}}, #block win
-                     {'.xxx..':{1},'..xxx.':{4},'.xx.x.':{2},'.x.xx.':{3}}, #make-four
-                     {'.ooo..':{1,5},'..ooo.':{0,4},'.oo.o.':{0,2,5},'.o.oo.':{0,3,5}, 'B.ooo..':{0}, '..ooo.B':{6},
-                     'x.ooo..':{0}, '..ooo.x':{6} #block-open-four
-                     }]
-
-        direction_x=[1,0,1,-1]
-        direction_y=[0,1,1,1]
-        flag=[False]
+        moveSet = self.pattern_moves.move_sets(self.board, self.current_player)
+        for i in range(len(moveSet)):
+            if moveSet[i]:
+                return i, list(moveSet[i])
+        return None
 
-        for point in range(0, len(self.board)):
-            if flag[0]:
-                break
-            for direction in range(0,4):
-                    self.check_pattern(point,'',direction_x[direction],direction_y[direction],moveSet,patternList,color,flag)
-        
-        i=0
-        while i<4 and not bool(moveSet[i]): i+=1
-        if i==4:
-            return None
-        else:
-            return i, list(moveSet[i])
-            
     def list_solve_point(self):
         """
-        1. direct winning point xxxx. x.xxx xx.xx
-        2. urgent blocking point xoooo.
-        3. wining in 2 step point
+        The moves of the first non-empty class of SOLVE_POINT_PATTERNS
+        for the current player, or None if no pattern matches.
         """
-        moveSet=[set(),set(),set(),set()]
-        color=self.current_player
-
-        patternList=[{'xxxx.':{0},'xxx.x':{1},'xx.xx':{2},'x.xxx':{3},'.xxxx':{4}},{'oooo.':{0},'ooo.o':{1},'oo.oo':{2},'o.ooo':{3},'.oooo':{4}},{'.xxx..':{1},'..xxx.':{4},'.xx.x.':{2},'.x.xx.':{3}},{'.ooo..':{1,5},'..ooo.':{0,4},'.oo.o.':{2},'.o.oo.':{3}}]
-
-        direction_x=[1,0,1,-1]
-        direction_y=[0,1,1,1]
-        flag=[False]
-
-        for point in where1d(self.board!=BORDER):
-            if flag[0]:
-                break
-            for direction in range(0,4):
-                    self.check_pattern(point,'',direction_x[direction],direction_y[direction],moveSet,patternList,color,flag)
-        
-        i=0
-        while i<4 and not bool(moveSet[i]):
-            i+=1
-        if i==4:
-            return None
-        else:
-            return list(moveSet[i])
+        moveSet = self.solve_points.move_sets(self.board, self.current_player)
+        for i in range(len(moveSet)):
+            if moveSet[i]:
+                return list(moveSet[i])
+        return None
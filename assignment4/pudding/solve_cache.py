@@ -0,0 +1,63 @@
+"""
+solve_cache.py
+
+LRU cache of endgame solves.
+
+Rollouts that reach SOLVE_EMPTIES empty points end with board.solve(),
+and many of them end in the same small positions. A SolveCache keeps
+the results of the latest solves, keyed by the Zobrist hash of the
+board and the player to move, so a position is only searched once.
+The module keeps one cache for all searches of the process, so that it
+carries over from playout to playout and from one genmove to the next.
+"""
+
+from collections import OrderedDict
+
+"""
+Solved positions kept, at most.
+"""
+CAPACITY = 100000
+
+
+class SolveCache(object):
+
+    def __init__(self, capacity=CAPACITY):
+        self.capacity = capacity
+        self.results = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.results)
+
+    def solve(self, board):
+        """
+        board.solve(), from the cache when the position is in it.
+        """
+        key = (board.hash, board.current_player)
+        result = self.results.get(key)
+        if result is not None:
+            self.hits += 1
+            self.results.move_to_end(key)
+            return result
+        self.misses += 1
+        result = board.solve()
+        self.results[key] = result
+        if len(self.results) > self.capacity:
+            self.results.popitem(last=False)
+        return result
+
+    def clear(self):
+        self.results.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+_cache = SolveCache()
+
+
+def get_cache():
+    """
+    The cache shared by all searches of this process.
+    """
+    return _cache
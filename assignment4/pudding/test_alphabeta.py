@@ -0,0 +1,101 @@
+#!/usr/local/bin/python3
+# /usr/bin/python3
+# Set the path to your python3 above
+
+import random
+import unittest
+from board_util import BLACK, WHITE
+from simple_board import SimpleGoBoard
+from solve_stats import SolveStats
+import alphabeta
+
+
+class AlphabetaTestCase(unittest.TestCase):
+    """Tests for alphabeta.py"""
+
+    def test_solve_stats_win(self):
+        goboard = SimpleGoBoard(7)
+        for col in range(1, 5):
+            goboard.play_move_gomoku(goboard.pt(2, col), BLACK)
+            goboard.play_move_gomoku(goboard.pt(5, col + 1), WHITE)
+        for mode in ("two_pass", "full"):
+            stats = SolveStats()
+            self.assertEqual(goboard.solve(mode, stats), ('b', goboard.pt(2, 5)))
+            # the root and the finished game after the winning move
+            self.assertEqual((stats.nodes, stats.max_depth, stats.tt_probes), (2, 1, 0))
+
+    def test_solve_stats_count(self):
+        rng = random.Random(455)
+        goboard = SimpleGoBoard(5)
+        while len(goboard.get_empty_points()) > 9:
+            goboard.play_move_gomoku(rng.choice(goboard.get_empty_points()),
+                                     goboard.current_player)
+        stats = SolveStats()
+        goboard.solve("two_pass", stats)
+        stats.stop()
+        self.assertGreater(stats.nodes, stats.tt_probes)
+        self.assertGreater(stats.tt_probes, stats.tt_hits)
+        self.assertGreater(stats.tt_hits, 0)
+        self.assertGreater(stats.cutoffs, 0)
+        self.assertLessEqual(stats.first_move_cutoffs, stats.cutoffs)
+        self.assertEqual(stats.max_depth, 9)
+        self.assertEqual(stats.tt_collisions, 0)
+
+    def test_tt_collision(self):
+        goboard = SimpleGoBoard(7)
+        for col in range(1, 5):
+            goboard.play_move_gomoku(goboard.pt(2, col), BLACK)
+            goboard.play_move_gomoku(goboard.pt(5, col + 1), WHITE)
+        # a loss stored by another position under the code of this one
+        code = alphabeta.tt_code(goboard, 0)
+        tt = {code: (b"other position", 0)}
+        stats = SolveStats()
+        self.assertEqual(alphabeta.null_window(goboard, 0, tt, stats), 1)
+        self.assertEqual((stats.tt_probes, stats.tt_hits, stats.tt_collisions), (1, 0, 1))
+        self.assertEqual(tt[code], (goboard.board.tobytes(), 1))
+        stats = SolveStats()
+        self.assertEqual(alphabeta.null_window(goboard, 0, tt, stats), 1)
+        self.assertEqual((stats.tt_probes, stats.tt_hits, stats.tt_collisions), (1, 1, 0))
+
+    def test_solve_budget_win(self):
+        goboard = SimpleGoBoard(7)
+        for col in range(1, 5):
+            goboard.play_move_gomoku(goboard.pt(2, col), BLACK)
+            goboard.play_move_gomoku(goboard.pt(5, col + 1), WHITE)
+        self.assertEqual(alphabeta.solve_budget(goboard, 5), 1)
+        goboard.current_player = WHITE
+        self.assertEqual(alphabeta.solve_budget(goboard, 5), 1)
+        self.assertEqual(goboard.solve_budget(5), 'w')
+
+    def test_solve_budget_unknown(self):
+        goboard = SimpleGoBoard(7)
+        goboard.play_move_gomoku(goboard.pt(4, 4), BLACK)
+        board = goboard.board.copy()
+        code = goboard.hash
+        candidates = set(goboard.candidates)
+        self.assertEqual(alphabeta.solve_budget(goboard, 50), alphabeta.UNKNOWN)
+        # the search was cut off deep in the tree, the board is restored
+        self.assertTrue((goboard.board == board).all())
+        self.assertEqual(goboard.hash, code)
+        self.assertEqual(goboard.candidates, candidates)
+        self.assertEqual(goboard.current_player, WHITE)
+        self.assertIsNone(goboard.solve_budget(50))
+
+    def test_solve_budget_agrees(self):
+        rng = random.Random(455)
+        winners = set()
+        while len(winners) < 3:
+            goboard = SimpleGoBoard(5)
+            while len(goboard.get_empty_points()) > 6:
+                goboard.play_move_gomoku(rng.choice(goboard.get_empty_points()),
+                                         goboard.current_player)
+            if goboard.check_game_end_gomoku()[0]:
+                continue
+            winner, _ = goboard.copy().solve()
+            self.assertEqual(goboard.solve_budget(100000), winner)
+            winners.add(winner)
+
+
+"""Main"""
+if __name__ == "__main__":
+    unittest.main()
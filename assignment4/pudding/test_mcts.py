@@ -0,0 +1,426 @@
+#!/usr/local/bin/python3
+# /usr/bin/python3
+# Set the path to your python3 above
+
+import math
+import random
+import time
+import unittest
+import numpy as np
+import mcts as mcts_module
+from board_util import BLACK, WHITE
+from simple_board import SimpleGoBoard
+from mcts import MCTS, move_priors
+from mcts_tree import MCTSTree, ROOT, DRAW
+from root_parallel import RootParallelPool, merge_statistics, best_merged_move
+from search_control import SearchControl
+from transposition_mcts import TranspositionMCTS
+from Gomoku4 import Gomoku_MCTSBased_Player
+
+
+class MCTSTestCase(unittest.TestCase):
+    """Tests for mcts.py and mcts_tree.py"""
+
+    def test_update_amaf(self):
+        goboard = SimpleGoBoard(7)
+        mcts = MCTS()
+        tree = mcts.tree
+        a, b, c, d = (goboard.pt(4, col) for col in range(1, 5))
+        tree.expand(ROOT, [a, b, c, d])
+        child = tree.child(ROOT, a)
+        tree.expand(child, [b, c, d])
+        # root plays a, then the rollout plays b, c, d
+        mcts._update_amaf([(ROOT, BLACK), (child, WHITE)], [a, b, c, d], 1)
+        self.assertEqual([tree.amaf_visits[tree.child(ROOT, p)] for p in (a, b, c, d)],
+                         [1, 0, 1, 0])
+        self.assertEqual([tree.amaf_visits[tree.child(child, p)] for p in (b, c, d)],
+                         [1, 0, 1])
+        self.assertEqual(tree.amaf_winrate(tree.child(child, b), True), 1.0)
+
+    def test_playout_counts(self):
+        random.seed(455)
+        goboard = SimpleGoBoard(5)
+        mcts = MCTS()
+        mcts.exploration = 1.0
+        for _ in range(20):
+            mcts._playout(goboard.copy(), BLACK)
+        tree = mcts.tree
+        children = tree.children(ROOT)
+        self.assertEqual(tree.visits[ROOT], 20)
+        self.assertEqual(sum(tree.visits[child] for child in children), 20)
+        # every playout fills most of the board
+        self.assertGreater(sum(tree.amaf_visits[child] for child in children), 20)
+
+    def test_select_matches_scalar_uct(self):
+        rng = random.Random(455)
+        k = 50
+        for _ in range(200):
+            tree = MCTSTree(rave_equivalence=k)
+            n = rng.randint(2, 12)
+            moves = list(range(100, 100 + n))
+            tree.expand(ROOT, moves)
+            # playouts through random children, in some trees not all
+            # of them, and AMAF updates of random move sets
+            played = rng.sample(list(tree.children(ROOT)), max(1, n - rng.choice((0, 0, 1, 2))))
+            for _ in range(rng.randint(n, 60)):
+                value = rng.choice((0, 0.5, 1))
+                tree.update(rng.choice(played), value)
+                tree.update_amaf(ROOT, set(rng.sample(moves, rng.randint(0, n))), value)
+            for exploration in (0.0, 0.4, math.sqrt(2)):
+                for max_flag in (True, False):
+                    self.assertEqual(tree.select(ROOT, exploration, max_flag),
+                                     self._scalar_select(tree, exploration, max_flag, k))
+
+    def _scalar_select(self, tree, exploration, max_flag, k):
+        """
+        UCT with the RAVE value, child by child, the first best child
+        on ties and unvisited children first.
+        """
+        parent_visits = tree.visits[ROOT]
+        best, best_score = None, -math.inf
+        for child in tree.children(ROOT):
+            visits = tree.visits[child]
+            if visits == 0:
+                return child
+            value = tree.black_wins[child] / visits
+            amaf_visits = tree.amaf_visits[child]
+            if amaf_visits:
+                beta = math.sqrt(k / (3 * visits + k))
+                value = (1 - beta) * value + beta * tree.amaf_black_wins[child] / amaf_visits
+            if not max_flag:
+                value = 1 - value
+            score = value + exploration * math.sqrt(math.log(parent_visits) / visits)
+            if score > best_score + 1e-12:
+                best, best_score = child, score
+        return best
+
+    def test_tree_growth(self):
+        tree = MCTSTree(capacity=8)
+        tree.expand(ROOT, list(range(5)))
+        tree.expand(3, list(range(10, 16)))
+        self.assertGreaterEqual(tree.capacity, 12)
+        self.assertEqual(list(tree.children(3)), list(range(6, 12)))
+        self.assertEqual(tree.child(3, 12), 8)
+        tree.update(8, 1)
+        tree.update(2, 0.5)
+        self.assertEqual(list(tree.visits[:tree.size]),
+                         [2, 0, 1, 1, 0, 0, 0, 0, 1, 0, 0, 0])
+        subtree = tree.subtree(3)
+        self.assertEqual(subtree.size, 7)
+        self.assertEqual(list(subtree.move[1:7]), list(range(10, 16)))
+        self.assertEqual(list(subtree.parent[:7]), [-1, 0, 0, 0, 0, 0, 0])
+        self.assertEqual(subtree.visits[subtree.child(ROOT, 12)], 1)
+
+    def test_reuse_tree(self):
+        random.seed(455)
+        goboard = SimpleGoBoard(5)
+        mcts = MCTS()
+        mcts.exploration = 1.0
+        mcts._reuse_tree(goboard, BLACK)
+        for _ in range(60):
+            mcts._playout(goboard.copy(), BLACK)
+        tree = mcts.tree
+        child = max(tree.children(ROOT), key=lambda node: tree.visits[node])
+        grandchild = max(tree.children(child), key=lambda node: tree.visits[node])
+        visits = tree.visits[grandchild]
+        goboard.play_move_gomoku(int(tree.move[child]), BLACK)
+        goboard.play_move_gomoku(int(tree.move[grandchild]), WHITE)
+        mcts._reuse_tree(goboard, BLACK)
+        self.assertEqual(mcts.tree.visits[ROOT], visits)
+        self.assertEqual(mcts.tree.parent[ROOT], -1)
+        # a position off the tree starts over
+        goboard.undo_move_gomoku(int(tree.move[grandchild]))
+        goboard.undo_move_gomoku(int(tree.move[child]))
+        mcts._reuse_tree(goboard, BLACK)
+        self.assertEqual(mcts.tree.visits[ROOT], 0)
+
+    def test_merge_statistics(self):
+        merged = merge_statistics([([3, 4], [10, 5], [6, 1], [0, 0]),
+                                   ([4, 3], [10, 5], [9, 0], [0, 0])])
+        self.assertEqual(merged, {3: [15, 6, 0], 4: [15, 10, 0]})
+        self.assertEqual(best_merged_move(merged, True), 4)
+        self.assertEqual(best_merged_move(merged, False), 3)
+        # a proven win beats visits, a proven loss is avoided
+        merged = merge_statistics([([3, 4, 5], [10, 5, 1], [6, 1, 0], [WHITE, 0, 0]),
+                                   ([3, 4, 5], [10, 5, 1], [6, 1, 1], [0, 0, BLACK])])
+        self.assertEqual(best_merged_move(merged, True), 5)
+        self.assertEqual(best_merged_move(merged, False), 3)
+        del merged[5]
+        self.assertEqual(best_merged_move(merged, True), 4)
+
+    def test_root_parallel_pool(self):
+        goboard = SimpleGoBoard(5)
+        pool = RootParallelPool(2)
+        try:
+            statistics = pool.search(goboard, BLACK, 1.0, SearchControl(1.5))
+        finally:
+            pool.close()
+        self.assertEqual(len(statistics), 2)
+        for moves, visits, _, _ in statistics:
+            self.assertEqual(sorted(moves), sorted(goboard.get_empty_points()))
+            self.assertGreater(sum(visits), 0)
+
+    def test_playout_batch(self):
+        random.seed(455)
+        goboard = SimpleGoBoard(5)
+        mcts = MCTS()
+        mcts.exploration = 1.0
+        mcts.batch_size = 4
+        mcts._playout_batch(goboard, BLACK)
+        tree = mcts.tree
+        visits = [tree.visits[child] for child in tree.children(ROOT)]
+        # virtual loss spreads the batch over four different children
+        self.assertEqual(visits[:4], [1, 1, 1, 1])
+        self.assertEqual(sum(visits), 4)
+        self.assertEqual(tree.visits[ROOT], 4)
+        mcts.rollout_workers = 2
+        for _ in range(3):
+            mcts._playout_batch(goboard, BLACK)
+        self.assertEqual(tree.visits[ROOT], 16)
+        self.assertEqual(sum(tree.visits[child] for child in tree.children(ROOT)), 16)
+
+    def test_prove(self):
+        tree = MCTSTree()
+        tree.expand(ROOT, [10, 11, 12], BLACK, complete=True)
+        a, b, c = tree.children(ROOT)
+        tree.expand(a, [20, 21], WHITE, complete=False)
+        tree.prove(b, WHITE)
+        tree.prove(c, DRAW)
+        self.assertEqual(tree.proof[ROOT], 0)
+        # a white win below a only proves a win for white at a
+        tree.prove(tree.child(a, 20), BLACK)
+        self.assertEqual(tree.proof[a], 0)
+        tree.prove(tree.child(a, 21), WHITE)
+        self.assertEqual(tree.proof[a], WHITE)
+        # all children of the complete root are proven, the best is a draw
+        self.assertEqual(tree.proof[ROOT], DRAW)
+        self.assertEqual(tree.best_move(True), 12)
+        self.assertEqual(tree.select(ROOT, 1.0, True), c)
+
+    def test_proven_win(self):
+        goboard = SimpleGoBoard(7)
+        for col in range(1, 5):
+            goboard.play_move_gomoku(goboard.pt(2, col), BLACK)
+            goboard.play_move_gomoku(goboard.pt(5, col + 1), WHITE)
+        mcts = MCTS()
+        start = time.monotonic()
+        self.assertEqual(mcts.get_move(goboard, BLACK, 1.0, 30), goboard.pt(2, 5))
+        self.assertLess(time.monotonic() - start, 5)
+        self.assertEqual(mcts.tree.proof[ROOT], BLACK)
+
+    def test_reuse_proven_leaf(self):
+        # a board without fives, filled but for seven points
+        empty = [(4, 4), (4, 6), (1, 3), (3, 3), (5, 5), (5, 4), (4, 5)]
+        for proof in (BLACK, DRAW):
+            # with other shuffles the root can be proven a win for
+            # black before any draw is in the tree
+            random.seed(0)
+            np.random.seed(0)
+            goboard = SimpleGoBoard(7)
+            for row in range(1, 8):
+                for col in range(1, 8):
+                    if (row, col) not in empty:
+                        color = BLACK if (col + 2 * row) % 4 < 2 else WHITE
+                        goboard.play_move_gomoku(goboard.pt(row, col), color)
+            goboard.current_player = BLACK
+            mcts = MCTS()
+            mcts._reuse_tree(goboard, BLACK)
+            mcts.exploration = 1.0
+            # playouts, not a time limit, until a grandchild with five
+            # empty points is proven but never expanded
+            found = None
+            for _ in range(2000):
+                mcts._run_playout(goboard, BLACK)
+                tree = mcts.tree
+                found = next(
+                    ((child, grandchild) for child in tree.children(ROOT)
+                     for grandchild in tree.children(child)
+                     if tree.proof[grandchild] == proof and not tree.expanded[grandchild]),
+                    None)
+                if found:
+                    break
+            child, grandchild = found
+            goboard.play_move_gomoku(int(tree.move[child]), BLACK)
+            goboard.play_move_gomoku(int(tree.move[grandchild]), WHITE)
+            move = mcts.get_move(goboard, BLACK, 1.0, 1)
+            self.assertIn(move, goboard.get_empty_points())
+            # the root was searched again and proven from its children
+            self.assertGreater(mcts.tree.visits[ROOT], 0)
+            self.assertEqual(mcts.tree.proof[ROOT], proof)
+            if proof == BLACK:
+                self.assertEqual(mcts.tree.proof[mcts.tree.child(ROOT, move)], BLACK)
+        self.assertIsNone(MCTSTree().best_move(True))
+
+    def test_progressive_widening(self):
+        tree = MCTSTree(widening_base=2, widening_exponent=0.5, prior_weight=1.0)
+        tree.expand(ROOT, [10, 11, 12, 13, 14], BLACK, priors=[1, 4, 2, 8, 1])
+        self.assertEqual([int(tree.move[child]) for child in tree.children(ROOT)],
+                         [13, 11, 12, 10, 14])
+        self.assertAlmostEqual(float(tree.prior[1:6].sum()), 1.0)
+        picked = []
+        for _ in range(4):
+            child = tree.select(ROOT, 1.0, True)
+            picked.append(int(tree.move[child]))
+            tree.update(child, 0.5)
+        # two children until the root has 1 visit, three from 1 to 3
+        self.assertEqual(picked, [13, 11, 12, 13])
+        self.assertEqual(tree.widened(ROOT), 4)
+        # proven losses unlock the rest
+        for child in list(tree.children(ROOT))[:4]:
+            tree.prove(child, WHITE)
+        self.assertEqual(int(tree.move[tree.select(ROOT, 1.0, True)]), 14)
+
+    def test_move_priors(self):
+        goboard = SimpleGoBoard(7)
+        goboard.play_move_gomoku(goboard.pt(4, 4), BLACK)
+        goboard.play_move_gomoku(goboard.pt(1, 1), WHITE)
+        for col in (2, 3, 4):
+            goboard.play_move_gomoku(goboard.pt(6, col), BLACK)
+            goboard.play_move_gomoku(goboard.pt(2, col + 3), WHITE)
+        near, far, open_three = goboard.pt(4, 5), goboard.pt(7, 7), goboard.pt(6, 5)
+        priors = move_priors(goboard, [near, far, open_three])
+        self.assertEqual(priors[1], 1)
+        self.assertGreater(priors[0], priors[1])
+        # black to play makes a four from its open three
+        self.assertGreater(priors[2], priors[0])
+
+    def test_budget_solve_rollout(self):
+        random.seed(455)
+        goboard = SimpleGoBoard(4)
+        while len(goboard.get_empty_points()) > 8:
+            goboard.play_move_gomoku(random.choice(goboard.get_empty_points()),
+                                     goboard.current_player)
+        winner, _ = goboard.copy().solve()
+        expected = MCTS()._rollout_value(winner)
+        budget = mcts_module.BUDGET_SOLVE_EMPTIES, mcts_module.BUDGET_SOLVE_NODES
+        mcts_module.BUDGET_SOLVE_EMPTIES, mcts_module.BUDGET_SOLVE_NODES = 8, 100000
+        try:
+            # a large enough budget solves right away, without playing
+            self.assertEqual(MCTS()._evaluate_rollout(goboard.copy(), goboard.current_player),
+                             (expected, []))
+            mcts_module.BUDGET_SOLVE_NODES = 1
+            value, moves = MCTS()._evaluate_rollout(goboard.copy(), goboard.current_player)
+            self.assertIn(value, (0, 0.5, 1))
+            self.assertGreater(len(moves), 0)
+        finally:
+            mcts_module.BUDGET_SOLVE_EMPTIES, mcts_module.BUDGET_SOLVE_NODES = budget
+
+    def test_ponder(self):
+        random.seed(455)
+        goboard = SimpleGoBoard(5)
+        player = Gomoku_MCTSBased_Player()
+        player.set_ponder(True)
+        goboard.play_move_gomoku(goboard.pt(3, 3), BLACK)
+        player.start_pondering(goboard, WHITE)
+        time.sleep(1)
+        player.stop_pondering()
+        tree = player.mcts.tree
+        self.assertGreater(tree.visits[ROOT], 0)
+        # the reply searched most while pondering becomes the new root
+        reply = max(tree.children(ROOT), key=lambda node: tree.visits[node])
+        visits = tree.visits[reply]
+        goboard.play_move_gomoku(int(tree.move[reply]), WHITE)
+        player.mcts._reuse_tree(goboard, BLACK)
+        self.assertEqual(player.mcts.tree.visits[ROOT], visits)
+        player.set_ponder(False)
+        player.start_pondering(goboard, BLACK)
+        self.assertIsNone(player._ponder_thread)
+
+    def test_transposition_table(self):
+        random.seed(455)
+        goboard = SimpleGoBoard(5)
+        mcts = TranspositionMCTS()
+        mcts.exploration = 1.0
+        mcts._root(goboard, BLACK)
+        for _ in range(200):
+            mcts._playout(goboard.copy(), BLACK)
+        root = mcts.table[mcts.root_key]
+        self.assertEqual(root.visits, 200)
+        # the first playout expanded the root
+        self.assertEqual(sum(root.edge_visits), 199)
+        # a, b, c, d and c, b, a, d reach the same node
+        a, b, c, d = root.moves[:4]
+        keys = set()
+        for order in ((a, b, c, d), (c, b, a, d)):
+            board = goboard.copy()
+            for move in order:
+                board.play_move_gomoku(move, board.current_player)
+            keys.add((board.hash, board.current_player))
+        self.assertEqual(len(keys), 1)
+        # a win rate gathered on another path decides between equal edges
+        e, f = root.moves[4:6]
+        node = mcts._lookup(keys.pop())
+        node.expand([e, f])
+        node.edge_visits = [1, 1]
+        node.edge_black_wins = [0.5, 0.5]
+        after_f = board.copy()
+        after_f.play_move_gomoku(f, BLACK)
+        shared = mcts._lookup((after_f.hash, WHITE))
+        shared.visits, shared.black_wins = 10, 10
+        mcts.exploration = 0
+        self.assertEqual(node.moves[mcts._select_edge(node, board, BLACK)], f)
+
+    def test_transposition_eviction(self):
+        random.seed(455)
+        goboard = SimpleGoBoard(5)
+        mcts = TranspositionMCTS(max_nodes=20)
+        mcts.exploration = 1.0
+        mcts._root(goboard, BLACK)
+        for _ in range(100):
+            mcts._playout(goboard.copy(), BLACK)
+        self.assertLessEqual(len(mcts.table), 20)
+        self.assertEqual(mcts.table[mcts.root_key].visits, 100)
+        self.assertIn(mcts.get_move(goboard, BLACK, 1.0, 1), goboard.get_empty_points())
+
+    def test_transposition_proven_win(self):
+        goboard = SimpleGoBoard(7)
+        for col in range(1, 5):
+            goboard.play_move_gomoku(goboard.pt(2, col), BLACK)
+            goboard.play_move_gomoku(goboard.pt(5, col + 1), WHITE)
+        mcts = TranspositionMCTS()
+        start = time.monotonic()
+        self.assertEqual(mcts.get_move(goboard, BLACK, 1.0, 30), goboard.pt(2, 5))
+        self.assertLess(time.monotonic() - start, 5)
+
+    def test_transposition_search_statistics(self):
+        # black wins at (2, 5), white at (5, 1) or (5, 6)
+        goboard = SimpleGoBoard(7)
+        for col in range(1, 5):
+            goboard.play_move_gomoku(goboard.pt(2, col), BLACK)
+            goboard.play_move_gomoku(goboard.pt(5, col + 1), WHITE)
+        mcts = TranspositionMCTS()
+        statistics = mcts.search(goboard, BLACK, 1.0, SearchControl(1))
+        moves, visits, black_wins, proofs = statistics
+        self.assertEqual(len(moves), len(proofs))
+        self.assertEqual(proofs[moves.index(goboard.pt(2, 5))], BLACK)
+        merged = merge_statistics([statistics])
+        self.assertEqual(best_merged_move(merged, True), goboard.pt(2, 5))
+        self.assertTrue(mcts._decided(SearchControl(1), sum(visits)))
+
+    def test_transposition_settings(self):
+        random.seed(455)
+        goboard = SimpleGoBoard(5)
+        player = Gomoku_MCTSBased_Player()
+        player.set_transpositions(True)
+        self.assertFalse(player.is_parallel())
+        self.assertFalse(player.mcts.root_parallel())
+        with self.assertRaises(AssertionError):
+            player.set_workers(2)
+        with self.assertRaises(AssertionError):
+            player.set_leaf_parallel(4, 0)
+        # the transposition search is serial, so it is pondered
+        player.set_ponder(True)
+        goboard.play_move_gomoku(goboard.pt(3, 3), BLACK)
+        player.start_pondering(goboard, WHITE)
+        self.assertIsNotNone(player._ponder_thread)
+        player.stop_pondering()
+        self.assertGreater(player.mcts.table[player.mcts.root_key].visits, 0)
+        player.set_transpositions(False)
+        player.set_leaf_parallel(4, 0)
+        with self.assertRaises(AssertionError):
+            player.set_transpositions(True)
+
+
+"""Main"""
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+#!/usr/local/bin/python3
+# /usr/bin/python3
+# Set the path to your python3 above
+
+import os
+import tempfile
+import unittest
+from board_util import BLACK, GoBoardUtil
+from simple_board import SimpleGoBoard
+import opening_book
+from opening_book import (
+    BOOK_UNKNOWN,
+    BOOK_WIN,
+    OpeningBook,
+    canonical_key,
+    symmetry_maps,
+    write_book,
+)
+
+
+class OpeningBookTestCase(unittest.TestCase):
+    """Tests for opening_book.py"""
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix=".bin")
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def write_entry(self, board, row, col, result):
+        """
+        Write a book with a single entry: play (row, col) in the position of board.
+        """
+        maps = symmetry_maps(board.size)
+        board2d = GoBoardUtil.get_twoD_board(board)
+        key, t = canonical_key(board2d, board.current_player, maps)
+        move = list(t).index((row - 1) * board.size + (col - 1))
+        write_book(self.path, board.size, {key: (move, result)})
+
+    def test_empty_book_lookup(self):
+        write_book(self.path, 7, {})
+        book = OpeningBook(self.path)
+        self.assertEqual(len(book), 0)
+        self.assertIsNone(book.lookup(SimpleGoBoard(7)))
+        book.close()
+
+    def test_lookup_symmetric_positions(self):
+        board = SimpleGoBoard(7)
+        board.play_move_gomoku(board.pt(1, 2), BLACK)
+        self.write_entry(board, 2, 2, BOOK_UNKNOWN)
+        book = OpeningBook(self.path)
+        # the 8 images of B1 and the matching images of the reply B2
+        for stone, reply in [((1, 2), (2, 2)), ((2, 1), (2, 2)),
+                             ((1, 6), (2, 6)), ((6, 1), (6, 2)),
+                             ((7, 2), (6, 2)), ((2, 7), (2, 6)),
+                             ((7, 6), (6, 6)), ((6, 7), (6, 6))]:
+            board = SimpleGoBoard(7)
+            board.play_move_gomoku(board.pt(*stone), BLACK)
+            self.assertEqual(book.lookup(board), (board.pt(*reply), BOOK_UNKNOWN))
+        book.close()
+
+    def test_lookup_checks_player_and_size(self):
+        board = SimpleGoBoard(7)
+        board.play_move_gomoku(board.pt(4, 4), BLACK)
+        self.write_entry(board, 4, 5, BOOK_WIN)
+        book = OpeningBook(self.path)
+        self.assertEqual(book.lookup(board), (board.pt(4, 5), BOOK_WIN))
+        board.current_player = BLACK
+        self.assertIsNone(book.lookup(board))
+        self.assertIsNone(book.lookup(SimpleGoBoard(9)))
+        book.close()
+
+    def test_load_missing_book(self):
+        self.assertIsNone(opening_book.load_book(self.path + ".missing"))
+
+
+"""Main"""
+if __name__ == "__main__":
+    unittest.main()
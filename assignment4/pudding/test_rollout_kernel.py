@@ -0,0 +1,78 @@
+#!/usr/local/bin/python3
+# /usr/bin/python3
+# Set the path to your python3 above
+
+import random
+import unittest
+from board_util import BLACK, WHITE
+from simple_board import SimpleGoBoard
+from rollout_kernel import PointSet, playout
+import mcts
+
+
+class RolloutKernelTestCase(unittest.TestCase):
+    """Tests for rollout_kernel.py"""
+
+    def test_point_set(self):
+        points = PointSet([3, 5, 8])
+        points.discard(3)
+        points.discard(4)
+        points.add(5)
+        points.add(9)
+        self.assertEqual(sorted(points.items), [5, 8, 9])
+        self.assertEqual(len(points), 3)
+        self.assertIn(points.choice(), (5, 8, 9))
+
+    def test_playout_matches_board(self):
+        random.seed(455)
+        for use_patterns in (True, False):
+            for use_zone in (True, False):
+                for _ in range(30):
+                    goboard = SimpleGoBoard(7)
+                    before = goboard.board.copy()
+                    winner, moves = playout(goboard, use_patterns, use_zone)
+                    self.assertTrue((goboard.board == before).all())
+                    for move in moves[:-1]:
+                        goboard.play_move_gomoku(move, goboard.current_player)
+                        self.assertEqual(goboard.check_game_end_gomoku(), (False, None))
+                    color = goboard.current_player
+                    goboard.play_move_gomoku(moves[-1], color)
+                    if winner == 'draw':
+                        self.assertEqual(len(goboard.get_empty_points()), 0)
+                        self.assertEqual(goboard.check_game_end_gomoku(), (False, None))
+                    else:
+                        self.assertEqual(goboard.check_game_end_gomoku(), (True, winner))
+                        self.assertEqual(winner, color)
+
+    def test_playout_plays_win(self):
+        goboard = SimpleGoBoard(7)
+        for col in range(1, 5):
+            goboard.play_move_gomoku(goboard.pt(1, col), BLACK)
+            goboard.play_move_gomoku(goboard.pt(3, col), WHITE)
+        self.assertEqual(playout(goboard), (BLACK, [goboard.pt(1, 5)]))
+
+    def test_playout_stop(self):
+        goboard = SimpleGoBoard(5)
+        winner, moves = playout(goboard, stop_empties=24)
+        self.assertEqual((winner, len(moves)), (None, 1))
+
+    def test_mcts_fast_rollout(self):
+        random.seed(455)
+        goboard = SimpleGoBoard(5)
+        fast = mcts.FAST_ROLLOUT
+        mcts.FAST_ROLLOUT = True
+        try:
+            for _ in range(20):
+                board = goboard.copy()
+                value, moves = mcts.MCTS()._evaluate_rollout(board, BLACK)
+                self.assertIn(value, (0, 0.5, 1))
+                self.assertEqual(len(set(moves)), len(moves))
+                # all moves are empty points of the starting position
+                self.assertTrue(set(moves) <= set(goboard.get_empty_points()))
+        finally:
+            mcts.FAST_ROLLOUT = fast
+
+
+"""Main"""
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+#!/usr/local/bin/python3
+# /usr/bin/python3
+# Set the path to your python3 above
+
+import time
+import unittest
+from simple_board import SimpleGoBoard
+from search_control import SearchControl, SearchTimeout
+
+
+class SearchControlTestCase(unittest.TestCase):
+    """Tests for search_control.py"""
+
+    def test_deadline(self):
+        control = SearchControl(0.6, margin=0.5)
+        self.assertFalse(control.expired())
+        control.check()
+        time.sleep(0.15)
+        self.assertTrue(control.expired())
+        self.assertEqual(control.remaining(), 0)
+        self.assertRaises(SearchTimeout, control.check)
+        unlimited = SearchControl()
+        self.assertFalse(unlimited.expired())
+        self.assertIsNone(unlimited.remaining())
+        self.assertFalse(unlimited.decided(100, 0, 100))
+        unlimited.stop()
+        self.assertTrue(unlimited.expired())
+        self.assertEqual(unlimited.remaining(), 0)
+
+    def test_decided(self):
+        control = SearchControl(10.5, margin=0.5)
+        control.start -= 1
+        # 100 playouts a second and about 9 seconds left
+        self.assertFalse(control.decided(500, 0, 100))
+        self.assertTrue(control.decided(1000, 0, 100))
+
+    def test_solve_timeout(self):
+        goboard = SimpleGoBoard(7)
+        control = SearchControl(0.6, margin=0.5)
+        start = time.monotonic()
+        self.assertRaises(SearchTimeout, goboard.copy().solve, "two_pass", None, control)
+        self.assertLess(time.monotonic() - start, 0.5)
+
+
+"""Main"""
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+#!/usr/local/bin/python3
+# /usr/bin/python3
+# Set the path to your python3 above
+
+import random
+import unittest
+import numpy as np
+from board_util import BLACK, WHITE, GoBoardUtil
+from simple_board import SimpleGoBoard, PATTERN_MOVES
+
+
+class SimpleGoBoardTestCase(unittest.TestCase):
+    """Tests for simple_board.py"""
+
+    def test_empty_board_candidates(self):
+        goboard = SimpleGoBoard(7)
+        self.assertEqual(len(goboard.candidates), 0)
+        self.assertEqual(len(goboard.get_candidate_moves()), 49)
+
+    def test_candidate_zone_play(self):
+        goboard = SimpleGoBoard(7, candidate_distance=1)
+        goboard.play_move_gomoku(goboard.pt(1, 1), BLACK)
+        self.assertEqual(
+            sorted(goboard.get_candidate_moves()),
+            [goboard.pt(1, 2), goboard.pt(2, 1), goboard.pt(2, 2)],
+        )
+        goboard.play_move_gomoku(goboard.pt(4, 4), WHITE)
+        self.assertEqual(len(goboard.get_candidate_moves()), 11)
+
+    def test_candidate_zone_undo(self):
+        goboard = SimpleGoBoard(7)
+        goboard.play_move_gomoku(goboard.pt(4, 4), BLACK)
+        goboard.play_move_gomoku(goboard.pt(4, 5), WHITE)
+        goboard.undo_move_gomoku(goboard.pt(4, 5))
+        self.assertEqual(goboard.current_player, WHITE)
+        self.assertEqual(len(goboard.candidates), 24)
+        self.assertIn(goboard.pt(4, 5), goboard.candidates)
+        goboard.undo_move_gomoku(goboard.pt(4, 4))
+        self.assertEqual(len(goboard.candidates), 0)
+        self.assertEqual(goboard.zone_count, [0] * goboard.maxpoint)
+
+    def test_candidate_zone_matches_rebuild(self):
+        goboard = SimpleGoBoard(7)
+        moves = []
+        for move in GoBoardUtil.generate_legal_moves_gomoku(goboard)[:20]:
+            goboard.play_move_gomoku(move, goboard.current_player)
+            moves.append(move)
+        for move in moves[10:]:
+            goboard.undo_move_gomoku(move)
+        rebuilt = SimpleGoBoard(7)
+        rebuilt.board = np.copy(goboard.board)
+        rebuilt.set_candidate_distance(goboard.candidate_distance)
+        self.assertEqual(goboard.candidates, rebuilt.candidates)
+        self.assertEqual(goboard.copy().candidates, goboard.candidates)
+
+    def test_solve_two_pass_win(self):
+        goboard = SimpleGoBoard(7)
+        for col in range(1, 5):
+            goboard.play_move_gomoku(goboard.pt(1, col), BLACK)
+            goboard.play_move_gomoku(goboard.pt(3, col + 2), WHITE)
+        winner, move = goboard.solve("two_pass")
+        self.assertEqual(winner, 'b')
+        self.assertEqual(move, goboard.pt(1, 5))
+        self.assertEqual(goboard.solve("full"), (winner, move))
+
+    def test_pattern_moves_block_open_three(self):
+        goboard = SimpleGoBoard(7)
+        for col in range(2, 5):
+            goboard.play_move_gomoku(goboard.pt(1, col), WHITE)
+        goboard.current_player = BLACK
+        move_class, moves = goboard.get_pattern_moves()
+        self.assertEqual(move_class, 3)
+        self.assertEqual(sorted(moves),
+                         [goboard.pt(1, 1), goboard.pt(1, 5), goboard.pt(1, 6)])
+        self.assertEqual(sorted(goboard.list_solve_point()),
+                         [goboard.pt(1, 1), goboard.pt(1, 5)])
+
+    def test_pattern_moves_win_first(self):
+        goboard = SimpleGoBoard(7)
+        for col in range(2, 5):
+            goboard.play_move_gomoku(goboard.pt(1, col), WHITE)
+        for row in range(3, 7):
+            goboard.play_move_gomoku(goboard.pt(row, 7), BLACK)
+        goboard.current_player = BLACK
+        move_class, moves = goboard.get_pattern_moves()
+        self.assertEqual(move_class, 0)
+        self.assertEqual(sorted(moves), [goboard.pt(2, 7), goboard.pt(7, 7)])
+
+    def test_pattern_cache_matches_full_scan(self):
+        rng = random.Random(455)
+        goboard = SimpleGoBoard(7)
+        played = []
+        for _ in range(150):
+            empty = list(goboard.get_empty_points())
+            if played and (not empty or rng.random() < 0.3):
+                goboard.undo_move_gomoku(played.pop())
+            else:
+                point = rng.choice(empty)
+                goboard.play_move_gomoku(point, goboard.current_player)
+                played.append(point)
+            if rng.random() < 0.1:
+                goboard = goboard.copy()
+            color = goboard.current_player
+            self.assertEqual(
+                [set(moves) for moves in goboard.pattern_moves.move_sets(goboard.board, color)],
+                PATTERN_MOVES.match(goboard, color))
+
+    def test_candidate_distance_zero(self):
+        goboard = SimpleGoBoard(7, candidate_distance=0)
+        goboard.play_move_gomoku(goboard.pt(1, 1), BLACK)
+        self.assertEqual(len(goboard.get_candidate_moves()), 48)
+
+    def test_zobrist_hash(self):
+        rng = random.Random(455)
+        goboard = SimpleGoBoard(7)
+        self.assertEqual(goboard.hash, 0)
+        hashes = {}
+        played = []
+        for _ in range(300):
+            empty = list(goboard.get_empty_points())
+            if played and (not empty or rng.random() < 0.3):
+                goboard.undo_move_gomoku(played.pop())
+            else:
+                point = rng.choice(empty)
+                goboard.play_move_gomoku(point, goboard.current_player)
+                played.append(point)
+            if rng.random() < 0.1:
+                goboard = goboard.copy()
+            # the same stones give the same hash, whatever the move order
+            position = goboard.board.tobytes()
+            self.assertEqual(hashes.setdefault(position, goboard.hash), goboard.hash)
+        self.assertEqual(SimpleGoBoard(7).zobrist, goboard.zobrist)
+
+
+"""Main"""
+if __name__ == "__main__":
+    unittest.main()
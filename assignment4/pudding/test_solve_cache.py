@@ -0,0 +1,62 @@
+#!/usr/local/bin/python3
+# /usr/bin/python3
+# Set the path to your python3 above
+
+import unittest
+from board_util import BLACK, WHITE
+from simple_board import SimpleGoBoard
+from solve_cache import SolveCache
+
+
+class SolveCacheTestCase(unittest.TestCase):
+    """Tests for solve_cache.py"""
+
+    def setUp(self):
+        self.goboard = SimpleGoBoard(5)
+        # four black stones on row 2, four white ones on row 4
+        for col in range(1, 5):
+            self.goboard.play_move_gomoku(self.goboard.pt(2, col), BLACK)
+            self.goboard.play_move_gomoku(self.goboard.pt(4, col), WHITE)
+
+    def test_hits_and_misses(self):
+        cache = SolveCache()
+        result = cache.solve(self.goboard)
+        self.assertEqual(result, self.goboard.solve())
+        self.assertEqual((cache.hits, cache.misses), (0, 1))
+        # the same position, reached in another order, is a hit
+        other = SimpleGoBoard(5)
+        for col in range(4, 0, -1):
+            other.play_move_gomoku(other.pt(2, col), BLACK)
+            other.play_move_gomoku(other.pt(4, col), WHITE)
+        self.assertEqual(cache.solve(other), result)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        # the other player to move is another position
+        other.current_player = WHITE
+        cache.solve(other)
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+        cache.clear()
+        self.assertEqual((len(cache), cache.hits, cache.misses), (0, 0, 0))
+
+    def test_least_recently_used(self):
+        cache = SolveCache(capacity=2)
+        boards = []
+        for col in range(1, 4):
+            board = self.goboard.copy()
+            board.play_move_gomoku(board.pt(5, col), BLACK)
+            board.play_move_gomoku(board.pt(1, col), WHITE)
+            boards.append(board)
+        cache.solve(boards[0])
+        cache.solve(boards[1])
+        cache.solve(boards[0])
+        # the third position evicts the second, used least recently
+        cache.solve(boards[2])
+        self.assertEqual(len(cache), 2)
+        cache.solve(boards[0])
+        self.assertEqual((cache.hits, cache.misses), (2, 3))
+        cache.solve(boards[1])
+        self.assertEqual((cache.hits, cache.misses), (2, 4))
+
+
+"""Main"""
+if __name__ == "__main__":
+    unittest.main()
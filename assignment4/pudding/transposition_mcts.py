@@ -0,0 +1,252 @@
+"""
+transposition_mcts.py
+
+MCTS on a transposition table.
+
+In Gomoku the same position is reached by many move orders. The tree
+of mcts.py keeps one node per path, so each order gathers its own
+statistics. Here a node is stored once per position, in a dict keyed
+by the Zobrist hash of the board and the player to move, so the
+search graph is a DAG. A node keeps the statistics of all playouts
+through its position, whatever the path, and one edge per move with
+the playouts that took that edge. Selection takes the value of a move
+from the shared node of the position it leads to, and its exploration
+term from the edge, as UCT3 of Childs, Brodeur and Kocsis.
+
+The table keeps at most max_nodes positions. It persists across moves,
+ordered by last use, and the least recently used positions are evicted
+first, never the root.
+"""
+
+import math
+from collections import OrderedDict
+
+from board_util import GoBoardUtil, BLACK, WHITE
+
+from mcts import MCTS, TIMELIMIT, VALUE_OF_PROOF, expansion_moves
+from search_control import SearchControl
+
+"""
+Positions kept in the table, at most.
+"""
+MAX_NODES = 200000
+
+
+class TableNode(object):
+    """
+    A position in the table. Values are from black's point of view,
+    as in MCTSTree. moves is None until the node is expanded.
+    """
+    __slots__ = ('visits', 'black_wins', 'proof', 'moves',
+                 'edge_visits', 'edge_black_wins')
+
+    def __init__(self):
+        self.visits = 0
+        self.black_wins = 0.0
+        self.proof = 0
+        self.moves = None
+        self.edge_visits = None
+        self.edge_black_wins = None
+
+    def expand(self, moves):
+        self.moves = [int(move) for move in moves]
+        self.edge_visits = [0] * len(self.moves)
+        self.edge_black_wins = [0.0] * len(self.moves)
+
+
+class TranspositionMCTS(MCTS):
+    """
+    Serial search only: the workers and batch_size of MCTS are not used,
+    and root_parallel is always False. The rollouts and leaf proofs are
+    those of MCTS.
+    """
+
+    def __init__(self, max_nodes=MAX_NODES):
+        MCTS.__init__(self)
+        self.max_nodes = max_nodes
+        self.table = OrderedDict()
+        self.maxpoint = None
+        self.root_key = None
+
+    def _lookup(self, key):
+        """
+        The node of key, created if missing, marked as just used.
+        """
+        node = self.table.get(key)
+        if node is None:
+            node = TableNode()
+            self.table[key] = node
+        else:
+            self.table.move_to_end(key)
+        return node
+
+    def root_parallel(self):
+        return False
+
+    def _evict(self):
+        """
+        Drop the least recently used positions beyond max_nodes.
+        """
+        while len(self.table) > self.max_nodes:
+            key, node = self.table.popitem(last=False)
+            if key == self.root_key:
+                self.table[key] = node
+                if len(self.table) <= 1:
+                    return
+
+    def _child(self, board, move, color):
+        """
+        The node of the position after color plays move on board, None
+        if it is not in the table.
+        """
+        return self.table.get((board.hash ^ board.zobrist[move][color],
+                               GoBoardUtil.opponent(color)))
+
+    def _select_edge(self, node, board, color):
+        """
+        The index of the edge of node with the highest UCT value for
+        color: the value of the position it leads to, shared by all its
+        paths, plus exploration from the visits of the edge. A move to a
+        proven win comes first and proves node, then unvisited edges,
+        proven losses for color last.
+        """
+        opponent = GoBoardUtil.opponent(color)
+        scale = self.exploration * math.sqrt(math.log(max(node.visits, 1)))
+        best, best_score = 0, -math.inf
+        for i, move in enumerate(node.moves):
+            n = node.edge_visits[i]
+            child = self._child(board, move, color)
+            if child is not None and child.proof:
+                if child.proof == color:
+                    node.proof = color
+                    return i
+                if child.proof == opponent:
+                    continue
+            if n == 0:
+                return i
+            if child is not None and child.visits > 0:
+                value = child.black_wins / child.visits
+            else:
+                value = node.edge_black_wins[i] / n
+            if color == WHITE:
+                value = 1 - value
+            score = value + scale / math.sqrt(n)
+            if score > best_score:
+                best, best_score = i, score
+        return best
+
+    def _playout(self, board, color):
+        """
+        One playout from the root, which is always expanded, to a new or
+        proven position, backed up to the nodes and edges of its path.
+        """
+        node = self._lookup((board.hash, color))
+        path = []
+        while True:
+            if node.proof and path:
+                leaf_value = VALUE_OF_PROOF[node.proof]
+                break
+            if node.moves is None:
+                proof = self._leaf_proof(board) if path else 0
+                if proof:
+                    node.proof = proof
+                    leaf_value = VALUE_OF_PROOF[proof]
+                else:
+                    node.expand(expansion_moves(board)[0])
+                    leaf_value, _ = self._evaluate_rollout(board, board.current_player)
+                break
+            i = self._select_edge(node, board, color)
+            board.play_move_gomoku(node.moves[i], color)
+            path.append((node, i))
+            color = GoBoardUtil.opponent(color)
+            node = self._lookup((board.hash, color))
+        node.visits += 1
+        node.black_wins += leaf_value
+        for parent, i in path:
+            parent.visits += 1
+            parent.black_wins += leaf_value
+            parent.edge_visits[i] += 1
+            parent.edge_black_wins[i] += leaf_value
+        self._evict()
+
+    def _root(self, board, toplay):
+        if self.maxpoint != board.maxpoint:
+            self.table.clear()
+            self.maxpoint = board.maxpoint
+        self.root_key = (board.hash, toplay)
+        node = self._lookup(self.root_key)
+        # the root is searched again, its winning move may be evicted
+        node.proof = 0
+        return node
+
+    def best_move(self, board, toplay):
+        """
+        A move to a proven win, or else the move of the most visited
+        edge of the root that does not lead to a proven loss, the best
+        win rate among those on ties.
+        """
+        node = self.table[self.root_key]
+        opponent = GoBoardUtil.opponent(toplay)
+        candidates = []
+        for i, move in enumerate(node.moves):
+            child = self._child(board, move, toplay)
+            proof = child.proof if child is not None else 0
+            if proof == toplay:
+                return move
+            if proof != opponent:
+                candidates.append(i)
+        if not candidates:
+            candidates = range(len(node.moves))
+        def key(i):
+            n = node.edge_visits[i]
+            winrate = node.edge_black_wins[i] / n if n else 0
+            if toplay == WHITE and n:
+                winrate = 1 - winrate
+            return n, winrate
+        return node.moves[max(candidates, key=key)]
+
+    def _decided(self, control, playouts):
+        node = self.table[self.root_key]
+        if node.proof or len(node.moves) < 2:
+            return True
+        second, first = sorted(node.edge_visits)[-2:]
+        return control.decided(first, second, playouts)
+
+    def search(self, board, toplay, exploration, control):
+        """
+        Playouts from board until the deadline of control, a
+        SearchControl, and at least one, or until the root is proven.
+        Returns the moves, visits, black wins and proofs of the root
+        edges, as MCTSTree.root_statistics, the proof of an edge being
+        that of the position it leads to.
+        """
+        self.exploration = exploration
+        root = self._root(board, toplay)
+        while True:
+            self._playout(board.copy(), toplay)
+            if control.expired() or root.proof:
+                return self._root_statistics(board, toplay)
+
+    def _root_statistics(self, board, toplay):
+        root = self.table[self.root_key]
+        proofs = []
+        for move in root.moves:
+            child = self._child(board, move, toplay)
+            proofs.append(child.proof if child is not None else 0)
+        return list(root.moves), list(root.edge_visits), list(root.edge_black_wins), proofs
+
+    def get_move(self, board, toplay, exploration, timelimit=None):
+        """
+        Search as MCTS.get_move does, on the table kept since the last
+        search, and return the move of the most visited root edge.
+        """
+        control = SearchControl(TIMELIMIT if timelimit is None else timelimit)
+        self.exploration = exploration
+        root = self._root(board, toplay)
+        playouts = 0
+        while root.proof != toplay:
+            self._playout(board.copy(), toplay)
+            playouts += 1
+            if control.expired() or self._decided(control, playouts):
+                break
+        return self.best_move(board, toplay)